@@ -0,0 +1,339 @@
+"""Export the appointment history to Parquet partitioned by month, and summarise it with NumPy/pandas.
+
+Appointments are read straight from SQLite BATCH_SIZE rows at a time and turned into
+Arrow record batches. Artist and service names are joined in as dictionary columns from
+lookups loaded once, so memory stays bounded by the batch size however long the history
+is. Summaries are computed one month partition at a time for the same reason.
+
+    python analytics_export.py export history/ [--database sqlite:///./beauty_salon.db]
+                                               [--from 2024-01-01] [--to 2025-01-01] [--with-contacts]
+    python analytics_export.py summary history/
+
+Needs pyarrow, numpy and pandas (pip install pyarrow pandas), the application itself does not.
+"""
+import argparse
+import os
+import shutil
+import time
+from datetime import date, time as clock_time
+
+try:
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    np = pd = pa = pc = ds = pq = None
+
+from database_setup import create_salon_engine, engine as default_engine, to_timestamp
+from reports import OPEN_MINUTES
+
+BATCH_SIZE = 100000
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+# Streaks of at least this many back-to-back appointments are counted per artist
+LONG_STREAK = 4
+
+
+def _require():
+    if pa is None:
+        raise RuntimeError("analytics_export needs pyarrow, numpy and pandas: pip install pyarrow pandas")
+
+
+def export_schema(with_contacts=False):
+    fields = [
+        pa.field('appointment_id', pa.int64()),
+        pa.field('start', pa.timestamp('s')),
+        pa.field('end', pa.timestamp('s')),
+        pa.field('duration_minutes', pa.int32()),
+        pa.field('artist_id', pa.int32()),
+        pa.field('artist', pa.dictionary(pa.int32(), pa.string())),
+        pa.field('service_id', pa.int32()),
+        pa.field('service', pa.dictionary(pa.int32(), pa.string())),
+        pa.field('category', pa.dictionary(pa.int32(), pa.string())),
+        pa.field('user_id', pa.int64()),
+    ]
+    if with_contacts:
+        fields += [pa.field('user_name', pa.string()), pa.field('user_phone', pa.string())]
+    return pa.schema(fields + [pa.field('month', pa.string())])
+
+
+class _Lookup:
+    """Id -> columns table, joined onto batches with a binary search over the sorted ids."""
+
+    def __init__(self, rows):
+        rows = sorted(rows)
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.columns = [pa.array([row[i] for row in rows], pa.string()) for i in range(1, len(rows[0]))] \
+            if rows else []
+
+    def indices(self, ids):
+        """Int32 positions of ids in the lookup, null where an id is unknown or null."""
+        ids = pc.fill_null(ids.cast(pa.int64()), -1).to_numpy()
+        if not len(self.ids):
+            return pa.nulls(len(ids), pa.int32())
+        positions = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        return pa.array(positions.astype(np.int32), mask=self.ids[positions] != ids)
+
+    def dictionary(self, indices, column=0):
+        return pa.DictionaryArray.from_arrays(indices, self.columns[column])
+
+    def take(self, indices, column=0):
+        return self.columns[column].take(indices)
+
+
+def _months(start):
+    """'YYYY-MM' of every start_ts, formatting each month of the batch once instead of every row."""
+    months = start.to_numpy().astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+    first = int(months.min())
+    names = pa.array([str(np.datetime64(month, 'M')) for month in range(first, int(months.max()) + 1)])
+    return pa.DictionaryArray.from_arrays(pa.array(months - first, pa.int32()), names).dictionary_decode()
+
+
+def iter_appointment_batches(bind=default_engine, first_date=None, last_date=None, with_contacts=False,
+                             batch_size=BATCH_SIZE):
+    """Yield the appointments between first_date and last_date (exclusive) as Arrow record batches."""
+    _require()
+    schema = export_schema(with_contacts)
+    where = ['start_ts IS NOT NULL']
+    parameters = []
+    if first_date is not None:
+        where.append('start_ts >= ?')
+        parameters.append(to_timestamp(first_date, clock_time.min))
+    if last_date is not None:
+        where.append('start_ts < ?')
+        parameters.append(to_timestamp(last_date, clock_time.min))
+
+    with bind.connect() as conn:
+        cursor = conn.connection.dbapi_connection.cursor()
+        artists = _Lookup(cursor.execute('SELECT artist_id, name FROM "Artists"').fetchall())
+        services = _Lookup(cursor.execute('SELECT service_id, name, category FROM "Services"').fetchall())
+        users = _Lookup(cursor.execute('SELECT user_id, name, phone_number FROM "Users"').fetchall()) \
+            if with_contacts else None
+
+        cursor.execute('SELECT appointment_id, start_ts, duration_minutes, artist_id, service_id, user_id '
+                       f'FROM "Appointments" WHERE {" AND ".join(where)}', parameters)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            # Transposed in C, one Python list per column
+            appointment_id, start_ts, duration, artist_id, service_id, user_id = zip(*rows)
+            start = pa.array(start_ts, pa.int64())
+            duration = pa.array(duration, pa.int32())
+            artist_id = pa.array(artist_id, pa.int32())
+            service_id = pa.array(service_id, pa.int32())
+            user_id = pa.array(user_id, pa.int64())
+            service_indices = services.indices(service_id)
+            start_time = start.cast(pa.timestamp('s'))
+            columns = [
+                pa.array(appointment_id, pa.int64()),
+                start_time,
+                pc.add(start, pc.multiply(duration.cast(pa.int64()), 60)).cast(pa.timestamp('s')),
+                duration,
+                artist_id,
+                artists.dictionary(artists.indices(artist_id)),
+                service_id,
+                services.dictionary(service_indices, 0),
+                services.dictionary(service_indices, 1),
+                user_id,
+            ]
+            if with_contacts:
+                user_indices = users.indices(user_id)
+                columns += [users.take(user_indices, 0), users.take(user_indices, 1)]
+            columns.append(_months(start))
+            yield pa.RecordBatch.from_arrays(columns, schema=schema)
+        cursor.close()
+
+
+def export(directory, bind=default_engine, first_date=None, last_date=None, with_contacts=False,
+           batch_size=BATCH_SIZE):
+    """Write the appointments to directory/month=YYYY-MM/*.parquet, replacing the months exported.
+
+    Every batch is written out as soon as it is read, one file per month it touches, so
+    no writer stays open between batches. Appointments come out of SQLite roughly in
+    booking order, which keeps that to a file or two per month.
+    """
+    _require()
+    files = {}
+    exported = 0
+    for batch in iter_appointment_batches(bind, first_date, last_date, with_contacts, batch_size):
+        months = batch.column('month')
+        rows = batch.drop_columns(['month'])
+        for month in pc.unique(months).to_pylist():
+            partition = os.path.join(directory, f'month={month}')
+            if month not in files:
+                shutil.rmtree(partition, ignore_errors=True)
+                os.makedirs(partition)
+                files[month] = 0
+            pq.write_table(pa.Table.from_batches([rows.filter(pc.equal(months, month))]),
+                           os.path.join(partition, f'appointments-{files[month]}.parquet'), compression='zstd')
+            files[month] += 1
+        exported += batch.num_rows
+    return exported
+
+
+def _padded(values, length):
+    return np.pad(values, (0, max(0, length - len(values))))
+
+
+def _combined(total, values, maximum=False):
+    """Add (or take the maximum of) two arrays indexed by id, padding the shorter one with zeros."""
+    total = _padded(total, len(values))
+    combine = np.maximum if maximum else np.add
+    combine(total[:len(values)], values, out=total[:len(values)])
+    return total
+
+
+def _seconds(column):
+    """Seconds since the epoch like start_ts, Parquet reads timestamps back as milliseconds."""
+    return column.cast(pa.timestamp('s')).cast(pa.int64()).to_numpy()
+
+
+class _Totals:
+    """Summaries accumulated one month at a time in arrays indexed by artist_id and service_id."""
+
+    def __init__(self):
+        self.heatmap = np.zeros(7 * 24, dtype=np.int64)
+        empty = np.zeros(0, dtype=np.int64)
+        self.artist_appointments = self.artist_minutes = self.artist_days = empty
+        self.longest_streak = self.long_streaks = self.streak_lengths = empty
+        self.service_appointments = self.service_minutes = empty
+        self.artist_names = {}
+        self.services = {}
+
+    def add(self, month):
+        start = _seconds(month['start'])
+        duration = month['duration_minutes'].to_numpy().astype(np.int64)
+        # Appointments of deleted artists and services are counted under id 0
+        artist_id = pc.fill_null(month['artist_id'], 0).to_numpy().astype(np.int64)
+        service_id = pc.fill_null(month['service_id'], 0).to_numpy().astype(np.int64)
+        day = start // 86400
+        # 1970-01-01 was a Thursday
+        self.heatmap += np.bincount((day + 3) % 7 * 24 + start % 86400 // 3600, minlength=7 * 24)
+        self.artist_appointments = _combined(self.artist_appointments, np.bincount(artist_id))
+        self.artist_minutes = _combined(self.artist_minutes, np.bincount(artist_id, duration).astype(np.int64))
+        self.service_appointments = _combined(self.service_appointments, np.bincount(service_id))
+        self.service_minutes = _combined(self.service_minutes, np.bincount(service_id, duration).astype(np.int64))
+        self._add_names(month, artist_id, service_id)
+
+        order = np.lexsort((start, artist_id))
+        start, artist_id, day = start[order], artist_id[order], day[order]
+        end = start + duration[order] * 60
+        same_day = np.zeros(len(start), dtype=bool)
+        same_day[1:] = (artist_id[1:] == artist_id[:-1]) & (day[1:] == day[:-1])
+        self.artist_days = _combined(self.artist_days, np.bincount(artist_id[~same_day]))
+
+        # A streak goes on while the artist's next appointment starts when the previous one ends
+        continues = same_day
+        continues[1:] &= start[1:] == end[:-1]
+        lengths = np.bincount(np.cumsum(~continues) - 1)
+        streak_artist = artist_id[~continues]
+        longest = np.zeros(streak_artist.max() + 1, dtype=np.int64)
+        np.maximum.at(longest, streak_artist, lengths)
+        self.streak_lengths = _combined(self.streak_lengths, np.bincount(lengths))
+        self.longest_streak = _combined(self.longest_streak, longest, maximum=True)
+        self.long_streaks = _combined(self.long_streaks,
+                                      np.bincount(streak_artist, lengths >= LONG_STREAK).astype(np.int64))
+
+    def _add_names(self, month, artist_id, service_id):
+        """Names of the ids seen this month, taken from each id's first row."""
+        ids, first = np.unique(artist_id, return_index=True)
+        self.artist_names.update(zip(ids.tolist(), month['artist'].take(first).to_pylist()))
+        ids, first = np.unique(service_id, return_index=True)
+        self.services.update(zip(ids.tolist(), zip(month['category'].take(first).to_pylist(),
+                                                   month['service'].take(first).to_pylist())))
+
+    def frames(self):
+        heatmap = pd.DataFrame(self.heatmap.reshape(7, 24), index=WEEKDAYS, columns=range(24))
+        # Only the hours anything starts in
+        heatmap = heatmap.loc[:, heatmap.sum() > 0]
+
+        artist_ids = np.flatnonzero(self.artist_appointments)
+        known = len(self.artist_appointments)
+        artists = pd.DataFrame({
+            'artist': [self.artist_names.get(artist_id) for artist_id in artist_ids.tolist()],
+            'appointments': self.artist_appointments[artist_ids],
+            'busy_minutes': self.artist_minutes[artist_ids],
+            'days': self.artist_days[artist_ids],
+            'longest_streak': _padded(self.longest_streak, known)[artist_ids],
+            'long_streaks': _padded(self.long_streaks, known)[artist_ids],
+        }, index=pd.Index(artist_ids, name='artist_id'))
+        artists['occupancy'] = artists['busy_minutes'] / (artists['days'] * OPEN_MINUTES)
+        artists = artists.sort_values('busy_minutes', ascending=False)
+
+        service_ids = np.flatnonzero(self.service_appointments)
+        services = pd.DataFrame({
+            'category': [self.services[service_id][0] for service_id in service_ids.tolist()],
+            'service': [self.services[service_id][1] for service_id in service_ids.tolist()],
+            'appointments': self.service_appointments[service_ids],
+            'minutes': self.service_minutes[service_ids],
+        }, index=pd.Index(service_ids, name='service_id'))
+        services['share'] = services['appointments'] / services['appointments'].sum()
+        services = services.sort_values('appointments', ascending=False)
+
+        streaks = pd.Series(self.streak_lengths[1:], index=pd.RangeIndex(1, len(self.streak_lengths),
+                                                                         name='appointments back to back'),
+                            name='streaks')
+        return {'heatmap': heatmap, 'artists': artists, 'services': services, 'streaks': streaks}
+
+
+def summarise(directory):
+    """{'heatmap', 'artists', 'services', 'streaks'} DataFrames over an exported directory.
+
+    Days worked and streaks never cross a month, so the files of one month partition
+    are read at a time and only per-artist and per-service totals are kept.
+    """
+    _require()
+    dataset = ds.dataset(directory, format='parquet', partitioning='hive')
+    months = {}
+    for fragment in dataset.get_fragments():
+        months.setdefault(ds.get_partition_keys(fragment.partition_expression)['month'], []).append(fragment)
+    columns = ['start', 'duration_minutes', 'artist_id', 'artist', 'service_id', 'service', 'category']
+    totals = _Totals()
+    for month in sorted(months):
+        table = pa.concat_tables(fragment.to_table(columns=columns) for fragment in months[month])
+        if table.num_rows:
+            totals.add(table.unify_dictionaries().combine_chunks())
+    if not totals.services:
+        raise ValueError(f"No appointments exported in {directory}")
+    return totals.frames()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_command = commands.add_parser('export', help='write the appointments as Parquet, one directory per month')
+    export_command.add_argument('directory')
+    export_command.add_argument('--database', help='SQLAlchemy URL, the application database by default')
+    export_command.add_argument('--from', dest='first_date', type=date.fromisoformat)
+    export_command.add_argument('--to', dest='last_date', type=date.fromisoformat, help='exclusive')
+    export_command.add_argument('--with-contacts', action='store_true', help='include customer names and phones')
+    export_command.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    summary_command = commands.add_parser('summary', help='print summaries of an exported directory')
+    summary_command.add_argument('directory')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == 'export':
+        bind = create_salon_engine(args.database) if args.database else default_engine
+        exported = export(args.directory, bind, args.first_date, args.last_date, args.with_contacts,
+                          args.batch_size)
+        print(f"Exported {exported} appointments to {args.directory} in {time.perf_counter() - started:.1f}s")
+        return
+
+    frames = summarise(args.directory)
+    print('Appointments by weekday and starting hour')
+    print(frames['heatmap'].to_string())
+    print('\nArtist load')
+    print(frames['artists'].head(20).to_string(float_format='{:.1%}'.format))
+    print('\nService mix')
+    print(frames['services'].head(20).to_string(float_format='{:.1%}'.format))
+    print('\nNo-gap streaks')
+    print(frames['streaks'].to_string())
+    print(f"\nSummarised in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
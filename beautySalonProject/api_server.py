@@ -0,0 +1,537 @@
+"""Online booking API: catalog, free slots and booking creation over HTTP.
+
+A small asyncio HTTP/1.1 server (JSON in and out, keep-alive) on top of SQLAlchemy's
+async engine with aiosqlite. It works on the same database and follows the same
+overlap rules as the desktop application, so both can be used at the same time.
+
+    python api_server.py [--host 127.0.0.1] [--port 8080] [--database sqlite+aiosqlite:///./beauty_salon.db]
+
+    GET  /catalog
+    GET  /slots?service_id=3&date=2025-06-02[&days=7][&artist_id=5]
+    POST /bookings  {"user_name", "user_phone", "artist_id", "service_id", "date": "YYYY-MM-DD", "time": "HH:MM"}
+"""
+import argparse
+import asyncio
+import json
+import random
+import time as clock
+from datetime import date, datetime, time, timedelta
+from functools import partial
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+from sqlalchemy import event, insert, make_url, or_, select, tuple_
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import instrumentation
+from database_setup import (ENGINE_PROFILES, DEFAULT_PROFILE, Appointment, Artist, Service, ShiftException,
+                            ShiftTemplate, User, MAX_APPOINTMENT_SECONDS, create_salon_engine, init_db, pragma_listener,
+                            to_timestamp, from_timestamp)
+from booking import (MAX_ATTEMPTS, BookingConflict, BookingError, OutsideShift, UnknownServiceOrArtist, is_busy,
+                     validate_booking, validate_length)
+from catalog import ArtistRecord, CatalogCache, ServiceRecord
+from scheduling import (SLOT_GRANULARITY, ArtistCalendar, ShiftChange, WeeklyShift, appointment_length, build_calendar,
+                        calendar_slots, expand_hours, within_hours)
+
+DATABASE_URL = "sqlite+aiosqlite:///./beauty_salon.db"
+
+# The desktop application may change the catalog, shifts and bookings behind
+# our back; cached copies older than this are reloaded
+CACHE_TTL = 60
+# Longest date range a single /slots request may ask for
+MAX_SLOT_DAYS = 31
+MAX_BODY_BYTES = 64 * 1024
+# Most bookings committed in one transaction by the writer task
+MAX_BATCH = 200
+# Requests handled at the same time, the rest queue in arrival order
+MAX_IN_FLIGHT = 32
+
+STATUS_CODES = {'invalid': 400, 'not_found': 404, 'conflict': 409, 'unavailable': 409, 'error': 500}
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class PendingBooking(NamedTuple):
+    user_name: str
+    user_phone: str
+    artist_id: int
+    service_id: int
+    appointment_date: date
+    appointment_time: time
+    start_ts: int
+    duration_minutes: int
+    future: asyncio.Future
+
+
+class ArtistSchedule(NamedTuple):
+    calendar: ArtistCalendar
+    # The artist's WeeklyShifts and the ShiftChanges from today on, expanded per request
+    shifts: list
+    changes: list
+    loaded_at: float
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, code='invalid'):
+        super(HTTPError, self).__init__(message)
+        self.status = status
+        self.code = code
+
+
+def create_async_salon_engine(url=DATABASE_URL, profile=DEFAULT_PROFILE, pool_size=None, max_overflow=None):
+    """Async counterpart of database_setup.create_salon_engine, with the same pool and pragmas."""
+    settings = ENGINE_PROFILES[profile]
+    engine = create_async_engine(
+        url,
+        pool_size=settings['pool_size'] if pool_size is None else pool_size,
+        max_overflow=settings['max_overflow'] if max_overflow is None else max_overflow,
+        pool_timeout=30,
+    )
+    event.listen(engine.sync_engine, 'connect', pragma_listener(profile))
+    if instrumentation.enabled:
+        instrumentation.instrument_engine(engine.sync_engine)
+    return engine
+
+
+class BookingAPI:
+    """Request handlers, holding the catalog and the per-artist calendars in memory.
+
+    Reads go through the pooled engine. Bookings are queued for a single writer
+    task on write_engine, a connection of its own, which commits whatever queued up
+    while the previous transaction ran as one group, so the write lock is taken once
+    per batch instead of once per booking.
+    """
+
+    def __init__(self, engine, write_engine):
+        self.engine = engine
+        self.write_engine = write_engine
+        self.catalog = CatalogCache(session_factory=None)
+        self._catalog_loaded_at = None
+        # artist_id -> task loading that artist's ArtistSchedule
+        self._schedules = {}
+        # SQLite has a single writer anyway: one task commits the queued bookings in batches
+        self._pending = asyncio.Queue()
+        self._writer = None
+        # Requests past this wait before being handled, so the event loop keeps turning
+        # over quickly and the database round trips of the admitted ones are not starved
+        self._in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+
+    async def load_catalog(self):
+        async with self.engine.connect() as conn:
+            services = [ServiceRecord(*row) for row in await conn.execute(
+                select(Service.service_id, Service.name, Service.category, Service.duration_minutes,
+                       Service.buffer_minutes).order_by(Service.name))]
+            artists = [ArtistRecord(*row) for row in await conn.execute(
+                select(Artist.artist_id, Artist.name, Artist.specialization).order_by(Artist.artist_id))]
+        self.catalog.install(services, artists)
+        self._catalog_loaded_at = clock.monotonic()
+
+    async def _ensure_catalog(self):
+        if self._catalog_loaded_at is None or clock.monotonic() - self._catalog_loaded_at > CACHE_TTL:
+            await self.load_catalog()
+
+    async def _load_schedule(self, artist_id):
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(select(
+                Appointment.appointment_id,
+                Appointment.start_ts,
+                Appointment.duration_minutes
+            ).where(
+                Appointment.artist_id == artist_id,
+                Appointment.start_ts.isnot(None)
+            ).order_by(Appointment.start_ts))
+            calendar = build_calendar(rows)
+            shifts = [WeeklyShift(*row) for row in await conn.execute(select(
+                ShiftTemplate.weekday, ShiftTemplate.start_time, ShiftTemplate.end_time,
+                ShiftTemplate.valid_from, ShiftTemplate.valid_until
+            ).where(ShiftTemplate.artist_id == artist_id))]
+            changes = [ShiftChange(*row) for row in await conn.execute(select(
+                ShiftException.first_date, ShiftException.last_date, ShiftException.start_time,
+                ShiftException.end_time, ShiftException.kind
+            ).where(
+                or_(ShiftException.artist_id == artist_id, ShiftException.artist_id.is_(None)),
+                ShiftException.last_date >= date.today()
+            ))]
+        return ArtistSchedule(calendar, shifts, changes, clock.monotonic())
+
+    def schedule(self, artist_id):
+        """Awaitable ArtistSchedule, loaded once however many requests ask for it at the same time."""
+        task = self._schedules.get(artist_id)
+        if task is not None and _loaded(task) and clock.monotonic() - task.result().loaded_at > CACHE_TTL:
+            task = None
+        if task is None:
+            task = self._schedules[artist_id] = asyncio.ensure_future(self._load_schedule(artist_id))
+            task.add_done_callback(partial(self._forget_failed_load, artist_id))
+        return task
+
+    def _forget_failed_load(self, artist_id, task):
+        # A failed load is retried by the next request
+        if (task.cancelled() or task.exception()) and self._schedules.get(artist_id) is task:
+            del self._schedules[artist_id]
+
+    def _record_booking(self, artist_id, appointment_id, start, end):
+        task = self._schedules.get(artist_id)
+        if task is None:
+            return
+        if _loaded(task):
+            task.result().calendar.add(appointment_id, start, end)
+        else:
+            # The load may have read the table before this commit
+            del self._schedules[artist_id]
+
+    async def get_catalog(self, query):
+        await self._ensure_catalog()
+        return 200, {
+            'services': [dict(service._asdict(), artist_ids=[artist.artist_id for artist in
+                                                             self.catalog.eligible_artists(service.service_id)])
+                         for service in self.catalog.services()],
+            'artists': [artist._asdict() for artist in self.catalog.artists()],
+        }
+
+    async def get_slots(self, query):
+        await self._ensure_catalog()
+        service = self.catalog.service_by_id(_int_param(query, 'service_id'))
+        if service is None:
+            raise HTTPError(404, "Service not found.", 'not_found')
+        first_date = _date_param(query, 'date')
+        days = _int_param(query, 'days', 1)
+        if not 1 <= days <= MAX_SLOT_DAYS:
+            raise HTTPError(400, f"days must be between 1 and {MAX_SLOT_DAYS}.")
+        last_date = first_date + timedelta(days=days - 1)
+        eligible = [artist.artist_id for artist in self.catalog.eligible_artists(service.service_id)]
+        if 'artist_id' in query:
+            artist_id = _int_param(query, 'artist_id')
+            if artist_id not in eligible:
+                raise HTTPError(404, "Artist not found for this service.", 'not_found')
+            artist_ids = [artist_id]
+        else:
+            artist_ids = eligible
+
+        length = appointment_length(service)
+        schedules = await asyncio.gather(*(self.schedule(artist_id) for artist_id in artist_ids))
+        now = datetime.now()
+        slots = []
+        for artist_id, schedule in zip(artist_ids, schedules):
+            hours = expand_hours(first_date, last_date, schedule.shifts, schedule.changes)
+            slots.extend(calendar_slots(schedule.calendar, artist_id, first_date, last_date, length,
+                                        SLOT_GRANULARITY, now, hours))
+        return 200, {'length_minutes': length.seconds // 60,
+                     'slots': [{'artist_id': slot.artist_id, 'start': slot.start.isoformat(timespec='minutes')}
+                               for slot in slots]}
+
+    async def post_booking(self, body):
+        await self._ensure_catalog()
+        try:
+            payload = json.loads(body)
+            user_name = str(payload.get('user_name') or '').strip()
+            user_phone = str(payload.get('user_phone') or '').strip()
+            artist_id = int(payload['artist_id'])
+            service_id = int(payload['service_id'])
+            appointment_date = date.fromisoformat(payload['date'])
+            appointment_time = time.fromisoformat(payload['time'])
+        except (ValueError, TypeError, KeyError, AttributeError):
+            raise HTTPError(400, "Expected user_name, user_phone, artist_id, service_id, date and time.")
+
+        validate_booking(user_name, user_phone, appointment_time)
+        service = self.catalog.service_by_id(service_id)
+        artist = self.catalog.artist_by_id(artist_id)
+        if not service or not artist:
+            raise UnknownServiceOrArtist()
+        if artist not in self.catalog.eligible_artists(service_id):
+            raise UnknownServiceOrArtist(f"{artist.name} does not perform {service.name}.")
+        length = appointment_length(service)
+        validate_length(appointment_date, appointment_time, length)
+        schedule = await self.schedule(artist_id)
+        start = datetime.combine(appointment_date, appointment_time)
+        hours = expand_hours(appointment_date, appointment_date, schedule.shifts, schedule.changes)
+        if not within_hours(hours[appointment_date], start, start + length):
+            raise OutsideShift()
+
+        appointment_id = await self.book_appointment(user_name, user_phone, artist_id, service,
+                                                     appointment_date, appointment_time)
+        return 201, {'appointment_id': appointment_id}
+
+    async def book_appointment(self, user_name, user_phone, artist_id, service, appointment_date, appointment_time):
+        """Queue the booking for the writer task and wait for its outcome.
+
+        Raises BookingConflict like booking.book_appointment, otherwise returns the
+        new appointment_id.
+        """
+        length = appointment_length(service)
+        start = datetime.combine(appointment_date, appointment_time)
+
+        # Turn away taken slots without queueing for the writer; bookings the
+        # calendar does not know about yet are still caught inside the transaction
+        busy = (await self.schedule(artist_id)).calendar.conflicts(start, start + length)
+        if busy:
+            raise BookingConflict(interval.appointment_id for interval in busy)
+
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._write_bookings())
+        future = asyncio.get_running_loop().create_future()
+        await self._pending.put(PendingBooking(
+            user_name, user_phone, artist_id, service.service_id, appointment_date, appointment_time,
+            to_timestamp(appointment_date, appointment_time), length.seconds // 60, future))
+        return await future
+
+    async def _write_bookings(self):
+        """Commit queued bookings, everything that queued up meanwhile in one transaction."""
+        while True:
+            batch = [await self._pending.get()]
+            while not self._pending.empty() and len(batch) < MAX_BATCH:
+                batch.append(self._pending.get_nowait())
+            try:
+                outcomes = await self._commit(batch)
+            except IntegrityError as e:
+                if 'overlaps' not in str(e.orig):
+                    outcomes = [e] * len(batch)
+                elif len(batch) == 1:
+                    outcomes = [BookingConflict()]
+                else:
+                    # The overlap trigger disagreed with the check, find out which booking it was
+                    outcomes = [await self._commit_alone(pending) for pending in batch]
+            except Exception as e:
+                outcomes = [e] * len(batch)
+
+            for pending, outcome in zip(batch, outcomes):
+                start = datetime.combine(pending.appointment_date, pending.appointment_time)
+                if isinstance(outcome, BookingConflict):
+                    # The cached calendar missed a booking made elsewhere
+                    self._schedules.pop(pending.artist_id, None)
+                elif not isinstance(outcome, Exception):
+                    self._record_booking(pending.artist_id, outcome, start,
+                                         start + timedelta(minutes=pending.duration_minutes))
+                if pending.future.done():
+                    continue
+                if isinstance(outcome, Exception):
+                    pending.future.set_exception(outcome)
+                else:
+                    pending.future.set_result(outcome)
+
+    async def _commit_alone(self, pending):
+        try:
+            return (await self._commit([pending]))[0]
+        except IntegrityError as e:
+            return BookingConflict() if 'overlaps' in str(e.orig) else e
+        except Exception as e:
+            return e
+
+    async def _commit(self, batch):
+        """Book the batch in one BEGIN IMMEDIATE transaction, retrying while the database is locked.
+
+        Returns an appointment_id or a BookingConflict for every entry of the batch.
+        """
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            async with self.write_engine.connect() as conn:
+                try:
+                    await conn.exec_driver_sql('BEGIN IMMEDIATE')
+                    outcomes = await self._insert_batch(conn, batch)
+                    await conn.commit()
+                    return outcomes
+                except (IntegrityError, OperationalError) as e:
+                    await conn.rollback()
+                    if not isinstance(e, OperationalError) or not is_busy(e) or attempt == MAX_ATTEMPTS:
+                        raise
+            await asyncio.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+    async def _insert_batch(self, conn, batch):
+        # Same overlap rule as booking.book_appointment, checked for the whole batch with one
+        # range query; accepted bookings are added to the calendars so they collide with each other
+        low = min(pending.start_ts for pending in batch) - MAX_APPOINTMENT_SECONDS
+        high = max(pending.start_ts + pending.duration_minutes * 60 for pending in batch)
+        calendars = {pending.artist_id: ArtistCalendar() for pending in batch}
+        for artist_id, appointment_id, start_ts, duration_minutes in await conn.execute(select(
+                Appointment.artist_id, Appointment.appointment_id, Appointment.start_ts, Appointment.duration_minutes
+        ).where(
+            Appointment.artist_id.in_(calendars),
+            Appointment.start_ts > low,
+            Appointment.start_ts < high
+        )):
+            start = from_timestamp(start_ts)
+            calendars[artist_id].add(appointment_id, start, start + timedelta(minutes=duration_minutes))
+
+        outcomes = []
+        accepted = []
+        for index, pending in enumerate(batch):
+            start = from_timestamp(pending.start_ts)
+            end = start + timedelta(minutes=pending.duration_minutes)
+            busy = calendars[pending.artist_id].conflicts(start, end)
+            if busy:
+                outcomes.append([interval.appointment_id for interval in busy])
+            else:
+                # Negative placeholder ids until the insert assigns the real ones
+                calendars[pending.artist_id].add(-1 - index, start, end)
+                outcomes.append(None)
+                accepted.append(index)
+        if not accepted:
+            return [BookingConflict(conflicting_ids) for conflicting_ids in outcomes]
+
+        users = {(batch[index].user_name, batch[index].user_phone) for index in accepted}
+        user_ids = {(name, phone): user_id for user_id, name, phone in await conn.execute(
+            select(User.user_id, User.name, User.phone_number).where(
+                tuple_(User.name, User.phone_number).in_(users)))}
+        new_users = [{'name': name, 'phone_number': phone} for name, phone in users if (name, phone) not in user_ids]
+        if new_users:
+            for user_id, name, phone in await conn.execute(
+                    insert(User).returning(User.user_id, User.name, User.phone_number), new_users):
+                user_ids[name, phone] = user_id
+
+        rows = [{
+            'user_id': user_ids[batch[index].user_name, batch[index].user_phone],
+            'artist_id': batch[index].artist_id,
+            'service_id': batch[index].service_id,
+            'appointment_date': batch[index].appointment_date,
+            'appointment_time': batch[index].appointment_time,
+            'start_ts': batch[index].start_ts,
+            'duration_minutes': batch[index].duration_minutes,
+        } for index in accepted]
+        appointment_ids = (await conn.scalars(
+            insert(Appointment).returning(Appointment.appointment_id, sort_by_parameter_order=True), rows)).all()
+        real_ids = {-1 - index: appointment_id for index, appointment_id in zip(accepted, appointment_ids)}
+        return [real_ids[-1 - index] if outcome is None
+                else BookingConflict(real_ids.get(appointment_id, appointment_id) for appointment_id in outcome)
+                for index, outcome in enumerate(outcomes)]
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        routes = {
+            ('GET', '/catalog'): self.get_catalog,
+            ('GET', '/slots'): self.get_slots,
+        }
+        try:
+            if (method, url.path) == ('POST', '/bookings'):
+                return await self.post_booking(body)
+            handler = routes.get((method, url.path))
+            if handler is None:
+                if url.path in ('/catalog', '/slots', '/bookings'):
+                    raise HTTPError(405, f"{method} is not allowed on {url.path}.")
+                raise HTTPError(404, f"No such endpoint: {url.path}", 'not_found')
+            return await handler({key: values[-1] for key, values in parse_qs(url.query).items()})
+        except HTTPError as e:
+            return e.status, {'error': e.code, 'message': str(e)}
+        except BookingConflict as e:
+            return 409, {'error': e.code, 'message': str(e), 'conflicting_ids': list(e.conflicting_ids)}
+        except BookingError as e:
+            return STATUS_CODES.get(e.code, 500), {'error': e.code, 'message': str(e)}
+        except OperationalError as e:
+            # Still locked after every retry
+            if is_busy(e):
+                return 503, {'error': 'busy', 'message': "The database is busy, please try again."}
+            raise
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    method, target, _ = request_line.decode('latin-1').split()
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    status, payload, keep_alive = 400, {'error': 'invalid', 'message': "Malformed request."}, False
+                else:
+                    if length > MAX_BODY_BYTES:
+                        status, payload, keep_alive = 413, {'error': 'invalid', 'message': "Body too large."}, False
+                    else:
+                        body = await reader.readexactly(length) if length else b''
+                        try:
+                            async with self._in_flight:
+                                status, payload = await self.dispatch(method, target, body)
+                        except Exception as e:
+                            print(f"Error handling {method} {target}: {e!r}")
+                            status, payload = 500, {'error': 'error', 'message': "Internal server error."}
+
+                data = json.dumps(payload).encode()
+                writer.write((f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                              f"Content-Type: application/json\r\n"
+                              f"Content-Length: {len(data)}\r\n"
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _loaded(task):
+    return task.done() and not task.cancelled() and task.exception() is None
+
+
+def _int_param(query, name, default=None):
+    if name not in query:
+        if default is None:
+            raise HTTPError(400, f"Missing {name}.")
+        return default
+    try:
+        return int(query[name])
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer.")
+
+
+def _date_param(query, name):
+    try:
+        return date.fromisoformat(query[name])
+    except KeyError:
+        raise HTTPError(400, f"Missing {name}.")
+    except ValueError:
+        raise HTTPError(400, f"{name} must be a date like 2025-06-02.")
+
+
+def prepare_database(database, profile=DEFAULT_PROFILE):
+    """Create missing tables and upgrade an older database in place, as the desktop application does."""
+    sync_engine = create_salon_engine(make_url(database).set(drivername='sqlite').render_as_string(False), profile)
+    try:
+        init_db(sync_engine)
+    finally:
+        sync_engine.dispose()
+
+
+async def serve(host, port, database, profile=DEFAULT_PROFILE, ready=None):
+    await asyncio.to_thread(prepare_database, database, profile)
+    engine = create_async_salon_engine(database, profile)
+    write_engine = create_async_salon_engine(database, profile, pool_size=1, max_overflow=0)
+    api = BookingAPI(engine, write_engine)
+    await api.load_catalog()
+    # A deep backlog so a burst of new clients is queued rather than refused
+    server = await asyncio.start_server(api.handle_connection, host, port, backlog=4096)
+    address = server.sockets[0].getsockname()
+    print(f"Serving the booking API on http://{address[0]}:{address[1]}", flush=True)
+    if ready is not None:
+        ready(address)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await engine.dispose()
+        await write_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--database', default=DATABASE_URL)
+    parser.add_argument('--profile', default='shared', choices=sorted(ENGINE_PROFILES))
+    args = parser.parse_args()
+    instrumentation.configure_from_env()
+    try:
+        asyncio.run(serve(args.host, args.port, args.database, args.profile))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
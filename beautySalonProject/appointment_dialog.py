@@ -1,6 +1,6 @@
 # Form implementation generated from reading ui file 'appointment_dialog.ui'
 #
-# Created by: PyQt6 UI code generator 6.6.1
+# Created by: PyQt6 UI code generator 6.11.0
 #
 # WARNING: Any manual changes made to this file will be lost when pyuic6 is
 # run again.  Do not edit this file unless you know what you are doing.
@@ -22,6 +22,7 @@ class Ui_Dialog(object):
         font.setBold(True)
         font.setUnderline(False)
         self.label.setFont(font)
+        self.label.setStyleSheet("color: rgb(255, 235, 249);")
         self.label.setObjectName("label")
         self.label_2 = QtWidgets.QLabel(parent=Dialog)
         self.label_2.setGeometry(QtCore.QRect(40, 100, 49, 16))
@@ -30,6 +31,7 @@ class Ui_Dialog(object):
         font.setPointSize(10)
         font.setBold(True)
         self.label_2.setFont(font)
+        self.label_2.setStyleSheet("color: rgb(255, 235, 249);")
         self.label_2.setObjectName("label_2")
         self.label_3 = QtWidgets.QLabel(parent=Dialog)
         self.label_3.setGeometry(QtCore.QRect(20, 160, 61, 16))
@@ -38,6 +40,7 @@ class Ui_Dialog(object):
         font.setPointSize(10)
         font.setBold(True)
         self.label_3.setFont(font)
+        self.label_3.setStyleSheet("color: rgb(255, 235, 249);")
         self.label_3.setObjectName("label_3")
         self.label_4 = QtWidgets.QLabel(parent=Dialog)
         self.label_4.setGeometry(QtCore.QRect(30, 220, 49, 16))
@@ -46,6 +49,7 @@ class Ui_Dialog(object):
         font.setPointSize(10)
         font.setBold(True)
         self.label_4.setFont(font)
+        self.label_4.setStyleSheet("color: rgb(255, 235, 249);")
         self.label_4.setObjectName("label_4")
         self.label_5 = QtWidgets.QLabel(parent=Dialog)
         self.label_5.setGeometry(QtCore.QRect(40, 280, 49, 16))
@@ -54,6 +58,7 @@ class Ui_Dialog(object):
         font.setPointSize(10)
         font.setBold(True)
         self.label_5.setFont(font)
+        self.label_5.setStyleSheet("color: rgb(255, 235, 249);")
         self.label_5.setObjectName("label_5")
         self.label_6 = QtWidgets.QLabel(parent=Dialog)
         self.label_6.setGeometry(QtCore.QRect(40, 340, 49, 16))
@@ -62,6 +67,7 @@ class Ui_Dialog(object):
         font.setPointSize(10)
         font.setBold(True)
         self.label_6.setFont(font)
+        self.label_6.setStyleSheet("color: rgb(255, 235, 249);")
         self.label_6.setObjectName("label_6")
         self.label_7 = QtWidgets.QLabel(parent=Dialog)
         self.label_7.setGeometry(QtCore.QRect(40, 400, 49, 16))
@@ -70,6 +76,7 @@ class Ui_Dialog(object):
         font.setPointSize(10)
         font.setBold(True)
         self.label_7.setFont(font)
+        self.label_7.setStyleSheet("color: rgb(255, 235, 249);")
         self.label_7.setObjectName("label_7")
         self.categoryComboBox = QtWidgets.QComboBox(parent=Dialog)
         self.categoryComboBox.setGeometry(QtCore.QRect(90, 150, 181, 31))
@@ -85,17 +92,57 @@ class Ui_Dialog(object):
         self.artistComboBox.setObjectName("artistComboBox")
         self.dateEdit = QtWidgets.QDateEdit(parent=Dialog)
         self.dateEdit.setGeometry(QtCore.QRect(90, 330, 181, 31))
+        self.dateEdit.setStyleSheet("color: rgb(255, 235, 249);")
         self.dateEdit.setStyleSheet("background-color: rgb(247, 242, 255);")
         self.dateEdit.setMinimumDateTime(QtCore.QDateTime(QtCore.QDate(2024, 7, 31), QtCore.QTime(23, 0, 0)))
         self.dateEdit.setMaximumDate(QtCore.QDate(2025, 12, 31))
         self.dateEdit.setMinimumDate(QtCore.QDate(2024, 7, 31))
         self.dateEdit.setObjectName("dateEdit")
-        self.timeEdit = QtWidgets.QTimeEdit(parent=Dialog)
-        self.timeEdit.setGeometry(QtCore.QRect(90, 390, 181, 31))
-        self.timeEdit.setStyleSheet("background-color: rgb(247, 242, 255);")
-        self.timeEdit.setMaximumTime(QtCore.QTime(19, 59, 59))
-        self.timeEdit.setMinimumTime(QtCore.QTime(8, 0, 0))
-        self.timeEdit.setObjectName("timeEdit")
+        self.timeComboBox = QtWidgets.QComboBox(parent=Dialog)
+        self.timeComboBox.setGeometry(QtCore.QRect(90, 390, 181, 31))
+        self.timeComboBox.setStyleSheet("background-color: rgb(247, 242, 255);")
+        self.timeComboBox.setObjectName("timeComboBox")
+        self.label_8 = QtWidgets.QLabel(parent=Dialog)
+        self.label_8.setGeometry(QtCore.QRect(310, 340, 49, 16))
+        font = QtGui.QFont()
+        font.setFamily("Rockwell")
+        font.setPointSize(10)
+        font.setBold(True)
+        self.label_8.setFont(font)
+        self.label_8.setStyleSheet("color: rgb(255, 235, 249);")
+        self.label_8.setObjectName("label_8")
+        self.repeatComboBox = QtWidgets.QComboBox(parent=Dialog)
+        self.repeatComboBox.setGeometry(QtCore.QRect(370, 330, 181, 31))
+        self.repeatComboBox.setStyleSheet("background-color: rgb(247, 242, 255);")
+        self.repeatComboBox.setObjectName("repeatComboBox")
+        self.label_9 = QtWidgets.QLabel(parent=Dialog)
+        self.label_9.setGeometry(QtCore.QRect(320, 400, 49, 16))
+        font = QtGui.QFont()
+        font.setFamily("Rockwell")
+        font.setPointSize(10)
+        font.setBold(True)
+        self.label_9.setFont(font)
+        self.label_9.setStyleSheet("color: rgb(255, 235, 249);")
+        self.label_9.setObjectName("label_9")
+        self.untilDateEdit = QtWidgets.QDateEdit(parent=Dialog)
+        self.untilDateEdit.setGeometry(QtCore.QRect(370, 390, 181, 31))
+        self.untilDateEdit.setStyleSheet("background-color: rgb(247, 242, 255);")
+        self.untilDateEdit.setEnabled(False)
+        self.untilDateEdit.setObjectName("untilDateEdit")
+        self.label_10 = QtWidgets.QLabel(parent=Dialog)
+        self.label_10.setGeometry(QtCore.QRect(310, 160, 49, 16))
+        font = QtGui.QFont()
+        font.setFamily("Rockwell")
+        font.setPointSize(10)
+        font.setBold(True)
+        self.label_10.setFont(font)
+        self.label_10.setStyleSheet("color: rgb(255, 235, 249);")
+        self.label_10.setObjectName("label_10")
+        self.serviceSearchLineEdit = QtWidgets.QLineEdit(parent=Dialog)
+        self.serviceSearchLineEdit.setGeometry(QtCore.QRect(370, 150, 181, 31))
+        self.serviceSearchLineEdit.setStyleSheet("background-color: rgb(247, 242, 255);")
+        self.serviceSearchLineEdit.setClearButtonEnabled(True)
+        self.serviceSearchLineEdit.setObjectName("serviceSearchLineEdit")
         self.phoneLineEdit = QtWidgets.QLineEdit(parent=Dialog)
         self.phoneLineEdit.setGeometry(QtCore.QRect(90, 90, 181, 31))
         self.phoneLineEdit.setStyleSheet("background-color: rgb(247, 242, 255);")
@@ -136,5 +183,9 @@ class Ui_Dialog(object):
         self.label_5.setText(_translate("Dialog", "Artist"))
         self.label_6.setText(_translate("Dialog", "Date"))
         self.label_7.setText(_translate("Dialog", "Time"))
+        self.label_8.setText(_translate("Dialog", "Repeat"))
+        self.label_9.setText(_translate("Dialog", "Until"))
+        self.label_10.setText(_translate("Dialog", "Search"))
+        self.serviceSearchLineEdit.setPlaceholderText(_translate("Dialog", "Find a service"))
         self.submitButton.setText(_translate("Dialog", "Book appointment"))
         self.cancelBtn.setText(_translate("Dialog", "Cancel"))
@@ -0,0 +1,93 @@
+import os
+import threading
+from collections import OrderedDict
+
+from PyQt6 import QtCore
+from PyQt6.QtGui import QImage, QPixmap
+
+THUMBNAIL_DIR = 'static/.thumbs'
+
+
+class PixmapCache:
+    """Decode each image once and keep scaled copies around.
+
+    Pixmaps live in a size-bounded LRU keyed by (path, width, height, keep_aspect).
+    Scaled images are also written to THUMBNAIL_DIR, named after the source file's
+    mtime, so the next start loads a small thumbnail instead of the full photo.
+    """
+
+    def __init__(self, max_items=64, thumbnail_dir=THUMBNAIL_DIR):
+        self.max_items = max_items
+        self.thumbnail_dir = thumbnail_dir
+        self._pixmaps = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def pixmap(self, path, size=None, keep_aspect=True):
+        """Return the image at path, scaled to fit size (a QSize) when given."""
+        if size is None:
+            key = (path, 0, 0, keep_aspect)
+        else:
+            key = (path, size.width(), size.height(), keep_aspect)
+
+        with self._lock:
+            pixmap = self._pixmaps.get(key)
+            if pixmap is not None:
+                self._pixmaps.move_to_end(key)
+                self.hits += 1
+                return pixmap
+            self.misses += 1
+
+        pixmap = QPixmap.fromImage(self._load(path, size, keep_aspect))
+        with self._lock:
+            self._pixmaps[key] = pixmap
+            while len(self._pixmaps) > self.max_items:
+                self._pixmaps.popitem(last=False)
+        return pixmap
+
+    def clear(self):
+        with self._lock:
+            self._pixmaps.clear()
+
+    def _thumbnail_path(self, path, size, keep_aspect):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        mtime = os.stat(path).st_mtime_ns
+        mode = 'fit' if keep_aspect else 'fill'
+        return os.path.join(self.thumbnail_dir, f'{stem}_{size.width()}x{size.height()}_{mode}_{mtime}.png')
+
+    def _load(self, path, size, keep_aspect):
+        if size is None or not os.path.exists(path):
+            return QImage(path)
+
+        thumbnail_path = self._thumbnail_path(path, size, keep_aspect)
+        if os.path.exists(thumbnail_path):
+            image = QImage(thumbnail_path)
+            if not image.isNull():
+                return image
+
+        aspect_mode = (QtCore.Qt.AspectRatioMode.KeepAspectRatio if keep_aspect
+                       else QtCore.Qt.AspectRatioMode.IgnoreAspectRatio)
+        image = QImage(path).scaled(size, aspect_mode, QtCore.Qt.TransformationMode.SmoothTransformation)
+        self._store_thumbnail(thumbnail_path, image)
+        return image
+
+    def _store_thumbnail(self, thumbnail_path, image):
+        try:
+            os.makedirs(self.thumbnail_dir, exist_ok=True)
+            # Thumbnails of an older version of the same image and size are stale now
+            prefix = os.path.basename(thumbnail_path).rsplit('_', 1)[0] + '_'
+            for name in os.listdir(self.thumbnail_dir):
+                if name.startswith(prefix):
+                    os.remove(os.path.join(self.thumbnail_dir, name))
+            image.save(thumbnail_path)
+        except OSError as e:
+            print(f"Could not store thumbnail {thumbnail_path}: {e}")
+
+
+# Shared by every window
+assets = PixmapCache()
+
+
+def pixmap(path, size=None, keep_aspect=True):
+    return assets.pixmap(path, size, keep_aspect)
@@ -0,0 +1,59 @@
+"""Bookings per second through booking.request_booking against an in-memory SQLite.
+
+Runs without Qt or a display, like a server or load-test would.
+
+    python benchmark_booking.py [--bookings 5000]
+"""
+import argparse
+import sys
+import time
+from datetime import date, time as clock, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from database_setup import Base, Artist, Service, create_salon_engine, migrate_db
+from booking import request_booking
+from catalog import CatalogCache
+from scheduling import ScheduleEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_salon_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    migrate_db(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Service).values(name='Tuns Păr Lung', category='hair'))
+        conn.execute(insert(Artist), [{'name': name, 'specialization': 'hair'} for name in ('Daria', 'Roxana', 'Maria')])
+
+    session_factory = sessionmaker(bind=engine)
+    schedule = ScheduleEngine(session_factory)
+    catalog = CatalogCache(session_factory)
+
+    def run(label, slot_for):
+        started = time.perf_counter()
+        booked = rejected = 0
+        for i in range(args.bookings):
+            artist_id, day, at = slot_for(i)
+            result = request_booking(f'Client{"abcdefghij"[i % 10]}x', f'07{i % 1000:08d}', artist_id, 1, day, at,
+                                     session_factory=session_factory, schedule=schedule, catalog=catalog)
+            if result.ok:
+                booked += 1
+            else:
+                rejected += 1
+        elapsed = time.perf_counter() - started
+        print(f'{label:15} {args.bookings / elapsed:8.0f} requests/s  ({booked} booked, {rejected} rejected)')
+
+    # Every request lands on a free slot: artist, day and a 2 hour grid from 08:00
+    run('distinct slots', lambda i: (1 + i % 3, date(2025, 1, 1) + timedelta(days=i // 18), clock(8 + 2 * (i // 3 % 6))))
+    # Every request collides with the bookings made above
+    run('conflicts', lambda i: (1 + i % 3, date(2025, 1, 1) + timedelta(days=i // 18), clock(9 + 2 * (i // 3 % 5))))
+    print('Qt loaded:', any(name.startswith('PyQt6') for name in sys.modules))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Compare engine profiles with N processes booking concurrently against one SQLite file.
+
+Each booker reads the artist's day (like the conflict check) and then inserts a
+user and an appointment in one transaction, the way several front-desk
+terminals and the kiosk share beauty_salon.db.
+
+    python benchmark_contention.py [--bookers 8] [--bookings 200] [--profiles legacy desktop shared]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, time as clock, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import OperationalError
+
+from database_setup import Base, Appointment, Artist, Service, User, create_salon_engine, to_timestamp
+
+
+def booker(args):
+    url, profile, worker, bookings = args
+    engine = create_salon_engine(url, profile)
+    latencies = []
+    locked = 0
+    for i in range(bookings):
+        day = date(2025, 1, 1) + timedelta(days=(worker * bookings + i) // 10)
+        at = clock(8 + i % 10)
+        started = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                conn.execute(select(Appointment.appointment_id).where(
+                    Appointment.artist_id == 1, Appointment.appointment_date == day)).all()
+                user_id = conn.execute(insert(User).values(
+                    name=f'Client{worker}x{i}', phone_number=f'07{worker:02d}{i:06d}')).inserted_primary_key[0]
+                conn.execute(insert(Appointment).values(
+                    user_id=user_id, artist_id=1, service_id=1, appointment_date=day, appointment_time=at,
+                    start_ts=to_timestamp(day, at), duration_minutes=119))
+        except OperationalError:
+            locked += 1
+        latencies.append(time.perf_counter() - started)
+    engine.dispose()
+    return latencies, locked
+
+
+def run_profile(profile, bookers, bookings):
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'contention.db')
+    url = f'sqlite:///{path}'
+    engine = create_salon_engine(url, profile)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Service).values(name='Pensat', category='cosmetics'))
+        conn.execute(insert(Artist).values(name='Eva', specialization='cosmetics'))
+    engine.dispose()
+
+    started = time.perf_counter()
+    with multiprocessing.Pool(bookers) as pool:
+        results = pool.map(booker, [(url, profile, worker, bookings) for worker in range(bookers)])
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for worker_latencies, _ in results for latency in worker_latencies)
+    locked = sum(worker_locked for _, worker_locked in results)
+    total = bookers * bookings
+    print(f'{profile:8} {total / elapsed:8.0f} bookings/s  '
+          f'p50 {statistics.median(latencies) * 1000:7.2f} ms  '
+          f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:8.2f} ms  '
+          f'locked {locked}/{total}')
+
+    for name in os.listdir(workdir):
+        os.remove(os.path.join(workdir, name))
+    os.rmdir(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bookers', type=int, default=8)
+    parser.add_argument('--bookings', type=int, default=200)
+    parser.add_argument('--profiles', nargs='+', default=['legacy', 'desktop', 'shared'])
+    args = parser.parse_args()
+    for profile in args.profiles:
+        run_profile(profile, args.bookers, args.bookings)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Time customer typeahead lookups on an in-memory index of many customers.
+
+Builds a CustomerIndex from generated customers (no database involved), then times
+by_name and by_phone for prefixes of the length staff type, and adding customers.
+
+    python benchmark_customers.py [--users 500000] [--queries 10000]
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from customer_index import TOP_K, CustomerIndex, fold
+
+SYLLABLES = ['an', 'ma', 'ri', 'el', 'ro', 'xa', 'io', 'da', 'la', 'ște', 'fă', 'ni', 'cu', 'ți', 'ră', 've']
+
+
+def random_customers(count, rng):
+    rows = []
+    for user_id in range(1, count + 1):
+        name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        rows.append((user_id, name, f'07{rng.randrange(10 ** 8):08d}'))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=500000)
+    parser.add_argument('--queries', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = random_customers(args.users, rng)
+    index = CustomerIndex(session_factory=None)
+    started = time.perf_counter()
+    index.install(rows)
+    build = time.perf_counter() - started
+    # Traced separately, tracing slows the build down
+    tracemalloc.start()
+    traced = CustomerIndex(session_factory=None)
+    traced.install(rows)
+    memory = tracemalloc.get_traced_memory()[0] / 2 ** 20
+    tracemalloc.stop()
+    del traced
+    print(f'{args.users} customers indexed in {build:.2f} s, {memory:.0f} MB')
+
+    # What staff type: the first 1 to 5 letters of a name, 2 to 10 digits of a phone number
+    names = [fold(name)[:rng.randint(1, 5)] for _, name, _ in rng.sample(rows, args.queries)]
+    phones = [phone[:rng.randint(2, 10)] for _, _, phone in rng.sample(rows, args.queries)]
+    for label, search, prefixes in (('name', index.by_name, names), ('phone', index.by_phone, phones)):
+        timings = []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            search(prefix)
+            timings.append((time.perf_counter() - started) * 1e6)
+        timings.sort()
+        print(f'top-{TOP_K} by {label:5}  median {statistics.median(timings):6.1f} us   '
+              f'p99 {timings[int(len(timings) * 0.99)]:6.1f} us   max {timings[-1]:7.1f} us')
+
+    added = 1000
+    started = time.perf_counter()
+    for user_id in range(args.users + 1, args.users + added + 1):
+        index.add(user_id, 'Clientnou', f'07{rng.randrange(10 ** 8):08d}')
+    print(f'add one customer  {(time.perf_counter() - started) / added * 1e6:6.1f} us')
+
+
+if __name__ == '__main__':
+    main()
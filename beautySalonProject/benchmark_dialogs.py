@@ -0,0 +1,66 @@
+"""Report cold and warm open latency of each dialog.
+
+'loadUi' is the old path (parse the .ui XML on every open), 'cold' the first
+open through the dialog factory and 'warm' the reset and re-show of the cached
+instance. Runs offscreen when no display is available.
+
+    python benchmark_dialogs.py [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+if not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication, QDialog
+from PyQt6.uic import loadUi
+
+from dialogs import DialogFactory
+from booking_dialog import AppointmentDialog
+from main import MeetTheTeam
+
+UI_FILES = {AppointmentDialog: 'appointment_dialog.ui', MeetTheTeam: 'meet_the_team.ui'}
+
+
+def open_and_close(app, dialog):
+    dialog.show()
+    app.processEvents()
+    dialog.hide()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    factory = DialogFactory()
+    for dialog_class, ui_file in UI_FILES.items():
+        load_times = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            dialog = QDialog()
+            loadUi(ui_file, dialog)
+            open_and_close(app, dialog)
+            load_times.append(time.perf_counter() - started)
+            dialog.deleteLater()
+
+        started = time.perf_counter()
+        open_and_close(app, factory.get(dialog_class))
+        cold = time.perf_counter() - started
+
+        warm_times = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            open_and_close(app, factory.get(dialog_class))
+            warm_times.append(time.perf_counter() - started)
+
+        print(f'{dialog_class.__name__:18} loadUi {statistics.median(load_times) * 1000:7.2f} ms  '
+              f'cold {cold * 1000:7.2f} ms  warm {statistics.median(warm_times) * 1000:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Time a month-wide find_free_slots search across all artists.
+
+Builds a throwaway SQLite database with synthetic appointments, warms the
+schedule engine and reports the search latency.
+
+    python benchmark_free_slots.py [--appointments 100000] [--artists 12]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from database_setup import Base, Appointment, Artist, Service, to_timestamp
+from scheduling import APPOINTMENT_BLOCK, ScheduleEngine
+
+
+def build_database(path, appointments, artists):
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    rng = random.Random(7)
+    first_day = date(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Service), [{'name': 'Tuns Păr Lung', 'category': 'hair'}])
+        conn.execute(insert(Artist), [{'name': f'Artist{i}', 'specialization': 'hair'} for i in range(artists)])
+        rows = []
+        for _ in range(appointments):
+            day = first_day + timedelta(days=rng.randrange(730))
+            start = datetime.combine(day, datetime.min.time()) + timedelta(hours=8, minutes=30 * rng.randrange(23))
+            rows.append({
+                'user_id': 1, 'artist_id': rng.randint(1, artists), 'service_id': 1,
+                'appointment_date': day, 'appointment_time': start.time(),
+                'start_ts': to_timestamp(day, start.time()),
+                'duration_minutes': APPOINTMENT_BLOCK.seconds // 60,
+            })
+        conn.execute(insert(Appointment), rows)
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--appointments', type=int, default=100000)
+    parser.add_argument('--artists', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'slots.db')
+    try:
+        engine = build_database(path, args.appointments, args.artists)
+        session_factory = sessionmaker(bind=engine)
+        service = session_factory().query(Service).first()
+        artist_ids = list(range(1, args.artists + 1))
+        month = (date(2024, 6, 1), date(2024, 6, 30))
+
+        schedule = ScheduleEngine(session_factory)
+        started = time.perf_counter()
+        schedule.find_free_slots(artist_ids, service, month)
+        cold = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            slots = schedule.find_free_slots(artist_ids, service, month)
+        warm = (time.perf_counter() - started) / args.repeat * 1000
+
+        total = sum(len(artist_slots) for artist_slots in slots.values())
+        print(f'{args.appointments} appointments, {args.artists} artists, {total} free slots in June')
+        print(f'cold search (loads calendars): {cold:8.2f} ms')
+        print(f'warm search:                   {warm:8.2f} ms')
+        engine.dispose()
+    finally:
+        os.remove(path)
+        os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
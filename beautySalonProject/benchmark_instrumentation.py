@@ -0,0 +1,76 @@
+"""Measure what instrumentation costs per statement and per UI action, off and on.
+
+Runs a user lookup against an in-memory database with instrumentation disabled,
+then enabled, and prints the slow query log entry captured for a deliberately
+slow query.
+
+    python benchmark_instrumentation.py [--queries 20000]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import insert, select, text
+
+import instrumentation
+from database_setup import Base, User, create_salon_engine
+
+
+def time_queries(engine, queries):
+    with engine.connect() as conn:
+        statement = select(User.user_id).where(User.name == 'Client5', User.phone_number == '0700000005')
+        started = time.perf_counter()
+        for _ in range(queries):
+            conn.execute(statement).scalar()
+        return (time.perf_counter() - started) / queries
+
+
+def time_actions(count):
+    started = time.perf_counter()
+    for _ in range(count):
+        instrumentation.finish_action(instrumentation.start_action('submit'))
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries', type=int, default=20000)
+    args = parser.parse_args()
+
+    engine = create_salon_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'name': f'Client{i}', 'phone_number': f'07{i:08d}'} for i in range(10000)])
+
+    time_queries(engine, 1000)
+    disabled = time_queries(engine, args.queries)
+    disabled_action = time_actions(args.queries)
+
+    slow_log = os.path.join(tempfile.mkdtemp(), 'slow_queries.jsonl')
+    instrumentation.enable(slow_ms=5, slow_log=slow_log, engine=engine)
+    enabled = time_queries(engine, args.queries)
+    enabled_action = time_actions(args.queries)
+
+    # A cross join big enough to cross the 5 ms threshold
+    with engine.connect() as conn:
+        conn.execute(text('SELECT count(*) FROM "Users" a, "Users" b '
+                          'WHERE a.user_id < 500 AND a.user_id % 97 = b.user_id % 89')).scalar()
+    instrumentation.disable()
+
+    print(f'statement, disabled: {disabled * 1e6:7.2f} us')
+    print(f'statement, enabled:  {enabled * 1e6:7.2f} us  (+{(enabled - disabled) * 1e6:.2f} us)')
+    print(f'UI action, disabled: {disabled_action * 1e9:7.0f} ns')
+    print(f'UI action, enabled:  {enabled_action * 1e9:7.0f} ns')
+    print('slowest statements:')
+    for statement, summary in list(instrumentation.snapshot()['statements'].items())[:3]:
+        print(f'  {summary["count"]:6d} x  p50 {summary["p50_ms"]:8.3f} ms  p99 {summary["p99_ms"]:8.3f} ms  '
+              f'{" ".join(statement.split())[:70]}')
+    with open(slow_log, encoding='utf-8') as file:
+        entry = json.loads(file.readline())
+    print(f'slow query log: {entry["ms"]} ms, plan {entry.get("plan")}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Time plan_itinerary for multi-service visits over a two-week horizon.
+
+Uses a cached synthetic salon (see benchmark_suite.py) and plans within its generated
+history, where the artists' days are 70% booked, so the search has to work around
+existing bookings. Cold includes loading the calendars, warm reuses them.
+
+    python benchmark_itinerary.py [--services 4] [--days 14] [--starts 20] [--cache-dir DIR]
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmark_suite import CACHE_DIR, prepare_salon
+from catalog import CatalogCache
+from database_setup import Service, create_salon_engine
+from itinerary import PLAN_OPTIONS, plan_itinerary
+from scheduling import ScheduleEngine
+from synthetic_data import SalonSpec
+
+# Hair twice, so two services of one category have to follow each other
+CATEGORIES = ('hair', 'nails', 'cosmetics', 'hair')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--services', type=int, default=4)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--starts', type=int, default=20, help='planned visits, each from another day')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    path = prepare_salon(SalonSpec(), args.cache_dir)
+    engine = create_salon_engine(f'sqlite:///{path}')
+    session_factory = sessionmaker(bind=engine)
+    with engine.connect() as conn:
+        by_category = {}
+        for service_id, category in conn.execute(select(Service.service_id, Service.category)
+                                                 .order_by(Service.service_id)):
+            by_category.setdefault(category, []).append(service_id)
+        last_day = date.fromisoformat(conn.execute(text('SELECT max(appointment_date) FROM "Appointments"')).scalar())
+
+    rng = random.Random(args.seed)
+    catalog = CatalogCache(session_factory)
+    schedule = ScheduleEngine(session_factory)
+    visits = []
+    for _ in range(args.starts):
+        service_ids = []
+        for i in range(args.services):
+            choices = [s for s in by_category[CATEGORIES[i % len(CATEGORIES)]] if s not in service_ids]
+            service_ids.append(rng.choice(choices))
+        first_date = last_day - timedelta(days=rng.randrange(30, 700))
+        visits.append((service_ids, first_date))
+
+    modes = {'parallel': dict(parallel=True), 'sequential': dict(parallel=False),
+             'in order': dict(parallel=False, in_order=True)}
+    started = time.perf_counter()
+    plan_itinerary(*visits[0], schedule=schedule, catalog=catalog)
+    cold = (time.perf_counter() - started) * 1000
+    print(f'{args.services} services, {args.days} days, {args.starts} visits; '
+          f'first plan with calendar loads {cold:.1f} ms')
+
+    for label, mode in modes.items():
+        timings = []
+        found = 0
+        for service_ids, first_date in visits:
+            started = time.perf_counter()
+            options = plan_itinerary(service_ids, first_date, args.days, schedule=schedule, catalog=catalog, **mode)
+            timings.append((time.perf_counter() - started) * 1000)
+            found += len(options)
+            # The pruned best option must match a search that keeps every option it finds
+            wide = plan_itinerary(service_ids, first_date, args.days, options=200, schedule=schedule,
+                                  catalog=catalog, **mode)
+            if options and options[0].end != wide[0].end:
+                raise SystemExit(f'{label}: pruning lost the best option for {service_ids} from {first_date}')
+        print(f'{label:10}  median {statistics.median(timings):6.1f} ms   max {max(timings):6.1f} ms   '
+              f'{found / len(visits):.1f} of {PLAN_OPTIONS} options per visit')
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Show the query plans and timings of the booking lookups before and after migrate_db.
+
+Works on a temporary copy of beauty_salon.db padded with synthetic appointments,
+the real database is never modified.
+
+    python benchmark_query_plans.py [--appointments 200000]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from database_setup import migrate_db
+
+QUERIES = {
+    'conflict lookup': (
+        'SELECT * FROM "Appointments" WHERE artist_id = ? AND appointment_date = ?',
+        (1, '2024-07-31')
+    ),
+    'overlap range': (
+        'SELECT appointment_id FROM "Appointments" WHERE artist_id = ? AND start_ts > ? AND start_ts < ?',
+        (1, 1722412800 - 119 * 60, 1722412800 + 119 * 60)
+    ),
+    'user lookup': (
+        'SELECT * FROM "Users" WHERE name = ? AND phone_number = ?',
+        ('Maria', '0733444777')
+    ),
+    'service lookup': (
+        'SELECT * FROM "Services" WHERE name = ?',
+        ('Pensat',)
+    ),
+}
+
+
+def pad_database(conn, appointments):
+    """Add synthetic users and appointments so full scans become visible."""
+    rng = random.Random(42)
+    conn.executemany(
+        'INSERT INTO "Users" (name, phone_number) VALUES (?, ?)',
+        ((f'Client{i}', f'07{i:08d}') for i in range(appointments // 4))
+    )
+    conn.executemany(
+        'INSERT INTO "Appointments" (user_id, artist_id, service_id, appointment_date, appointment_time) '
+        'VALUES (?, ?, ?, ?, ?)',
+        ((rng.randint(1, appointments // 4), rng.randint(1, 12), rng.randint(1, 45),
+          f'20{rng.randint(20, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+          f'{rng.randint(8, 18):02d}:00:00.000000')
+         for _ in range(appointments))
+    )
+    conn.commit()
+
+
+def report(conn, label, repeat=50):
+    print(f'== {label}')
+    for name, (sql, params) in QUERIES.items():
+        try:
+            plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+        except sqlite3.OperationalError as e:
+            print(f'{name:16} n/a ({e})')
+            continue
+        started = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, params).fetchall()
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+        print(f'{name:16} {elapsed:8.3f} ms  {"; ".join(plan)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default='beauty_salon.db')
+    parser.add_argument('--appointments', type=int, default=200000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'beauty_salon.db')
+    shutil.copy(args.database, path)
+    try:
+        conn = sqlite3.connect(path)
+        pad_database(conn, args.appointments)
+        report(conn, 'before migration')
+        conn.close()
+
+        engine = create_engine(f'sqlite:///{path}')
+        migrate_db(engine)
+        engine.dispose()
+
+        conn = sqlite3.connect(path)
+        report(conn, 'after migration')
+        conn.close()
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Compare the DailySummary reports with aggregating the appointments on every request.
+
+Generates (once, cached like benchmark_suite.py) a synthetic salon of --appointments
+bookings, then times a month of per-artist, per-day occupancy and a year of per-artist
+totals three ways: from DailySummary, with a GROUP BY over "Appointments", and by
+summing get_appointment_details() rows in Python. Also shows what the summary
+trigger adds to a booking.
+
+    python benchmark_reports.py [--appointments 10000000] [--artists 400] [--cache-dir DIR]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, time as clock_time, timedelta
+
+from sqlalchemy import insert, text
+
+from benchmark_suite import CACHE_DIR, prepare_salon
+from database_setup import Appointment, create_salon_engine, get_appointment_details, rebuild_daily_summary, to_timestamp
+from reports import artist_days, artist_totals
+from synthetic_data import SalonSpec
+
+# The same numbers as artist_days, straight from the appointments
+SCAN_DAYS = text(
+    'SELECT a.appointment_date, a.artist_id, COALESCE(s.category, \'\'), count(*), sum(a.duration_minutes), '
+    'min(a.start_ts), max(a.end_ts) '
+    'FROM "Appointments" a LEFT JOIN "Services" s ON s.service_id = a.service_id '
+    'WHERE a.appointment_date BETWEEN :first AND :last AND a.start_ts IS NOT NULL '
+    'GROUP BY a.appointment_date, a.artist_id, COALESCE(s.category, \'\')'
+)
+SCAN_TOTALS = text(
+    'SELECT artist_id, count(DISTINCT appointment_date), count(*), sum(duration_minutes) FROM "Appointments" '
+    'WHERE appointment_date BETWEEN :first AND :last AND start_ts IS NOT NULL GROUP BY artist_id'
+)
+
+
+def timed(function, repeat):
+    function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def python_days(first, last, bind):
+    """Per artist-day counts the way a caller of get_appointment_details has to compute them."""
+    days = {}
+    for row in get_appointment_details(start_date=first, end_date=last, bind=bind):
+        key = row['appointment_date'], row['artist_name'], row['category']
+        days[key] = days.get(key, 0) + 1
+    return days
+
+
+def booking_cost(engine, bookings, day, with_trigger):
+    """Milliseconds per single-row booking transaction, with or without the summary insert trigger."""
+    with engine.begin() as conn:
+        if not with_trigger:
+            statement = conn.execute(text(
+                "SELECT sql FROM sqlite_master WHERE name = 'appointments_summary_insert'")).scalar()
+            conn.execute(text('DROP TRIGGER appointments_summary_insert'))
+    # 30-minute bookings back to back from 08:00, 20 per artist
+    starts = [datetime.combine(day, clock_time(8)) + timedelta(minutes=30 * (i % 20)) for i in range(bookings)]
+    started = time.perf_counter()
+    for i, start in enumerate(starts):
+        with engine.begin() as conn:
+            conn.execute(insert(Appointment), {
+                'user_id': 1, 'artist_id': 1 + i // 20, 'service_id': 1, 'appointment_date': day,
+                'appointment_time': start.time(), 'start_ts': to_timestamp(day, start.time()), 'duration_minutes': 30})
+    elapsed = (time.perf_counter() - started) / bookings * 1000
+    if not with_trigger:
+        with engine.begin() as conn:
+            conn.execute(text(statement))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--appointments', type=int, default=10000000)
+    parser.add_argument('--artists', type=int, default=400)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    spec = SalonSpec(artists=args.artists, users=args.appointments // 10, appointments=args.appointments)
+    path = prepare_salon(spec, args.cache_dir)
+    engine = create_salon_engine(f'sqlite:///{path}')
+    with engine.connect() as conn:
+        last_day = conn.execute(text('SELECT max(day) FROM "DailySummary"')).scalar()
+        summary_rows = conn.execute(text('SELECT count(*) FROM "DailySummary"')).scalar()
+    last_day = date.fromisoformat(last_day)
+    month = (last_day.replace(day=1), last_day)
+    year = (last_day - timedelta(days=365), last_day)
+    print(f'{args.appointments} appointments, {args.artists} artists, {summary_rows} summary rows, '
+          f'last day {last_day}')
+
+    month_summary = timed(lambda: artist_days(*month, bind=engine), args.repeat)
+    with engine.connect() as conn:
+        month_scan = timed(lambda: conn.execute(SCAN_DAYS, {'first': month[0], 'last': month[1]}).all(), args.repeat)
+        year_scan = timed(lambda: conn.execute(SCAN_TOTALS, {'first': year[0], 'last': year[1]}).all(), args.repeat)
+    year_summary = timed(lambda: artist_totals(*year, bind=engine), args.repeat)
+    month_python = timed(lambda: python_days(*month, engine), 1)
+    print(f'month of artist-days   summary {month_summary:9.1f} ms   GROUP BY scan {month_scan:9.1f} ms   '
+          f'get_appointment_details {month_python:9.1f} ms')
+    print(f'year of artist totals  summary {year_summary:9.1f} ms   GROUP BY scan {year_scan:9.1f} ms')
+
+    # Booking cost on a scratch copy, so the cached salon stays untouched
+    workdir = tempfile.mkdtemp()
+    try:
+        copy = os.path.join(workdir, 'copy.db')
+        shutil.copy(path, copy)
+        scratch = create_salon_engine(f'sqlite:///{copy}')
+        day = last_day + timedelta(days=30)
+        # The first run pays for reading the indexes into the cache
+        booking_cost(scratch, 240, day, True)
+        without = booking_cost(scratch, 240, day + timedelta(days=1), False)
+        with_trigger = booking_cost(scratch, 240, day + timedelta(days=2), True)
+        started = time.perf_counter()
+        with scratch.begin() as conn:
+            rebuild_daily_summary(conn)
+        rebuild = time.perf_counter() - started
+        scratch.dispose()
+        print(f'booking transaction    without trigger {without:6.3f} ms   with trigger {with_trigger:6.3f} ms')
+        print(f'full rebuild           {rebuild:6.1f} s')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Time booking a recurring series at once against one book_appointment call per occurrence.
+
+Uses a cached synthetic salon (see benchmark_suite.py) so the artist's calendar is as
+full as in a busy salon, and books on scratch copies of it. Both ways must end up
+booking the same occurrences.
+
+    python benchmark_series.py [--weeks 52] [--every 1] [--at 10:00] [--cache-dir DIR]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, time as clock_time, timedelta
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmark_suite import CACHE_DIR, prepare_salon
+from booking import BookingConflict, Recurrence, book_appointment, book_series, occurrence_dates
+from database_setup import Appointment, Artist, Service, create_salon_engine
+from scheduling import ScheduleEngine, appointment_length
+from synthetic_data import SalonSpec
+
+
+def scratch_copy(path, workdir, name):
+    copy = os.path.join(workdir, name)
+    shutil.copy(path, copy)
+    engine = create_salon_engine(f'sqlite:///{copy}')
+    return engine, sessionmaker(bind=engine)
+
+
+def warm_up(session_factory, schedule, service, length, last_day):
+    """One booking far away from the timed ones, so statement compilation is not timed."""
+    book_appointment('Clientwarmup', '0700000000', 2, service.service_id, last_day + timedelta(days=3000),
+                     clock_time(8), session_factory, schedule, length)
+    schedule.shifts.hours(2, last_day + timedelta(days=3000), last_day + timedelta(days=3000))
+
+
+def run_series(path, workdir, artist_id, service, length, first_date, at, rule, last_day):
+    engine, session_factory = scratch_copy(path, workdir, 'series.db')
+    schedule = ScheduleEngine(session_factory)
+    warm_up(session_factory, schedule, service, length, last_day)
+    started = time.perf_counter()
+    result = book_series('Clientseries', '0712345678', artist_id, service.service_id, first_date, at, rule,
+                         session_factory, schedule, length)
+    elapsed = (time.perf_counter() - started) * 1000
+    engine.dispose()
+    return result, elapsed
+
+
+def run_single(path, workdir, artist_id, service, length, first_date, at, rule, last_day):
+    engine, session_factory = scratch_copy(path, workdir, 'single.db')
+    schedule = ScheduleEngine(session_factory)
+    warm_up(session_factory, schedule, service, length, last_day)
+    booked = []
+    started = time.perf_counter()
+    for day in occurrence_dates(first_date, rule):
+        try:
+            booked.append((day, book_appointment('Clientseries', '0712345678', artist_id, service.service_id, day,
+                                                 at, session_factory, schedule, length)))
+        except BookingConflict:
+            pass
+    elapsed = (time.perf_counter() - started) * 1000
+    engine.dispose()
+    return booked, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--weeks', type=int, default=52, help='occurrences in the series')
+    parser.add_argument('--every', type=int, default=1, help='weeks between occurrences')
+    parser.add_argument('--at', type=clock_time.fromisoformat, default=clock_time(10))
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    path = prepare_salon(SalonSpec(), args.cache_dir)
+    engine = create_salon_engine(f'sqlite:///{path}')
+    with engine.connect() as conn:
+        service = conn.execute(select(Service).where(Service.name == 'Întreținere Manichiură')).one()
+        artist_id = conn.execute(select(Artist.artist_id).where(Artist.specialization == service.category)
+                                 .order_by(Artist.artist_id)).scalars().first()
+        last_day = date.fromisoformat(conn.execute(text('SELECT max(appointment_date) FROM "Appointments"')).scalar())
+        existing = conn.execute(select(func.count()).where(Appointment.artist_id == artist_id)).scalar()
+    engine.dispose()
+    length = appointment_length(service)
+    rule = Recurrence('weekly', args.every, count=args.weeks)
+    print(f'{service.name} ({length.seconds // 60} min) every {args.every} week(s) at {args.at:%H:%M}, '
+          f'{args.weeks} times, artist {artist_id} with {existing} bookings')
+
+    # After the generated history the calendar is empty, within it the artist's days are 70% booked
+    scenarios = {'free weeks': last_day + timedelta(days=7),
+                 'busy weeks': last_day - timedelta(weeks=args.weeks * args.every)}
+    workdir = tempfile.mkdtemp()
+    try:
+        for label, first_date in scenarios.items():
+            result, series_ms = run_series(path, workdir, artist_id, service, length, first_date, args.at, rule,
+                                           last_day)
+            booked, single_ms = run_single(path, workdir, artist_id, service, length, first_date, args.at, rule,
+                                           last_day)
+            with_alternatives = sum(1 for conflict in result.conflicts if conflict.alternatives)
+            print(f'{label} from {first_date}: {len(result.booked)} booked, {len(result.conflicts)} taken '
+                  f'({with_alternatives} with alternatives)')
+            print(f'  book_series          {series_ms:8.1f} ms')
+            print(f'  book_appointment x{args.weeks:<3} {single_ms:8.1f} ms')
+            if [start.date() for start, _ in result.booked] != [day for day, _ in booked]:
+                raise SystemExit('book_series and book_appointment booked different occurrences')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
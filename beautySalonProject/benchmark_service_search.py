@@ -0,0 +1,82 @@
+"""Time service search lookups on the in-memory index against scanning every name.
+
+Builds a ServiceSearch over generated service catalogs (the default services plus
+variants, see synthetic_data.py, no database involved), times what staff type
+keystroke by keystroke against folding and scanning every name per keystroke, and
+re-syncing after a few renames against rebuilding the index.
+
+    python benchmark_service_search.py [--services 45 1000 10000] [--repeat 20]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from catalog import ServiceRecord
+from customer_index import fold
+from service_search import ServiceSearch, words
+from synthetic_data import _services
+
+# Typed without diacritics, some with a typo
+QUERIES = ['intretinere pedichiura', 'pedichura semipermanenta', 'epilare ceara axile', 'tuns par lung',
+           'coafat ocazie', 'sedinta tatuaj', 'manichiura gel', 'machiaj mireasa', 'vopsit mediu premium']
+
+
+def keystrokes(queries):
+    """Every prefix of every query, as the search box sees them."""
+    return [query[:length] for query in queries for length in range(1, len(query) + 1)]
+
+
+def scan(services, text):
+    """Services whose folded name contains every query word, the search without an index."""
+    query = words(text)
+    return [service for service in services if all(word in fold(service.name) for word in query)]
+
+
+def timed(function, texts):
+    timings = []
+    for text in texts:
+        started = time.perf_counter()
+        function(text)
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--services', type=int, nargs='+', default=[45, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    texts = keystrokes(QUERIES)
+    for count in args.services:
+        services = [ServiceRecord(row['service_id'], row['name'], row['category'], row['duration_minutes'],
+                                  row['buffer_minutes']) for row in _services(count)]
+        index = ServiceSearch(catalog=None)
+        started = time.perf_counter()
+        index.sync(services)
+        build = (time.perf_counter() - started) * 1000
+
+        indexed = timed(index.search, texts * args.repeat)
+        scanned = timed(lambda text: scan(services, text), texts)
+        print(f'{count:6} services  build {build:7.1f} ms   per keystroke: index median {indexed[0]:7.1f} us '
+              f'p99 {indexed[1]:7.1f} us   scan median {scanned[0]:8.1f} us p99 {scanned[1]:8.1f} us')
+
+        # A catalog change renaming a few services
+        renamed = list(services)
+        for position in rng.sample(range(count), min(5, count)):
+            renamed[position] = renamed[position]._replace(name=renamed[position].name + ' Nou')
+        started = time.perf_counter()
+        changed = index.sync(renamed)
+        sync = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        ServiceSearch(catalog=None).sync(renamed)
+        rebuild = (time.perf_counter() - started) * 1000
+        print(f'{"":6}           after {changed // 2} renames: sync {sync:6.2f} ms   rebuild {rebuild:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
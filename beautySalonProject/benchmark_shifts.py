@@ -0,0 +1,192 @@
+"""Compare shift templates with one Availability row per artist, date and slot.
+
+Gives every artist of a cached synthetic salon (see benchmark_suite.py) a weekly pattern,
+public holidays, sick days and a leave, then stores the same year of working hours
+as 15-minute Availability rows. Times reading a month of hours both ways, checking a
+booking against them, and a month-wide find_free_slots search.
+
+    python benchmark_shifts.py [--artists 12] [--slot-minutes 15] [--repeat 20] [--cache-dir DIR]
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, time as clock_time, timedelta
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmark_suite import CACHE_DIR, prepare_salon
+from database_setup import (Artist, Availability, Service, ShiftException, ShiftTemplate, create_salon_engine,
+                            migrate_db)
+from scheduling import ScheduleEngine, ShiftCalendar, ShiftChange, WeeklyShift, expand_hours
+from synthetic_data import SalonSpec
+
+# (weekday, start, end) patterns handed out in turn, the last one a split shift
+PATTERNS = [
+    [(weekday, clock_time(9), clock_time(17)) for weekday in range(5)],
+    [(weekday, clock_time(12), clock_time(21)) for weekday in range(1, 6)],
+    [(weekday, start, end) for weekday in (0, 2, 4, 5)
+     for start, end in ((clock_time(8), clock_time(12)), (clock_time(14), clock_time(19)))],
+]
+HOLIDAYS = [(1, 1), (1, 2), (1, 24), (5, 1), (6, 1), (8, 15), (11, 30), (12, 1), (12, 25), (12, 26)]
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def add_shifts(engine, artist_ids, year, rng):
+    """Templates and exceptions for every artist, returns {artist_id: (shifts, changes)}."""
+    templates = []
+    exceptions = [{'artist_id': None, 'first_date': date(year, month, day), 'last_date': date(year, month, day),
+                   'start_time': None, 'end_time': None, 'kind': 'holiday'} for month, day in HOLIDAYS]
+    for index, artist_id in enumerate(artist_ids):
+        templates += [{'artist_id': artist_id, 'weekday': weekday, 'start_time': start, 'end_time': end}
+                      for weekday, start, end in PATTERNS[index % len(PATTERNS)]]
+        sick = date(year, 1, 1) + timedelta(days=rng.randrange(365))
+        leave = date(year, 1, 1) + timedelta(days=rng.randrange(340))
+        exceptions += [
+            {'artist_id': artist_id, 'first_date': sick, 'last_date': sick + timedelta(days=2), 'start_time': None,
+             'end_time': None, 'kind': 'sick'},
+            {'artist_id': artist_id, 'first_date': leave, 'last_date': leave + timedelta(days=13),
+             'start_time': None, 'end_time': None, 'kind': 'leave'},
+        ]
+    with engine.begin() as conn:
+        conn.execute(insert(ShiftTemplate), templates)
+        conn.execute(insert(ShiftException), exceptions)
+
+    shifts = {}
+    for artist_id in artist_ids:
+        shifts[artist_id] = (
+            [WeeklyShift(row['weekday'], row['start_time'], row['end_time'], None, None)
+             for row in templates if row['artist_id'] == artist_id],
+            [ShiftChange(row['first_date'], row['last_date'], row['start_time'], row['end_time'], row['kind'])
+             for row in exceptions if row['artist_id'] in (None, artist_id)])
+    return shifts, len(templates) + len(exceptions)
+
+
+def add_slots(engine, shifts, year, slot):
+    """The same working hours as one Availability row per slot start."""
+    rows = []
+    for artist_id, (weekly, changes) in shifts.items():
+        for day, hours in expand_hours(date(year, 1, 1), date(year, 12, 31), weekly, changes).items():
+            for start, end in hours:
+                while start + slot <= end:
+                    rows.append({'artist_id': artist_id, 'available_date': day, 'available_time': start.time()})
+                    start += slot
+    with engine.begin() as conn:
+        conn.execute(insert(Availability), rows)
+    return len(rows)
+
+
+def slot_rows_month(engine, artist_ids, month):
+    """What find_free_slots read per search before shift templates."""
+    allowed = {}
+    with engine.connect() as conn:
+        for artist_id, available_date, available_time in conn.execute(select(
+                Availability.artist_id, Availability.available_date, Availability.available_time
+        ).where(Availability.artist_id.in_(artist_ids), Availability.available_date.between(*month))):
+            allowed.setdefault((artist_id, available_date), set()).add(
+                datetime.combine(available_date, available_time))
+    return allowed
+
+
+def slot_check(engine, artist_id, start, length, slot):
+    """Whether every slot of the booking has an Availability row."""
+    needed = length // slot
+    with engine.connect() as conn:
+        found = conn.execute(select(func.count()).where(
+            Availability.artist_id == artist_id,
+            Availability.available_date == start.date(),
+            Availability.available_time.between(start.time(), (start + length - slot).time())
+        )).scalar()
+    return found == needed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--artists', type=int, default=12)
+    parser.add_argument('--slot-minutes', type=int, default=15)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    path = prepare_salon(SalonSpec(artists=args.artists), args.cache_dir)
+    workdir = tempfile.mkdtemp()
+    try:
+        copy = os.path.join(workdir, 'shifts.db')
+        shutil.copy(path, copy)
+        engine = create_salon_engine(f'sqlite:///{copy}')
+        migrate_db(engine)
+        session_factory = sessionmaker(bind=engine)
+        with engine.connect() as conn:
+            artist_ids = conn.execute(select(Artist.artist_id).order_by(Artist.artist_id)).scalars().all()
+            service = conn.execute(select(Service).where(Service.category == 'hair')
+                                   .order_by(Service.service_id)).first()
+            last_day = date.fromisoformat(conn.execute(text('SELECT max(appointment_date) FROM "Appointments"'))
+                                          .scalar())
+        # A month inside the generated history, so the calendars are busy too
+        first = (last_day - timedelta(days=60)).replace(day=1)
+        month = (first, (first + timedelta(days=31)).replace(day=1) - timedelta(days=1))
+        year = first.year
+        slot = timedelta(minutes=args.slot_minutes)
+        shifts, shift_rows = add_shifts(engine, artist_ids, year, random.Random(42))
+        size = os.path.getsize(copy)
+        started = time.perf_counter()
+        slot_rows = add_slots(engine, shifts, year, slot)
+        fill = time.perf_counter() - started
+        growth = (os.path.getsize(copy) - size) / 2 ** 20
+        print(f'{len(artist_ids)} artists, one year: {shift_rows} shift rows vs {slot_rows} slot rows '
+              f'({fill:.1f} s and {growth:.1f} MB to write)')
+
+        slot_read = timed(lambda: slot_rows_month(engine, artist_ids, month), args.repeat)
+
+        def cold():
+            calendar = ShiftCalendar(session_factory)
+            for artist_id in artist_ids:
+                calendar.hours(artist_id, *month)
+        warm_calendar = ShiftCalendar(session_factory)
+        shift_cold = timed(cold, args.repeat)
+        for artist_id in artist_ids:
+            warm_calendar.hours(artist_id, *month)
+        shift_warm = timed(lambda: [warm_calendar.hours(artist_id, *month) for artist_id in artist_ids], args.repeat)
+        print(f'month of hours, all artists   slot rows {slot_read:7.2f} ms   shifts cold {shift_cold:7.2f} ms   '
+              f'warm {shift_warm:7.3f} ms')
+
+        length = timedelta(minutes=60)
+        checks = [(artist_ids[i % len(artist_ids)], datetime.combine(month[0] + timedelta(days=i % 28),
+                                                                     clock_time(8 + i % 11)))
+                  for i in range(200)]
+        agree = sum(slot_check(engine, artist_id, start, length, slot) == warm_calendar.is_open(
+            artist_id, start, start + length) for artist_id, start in checks)
+        if agree != len(checks):
+            raise SystemExit(f'slot rows and shifts disagree on {len(checks) - agree} of {len(checks)} checks')
+        slot_checks = timed(lambda: [slot_check(engine, a, s, length, slot) for a, s in checks], 3) / len(checks)
+        shift_checks = timed(lambda: [warm_calendar.is_open(a, s, s + length) for a, s in checks],
+                             args.repeat) / len(checks)
+        print(f'booking check                 slot rows {slot_checks * 1000:7.1f} us   '
+              f'shifts {shift_checks * 1000:7.1f} us')
+
+        schedule = ScheduleEngine(session_factory)
+        started = time.perf_counter()
+        slots = schedule.find_free_slots(None, service, month)
+        loading = (time.perf_counter() - started) * 1000
+        search = timed(lambda: schedule.find_free_slots(None, service, month), args.repeat)
+        print(f'find_free_slots, a month      first {loading:7.1f} ms (loads calendars and shifts)   '
+              f'then {search:7.2f} ms   ({len(slots)} artists)')
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Measure time to first frame of the main window and fail when it is over budget.
+
+Launches the application in a child interpreter with -X importtime, waits for the
+first paint of MainWindow and reports the wall time, the slowest imports and
+whether heavy modules were loaded before the first frame.
+
+    python benchmark_startup.py [--budget-ms 1000] [--runs 3]
+
+Exits with status 1 when the median time to first frame exceeds the budget or
+SQLAlchemy was imported before the first frame.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = '''
+import sys
+from PyQt6.QtCore import QObject, QEvent
+from PyQt6.QtWidgets import QApplication
+from main import MainWindow
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            print('FIRST_FRAME', 'sqlalchemy' in sys.modules, flush=True)
+            QApplication.instance().exit(0)
+        return False
+
+app = QApplication(sys.argv)
+window = MainWindow()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+app.exec()
+'''
+
+# Modules that must not be imported before the first frame
+DEFERRED_MODULES = ['sqlalchemy']
+
+
+def run_once():
+    env = dict(os.environ)
+    if not env.get('DISPLAY') and not env.get('WAYLAND_DISPLAY'):
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    started = time.perf_counter()
+    child = subprocess.Popen([sys.executable, '-X', 'importtime', '-c', CHILD], env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    elapsed = None
+    heavy_loaded = None
+    for line in child.stdout:
+        if line.startswith('FIRST_FRAME'):
+            elapsed = time.perf_counter() - started
+            heavy_loaded = line.split()[1] == 'True'
+    importtime = child.stderr.read()
+    child.wait()
+    if elapsed is None:
+        raise SystemExit(f'application did not paint a frame:\n{importtime[-2000:]}')
+    return elapsed, heavy_loaded, importtime
+
+
+def slowest_imports(importtime, count=10):
+    imports = []
+    for line in importtime.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):  # top-level imports only
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=1000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    median = statistics.median(elapsed for elapsed, _, _ in results) * 1000
+    heavy_loaded = any(loaded for _, loaded, _ in results)
+
+    print('slowest top-level imports before the first frame:')
+    for cumulative, name in slowest_imports(results[-1][2]):
+        print(f'  {cumulative / 1000:8.1f} ms  {name}')
+    print(f'time to first frame: {median:.0f} ms (budget {args.budget_ms:.0f} ms)')
+
+    failed = False
+    if median > args.budget_ms:
+        print('FAIL: time to first frame is over budget')
+        failed = True
+    if heavy_loaded:
+        print(f'FAIL: one of {DEFERRED_MODULES} was imported before the first frame')
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
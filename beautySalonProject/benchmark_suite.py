@@ -0,0 +1,419 @@
+"""Micro and macro benchmarks over a seeded synthetic salon, with JSON output.
+
+The salon is generated by synthetic_data.py and cached by its spec, so repeated
+runs (e.g. on different commits) measure the same data. Results are written as
+JSON and can be compared against a previous run to catch regressions.
+
+    python benchmark_suite.py [--scale small|medium|large] [--output results.json]
+                              [--compare baseline.json] [--threshold 0.25] [--only catalog]
+
+Exits with status 1 when --compare finds a benchmark slower than the baseline by
+more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, NamedTuple, Optional
+
+import sqlalchemy
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from database_setup import (Appointment, Service, User, MAX_APPOINTMENT_SECONDS, create_salon_engine,
+                            iter_appointment_details, to_timestamp)
+from booking import request_booking
+from bulk_bookings import BookingImporter, RejectReport
+from catalog import CatalogCache
+from reports import artist_days, artist_totals
+from scheduling import APPOINTMENT_BLOCK, ScheduleEngine
+from synthetic_data import SalonSpec, generate_salon
+
+SCALES = {
+    'small': SalonSpec(artists=12, services=45, users=20000, appointments=100000),
+    'medium': SalonSpec(artists=30, services=90, users=200000, appointments=500000),
+    'large': SalonSpec(artists=60, services=180, users=1000000, appointments=2000000),
+}
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'beauty_salon_benchmarks')
+# Part of the cached file names, bump it when the schema or the generator changes
+CACHE_VERSION = 3
+BENCHMARKS = {}
+
+
+class Case(NamedTuple):
+    """One benchmark: run() does ops operations and is timed, setup() runs untimed before it."""
+    run: Callable
+    ops: int = 1
+    setup: Optional[Callable] = None
+
+
+def benchmark(kind, repeat):
+    def register(function):
+        BENCHMARKS[function.__name__] = (kind, repeat, function)
+        return function
+    return register
+
+
+class Salon:
+    """The generated database and the samples the benchmarks draw from."""
+
+    def __init__(self, path, spec, workdir):
+        self.path = path
+        self.spec = spec
+        self.workdir = workdir
+        self.engine = create_salon_engine(f'sqlite:///{path}')
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.rng = random.Random(spec.seed)
+        with self.engine.connect() as conn:
+            self.first_day, self.last_day = conn.execute(select(
+                func.min(Appointment.appointment_date), func.max(Appointment.appointment_date))).one()
+            self.services = conn.execute(select(Service.service_id, Service.name, Service.category)).all()
+            self.users = conn.execute(select(User.name, User.phone_number).where(
+                User.user_id.in_(self.rng.sample(range(1, spec.users + 1), min(1000, spec.users))))).all()
+        self.artist_ids = list(range(1, spec.artists + 1))
+
+    def random_day(self):
+        return self.first_day + timedelta(days=self.rng.randrange((self.last_day - self.first_day).days + 1))
+
+    def busiest_month(self):
+        """First and last day of the last complete month of bookings."""
+        last = self.last_day.replace(day=1) - timedelta(days=1)
+        return last.replace(day=1), last
+
+    def writable_copy(self):
+        """A fresh copy of the salon for benchmarks that book."""
+        path = os.path.join(self.workdir, 'copy.db')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        shutil.copy(self.path, path)
+        return create_salon_engine(f'sqlite:///{path}')
+
+
+@benchmark('micro', repeat=20)
+def catalog_load(salon):
+    cache = CatalogCache(salon.session_factory)
+    return Case(cache.load)
+
+
+@benchmark('micro', repeat=20)
+def catalog_lookup(salon):
+    cache = CatalogCache(salon.session_factory)
+    cache.load()
+    service_ids = [salon.rng.choice(salon.services).service_id for _ in range(10000)]
+
+    def run():
+        for service_id in service_ids:
+            cache.eligible_artists(cache.service_by_id(service_id).service_id)
+    return Case(run, len(service_ids))
+
+
+@benchmark('micro', repeat=20)
+def conflict_check_memory(salon):
+    schedule = ScheduleEngine(salon.session_factory)
+    for artist_id in salon.artist_ids:
+        schedule.calendar(artist_id)
+    checks = []
+    for _ in range(10000):
+        start = datetime.combine(salon.random_day(), datetime.min.time()) + timedelta(hours=8 + salon.rng.randrange(12))
+        checks.append((salon.rng.choice(salon.artist_ids), start))
+
+    def run():
+        for artist_id, start in checks:
+            schedule.is_available(artist_id, start)
+    return Case(run, len(checks))
+
+
+@benchmark('micro', repeat=10)
+def conflict_check_sql(salon):
+    """The overlap query book_appointment runs inside its transaction."""
+    checks = []
+    for _ in range(1000):
+        day = salon.random_day()
+        start_ts = to_timestamp(day, datetime.min.time()) + 3600 * (8 + salon.rng.randrange(12))
+        checks.append((salon.rng.choice(salon.artist_ids), start_ts, start_ts + APPOINTMENT_BLOCK.seconds))
+
+    def run():
+        with salon.engine.connect() as conn:
+            for artist_id, start_ts, end_ts in checks:
+                conn.execute(select(Appointment.appointment_id).where(
+                    Appointment.artist_id == artist_id,
+                    Appointment.start_ts > start_ts - MAX_APPOINTMENT_SECONDS,
+                    Appointment.start_ts < end_ts,
+                    Appointment.end_ts > start_ts
+                )).all()
+    return Case(run, len(checks))
+
+
+@benchmark('micro', repeat=10)
+def user_lookup(salon):
+    def run():
+        with salon.engine.connect() as conn:
+            for name, phone in salon.users:
+                conn.execute(select(User.user_id).where(User.name == name, User.phone_number == phone)).scalar()
+    return Case(run, len(salon.users))
+
+
+@benchmark('macro', repeat=5)
+def calendar_load(salon):
+    schedules = []
+
+    def setup():
+        schedules[:] = [ScheduleEngine(salon.session_factory)]
+
+    def run():
+        for artist_id in salon.artist_ids:
+            schedules[0].calendar(artist_id)
+    return Case(run, len(salon.artist_ids), setup)
+
+
+@benchmark('macro', repeat=10)
+def free_slots_month(salon):
+    schedule = ScheduleEngine(salon.session_factory)
+    month = salon.busiest_month()
+    service = salon.session_factory().get(Service, salon.services[0].service_id)
+    schedule.find_free_slots(None, service, month)
+    return Case(lambda: schedule.find_free_slots(None, service, month))
+
+
+@benchmark('macro', repeat=5)
+def report_month(salon):
+    first, last = salon.busiest_month()
+    return Case(lambda: sum(1 for _ in iter_appointment_details(first, last, bind=salon.engine)))
+
+
+@benchmark('macro', repeat=5)
+def report_bookings_per_artist(salon):
+    """Bookings per artist and month over the last year, the shape of a monthly report."""
+    first = salon.last_day - timedelta(days=365)
+
+    def run():
+        with salon.engine.connect() as conn:
+            conn.execute(select(
+                Appointment.artist_id,
+                func.strftime('%Y-%m', Appointment.appointment_date),
+                func.count()
+            ).where(Appointment.appointment_date >= first).group_by(
+                Appointment.artist_id, func.strftime('%Y-%m', Appointment.appointment_date))).all()
+    return Case(run)
+
+
+@benchmark('macro', repeat=10)
+def report_daily_summary(salon):
+    """Per artist-day occupancy of a month, read from DailySummary."""
+    return Case(lambda: artist_days(*salon.busiest_month(), bind=salon.engine))
+
+
+@benchmark('macro', repeat=10)
+def report_artist_totals(salon):
+    """A year of per-artist totals, read from DailySummary."""
+    year = (salon.last_day - timedelta(days=365), salon.last_day)
+    return Case(lambda: artist_totals(*year, bind=salon.engine))
+
+
+def _letters(number):
+    """0 -> 'a', 25 -> 'z', 26 -> 'ba': names without digits, as validate_booking wants them."""
+    letters = ''
+    while True:
+        number, digit = divmod(number, 26)
+        letters = chr(97 + digit) + letters
+        if not number:
+            return letters
+
+
+def _future_bookings(salon, count, start_day):
+    """Valid bookings, each customer booking three times and each artist a service of their category."""
+    rows = []
+    catalog = CatalogCache(salon.session_factory)
+    customers = max(1, count // 3)
+    for i in range(count):
+        customer = i % customers
+        artist = catalog.artist_by_id(salon.artist_ids[i % len(salon.artist_ids)])
+        services = catalog.services_by_category(artist.specialization)
+        day = start_day + timedelta(days=i // (6 * len(salon.artist_ids)))
+        rows.append({
+            'user_name': f'Client{_letters(customer).capitalize()}',
+            'user_phone': f'07{customer:08d}',
+            'service': services[i // len(salon.artist_ids) % len(services)].name,
+            'artist': '',
+            'artist_id': str(artist.artist_id),
+            'appointment_date': day.isoformat(),
+            'appointment_time': f'{8 + 2 * (i // len(salon.artist_ids) % 6):02d}:00',
+        })
+    return rows
+
+
+@benchmark('macro', repeat=3)
+def bulk_booking(salon):
+    """Import 20k bookings after the last generated day, a third of them by new customers."""
+    rows = _future_bookings(salon, 20000, salon.last_day + timedelta(days=1))
+    state = {}
+
+    def setup():
+        state['engine'] = salon.writable_copy()
+        state['importer'] = BookingImporter(state['engine'])
+
+    def run():
+        report = RejectReport(os.path.join(salon.workdir, 'rejected.csv'))
+        state['importer'].import_rows(iter(rows), report)
+        report.close()
+        state['engine'].dispose()
+    return Case(run, len(rows), setup)
+
+
+@benchmark('macro', repeat=3)
+def single_bookings(salon):
+    """Book 500 appointments one at a time through request_booking."""
+    bookings = []
+    start_day = salon.last_day + timedelta(days=1)
+    for i in range(500):
+        artist_id = salon.artist_ids[i % len(salon.artist_ids)]
+        bookings.append((artist_id, start_day + timedelta(days=i // (6 * len(salon.artist_ids))),
+                         datetime.min.replace(hour=8 + 2 * (i // len(salon.artist_ids) % 6)).time()))
+    state = {}
+
+    def setup():
+        engine = state['engine'] = salon.writable_copy()
+        session_factory = sessionmaker(bind=engine)
+        state['args'] = dict(session_factory=session_factory, schedule=ScheduleEngine(session_factory),
+                             catalog=CatalogCache(session_factory))
+
+    def run():
+        catalog = state['args']['catalog']
+        for i, (artist_id, day, at) in enumerate(bookings):
+            artist = catalog.artist_by_id(artist_id)
+            service = catalog.services_by_category(artist.specialization)[0]
+            request_booking('Clientbenchmark', f'09{i:08d}', artist_id, service.service_id, day, at,
+                            **state['args'])
+        state['engine'].dispose()
+    return Case(run, len(bookings), setup)
+
+
+def prepare_salon(spec, cache_dir):
+    """Path of the generated salon for spec, generating it on first use."""
+    os.makedirs(cache_dir, exist_ok=True)
+    key = '-'.join(str(value) for value in spec)
+    path = os.path.join(cache_dir, f'salon-v{CACHE_VERSION}-{key}.db')
+    if not os.path.exists(path):
+        print(f'generating {spec} ...', file=sys.stderr)
+        started = time.perf_counter()
+        partial_path = path + '.partial'
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(partial_path + suffix):
+                os.remove(partial_path + suffix)
+        engine = create_salon_engine(f'sqlite:///{partial_path}')
+        generate_salon(engine, spec)
+        engine.dispose()
+        os.replace(partial_path, path)
+        print(f'generated in {time.perf_counter() - started:.1f} s', file=sys.stderr)
+    return path
+
+
+def run_case(case, repeat):
+    if case.setup is None:
+        # Warm-up; cases with a setup start from fresh state on every run instead
+        case.run()
+    timings = []
+    for _ in range(repeat):
+        if case.setup is not None:
+            case.setup()
+        started = time.perf_counter()
+        case.run()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'runs': repeat,
+        'ops': case.ops,
+        'min_ms': timings[0] * 1000,
+        'median_ms': statistics.median(timings) * 1000,
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+        'ops_per_second': case.ops / statistics.median(timings),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Return the (name, baseline_ms, current_ms) of every benchmark slower than allowed."""
+    regressions = []
+    for name, result in results['benchmarks'].items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if previous and result['median_ms'] > previous['median_ms'] * (1 + threshold):
+            regressions.append((name, previous['median_ms'], result['median_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--seed', type=int, help='override the seed of the scale')
+    parser.add_argument('--only', action='append', help='run benchmarks whose name contains this (repeatable)')
+    parser.add_argument('--repeat', type=int, help='override the number of timed runs')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown, 0.25 = 25%%')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    spec = SCALES[args.scale]
+    if args.seed is not None:
+        spec = spec._replace(seed=args.seed)
+    path = prepare_salon(spec, args.cache_dir)
+    workdir = tempfile.mkdtemp()
+    salon = Salon(path, spec, workdir)
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'sqlalchemy': sqlalchemy.__version__,
+        'scale': args.scale,
+        'spec': {key: value.isoformat() if isinstance(value, date) else value
+                 for key, value in spec._asdict().items()},
+        'benchmarks': {},
+    }
+    try:
+        for name, (kind, repeat, function) in BENCHMARKS.items():
+            if args.only and not any(part in name for part in args.only):
+                continue
+            result = run_case(function(salon), args.repeat or repeat)
+            results['benchmarks'][name] = dict(kind=kind, **result)
+            print(f'{kind:5} {name:28} median {result["median_ms"]:10.2f} ms  p95 {result["p95_ms"]:10.2f} ms  '
+                  f'{result["ops_per_second"]:12.0f} ops/s', file=sys.stderr)
+    finally:
+        salon.engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for name, before, after in regressions:
+            print(f'REGRESSION {name}: {before:.2f} ms -> {after:.2f} ms', file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
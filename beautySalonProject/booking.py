@@ -0,0 +1,393 @@
+"""Booking service shared by the desktop dialog, the importers and any other caller.
+
+Nothing here imports Qt: errors are reported as BookingError subclasses or, through
+request_booking(), as a BookingResult instead of message boxes.
+"""
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from database_setup import (SessionLocal, User, Appointment, MAX_APPOINTMENT_SECONDS, notify_customer_saved, to_timestamp,
+                            from_timestamp)
+from scheduling import (OPENING_TIME, LAST_START_TIME, CLOSING_TIME, appointment_length, build_calendar,
+                        calendar_slots, latest_start, sweep_conflicts, within_hours, schedule as shared_schedule)
+from catalog import catalog as shared_catalog
+
+# How often a booking is retried when another terminal holds the write lock
+MAX_ATTEMPTS = 8
+
+
+class BookingError(Exception):
+    """Base class of the expected booking failures, code identifies the kind."""
+    code = 'error'
+    title = "Booking Error"
+
+
+class InvalidBooking(BookingError):
+    code = 'invalid'
+    title = "Input Error"
+
+
+class UnknownServiceOrArtist(BookingError):
+    code = 'not_found'
+
+    def __init__(self, message="Service or Artist not found."):
+        super(UnknownServiceOrArtist, self).__init__(message)
+
+
+class BookingConflict(BookingError):
+    """The artist already has an appointment overlapping the requested time."""
+    code = 'conflict'
+
+    def __init__(self, conflicting_ids=()):
+        super(BookingConflict, self).__init__("The artist is not available during the selected time.")
+        self.conflicting_ids = list(conflicting_ids)
+
+
+class OutsideShift(BookingError):
+    """The artist does not work at the requested time."""
+    code = 'unavailable'
+    title = "Not Available"
+
+    def __init__(self, message="The artist does not work at the selected time."):
+        super(OutsideShift, self).__init__(message)
+
+
+class BookingResult(NamedTuple):
+    ok: bool
+    appointment_id: Optional[int] = None
+    error: Optional[str] = None
+    title: str = ""
+    message: str = ""
+    conflicting_ids: Tuple[int, ...] = ()
+
+
+def validate_booking(user_name, user_phone, appointment_time):
+    """Raise InvalidBooking with a user-facing message when the input is not acceptable."""
+    if not user_name or not user_phone:
+        raise InvalidBooking("Please fill in both Name and Phone fields.")
+    if len(user_name) < 4 or not user_name.isalpha():
+        raise InvalidBooking("Name must be more than 3 letters and cannot contain numbers.")
+    if not (user_phone.isdigit() and len(user_phone) == 10):
+        raise InvalidBooking("Phone number must be exactly 10 digits.")
+    validate_time(appointment_time)
+
+
+def validate_time(appointment_time):
+    """Raise InvalidBooking when the start time is missing or outside the booking window."""
+    if appointment_time is None:
+        raise InvalidBooking("The artist has no free time left on the selected date.")
+    if not OPENING_TIME <= appointment_time <= LAST_START_TIME:
+        raise InvalidBooking("Appointments can start between 08:00 and 19:00.")
+
+
+def validate_length(appointment_date, appointment_time, length):
+    """Raise InvalidBooking when a booking of the given length would run past closing time."""
+    if datetime.combine(appointment_date, appointment_time) > latest_start(appointment_date, length):
+        raise InvalidBooking(f"This service takes {length.seconds // 60} minutes and would end after "
+                             f"closing time ({CLOSING_TIME:%H:%M}).")
+
+
+def validate_hours(shifts, artist_id, appointment_date, appointment_time, length):
+    """Raise OutsideShift when the booking is not entirely within the artist's working hours."""
+    start = datetime.combine(appointment_date, appointment_time)
+    if not shifts.is_open(artist_id, start, start + length):
+        raise OutsideShift()
+
+
+def is_busy(error):
+    return 'locked' in str(error.orig) or 'busy' in str(error.orig)
+
+
+def _service_length(service_id):
+    service = shared_catalog.service_by_id(service_id)
+    if service is None:
+        raise UnknownServiceOrArtist()
+    return appointment_length(service)
+
+
+def _user_id(db, user_name, user_phone):
+    """Id of the user with that name and phone, created if needed."""
+    user = db.query(User).filter_by(name=user_name, phone_number=user_phone).first()
+    if not user:
+        user = User(name=user_name, phone_number=user_phone)
+        db.add(user)
+        db.flush()
+    return user.user_id
+
+
+def book_appointment(user_name, user_phone, artist_id, service_id, appointment_date, appointment_time,
+                     session_factory=SessionLocal, schedule=shared_schedule, length=None):
+    """Atomically upsert the user, check for conflicts and insert the appointment.
+
+    Everything runs in one BEGIN IMMEDIATE transaction, so two terminals cannot both
+    pass the conflict check; the overlap trigger backs this up at the database level.
+    length defaults to appointment_length() of the service.
+    Returns the new appointment_id or raises BookingConflict.
+    """
+    if length is None:
+        length = _service_length(service_id)
+    start_ts = to_timestamp(appointment_date, appointment_time)
+    duration_minutes = length.seconds // 60
+    end_ts = start_ts + duration_minutes * 60
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        db = session_factory()
+        try:
+            # Take the write lock up front instead of upgrading a read lock halfway through
+            db.connection().exec_driver_sql('BEGIN IMMEDIATE')
+
+            conflicting_ids = [appointment_id for appointment_id, in db.query(Appointment.appointment_id).filter(
+                Appointment.artist_id == artist_id,
+                Appointment.start_ts > start_ts - MAX_APPOINTMENT_SECONDS,
+                Appointment.start_ts < end_ts,
+                Appointment.end_ts > start_ts
+            )]
+            if conflicting_ids:
+                db.rollback()
+                # Someone else booked it, the cached calendar is out of date
+                schedule.invalidate(artist_id)
+                raise BookingConflict(conflicting_ids)
+
+            user_id = _user_id(db, user_name, user_phone)
+            new_appt = Appointment(
+                user_id=user_id,
+                artist_id=artist_id,
+                service_id=service_id,
+                appointment_date=appointment_date,
+                appointment_time=appointment_time,
+                duration_minutes=duration_minutes
+            )
+            db.add(new_appt)
+            db.flush()
+            # Read everything needed before commit expires the instance
+            appointment_id = new_appt.appointment_id
+            db.commit()
+            start = from_timestamp(start_ts)
+            schedule.add_interval(artist_id, appointment_id, start, start + length)
+            notify_customer_saved(user_id, user_name, user_phone)
+            return appointment_id
+        except IntegrityError as e:
+            db.rollback()
+            if 'overlaps' not in str(e.orig):
+                raise
+            # The overlap trigger fired
+            schedule.invalidate(artist_id)
+            raise BookingConflict()
+        except OperationalError as e:
+            db.rollback()
+            if not is_busy(e) or attempt == MAX_ATTEMPTS:
+                raise
+            # Back off with jitter so competing terminals do not retry in lockstep
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        finally:
+            db.close()
+
+
+def request_booking(user_name, user_phone, artist_id, service_id, appointment_date, appointment_time,
+                    session_factory=SessionLocal, schedule=shared_schedule, catalog=shared_catalog):
+    """Validate and book, reporting the outcome as a BookingResult instead of raising."""
+    try:
+        validate_booking(user_name, user_phone, appointment_time)
+        service = catalog.service_by_id(service_id)
+        artist = catalog.artist_by_id(artist_id)
+        if not service or not artist:
+            raise UnknownServiceOrArtist()
+        if artist not in catalog.eligible_artists(service_id):
+            raise UnknownServiceOrArtist(f"{artist.name} does not perform {service.name}.")
+        length = appointment_length(service)
+        validate_length(appointment_date, appointment_time, length)
+        validate_hours(schedule.shifts, artist_id, appointment_date, appointment_time, length)
+        appointment_id = book_appointment(user_name, user_phone, artist_id, service_id,
+                                          appointment_date, appointment_time, session_factory, schedule, length)
+    except BookingConflict as e:
+        return BookingResult(False, error=e.code, title=e.title, message=str(e),
+                             conflicting_ids=tuple(e.conflicting_ids))
+    except BookingError as e:
+        return BookingResult(False, error=e.code, title=e.title, message=str(e))
+    return BookingResult(True, appointment_id, title="Success", message="Appointment booked successfully.")
+
+
+class Recurrence(NamedTuple):
+    """Repeat every interval days, weeks or months, count times and/or until a date (inclusive)."""
+    frequency: str
+    interval: int = 1
+    count: Optional[int] = None
+    until: Optional[date] = None
+
+
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+# Longest series booked at once, a year of daily appointments
+MAX_OCCURRENCES = 366
+# Free start times offered for each occurrence that collides
+ALTERNATIVES = 3
+
+
+class SeriesConflict(NamedTuple):
+    start: datetime
+    # Empty when the artist does not work at that time
+    conflicting_ids: Tuple[int, ...]
+    # Free start times with the same artist on the same day, nearest first
+    alternatives: Tuple[datetime, ...] = ()
+
+
+class SeriesResult(NamedTuple):
+    ok: bool
+    # (start, appointment_id) of the occurrences booked
+    booked: Tuple[Tuple[datetime, int], ...] = ()
+    conflicts: Tuple[SeriesConflict, ...] = ()
+    error: Optional[str] = None
+    title: str = ""
+    message: str = ""
+
+
+def occurrence_dates(first_date, rule):
+    """Dates of a series starting on first_date. Monthly series skip months without that day."""
+    if rule.frequency not in FREQUENCIES or rule.interval < 1:
+        raise InvalidBooking("Unknown repeat rule.")
+    if rule.count is None and rule.until is None:
+        raise InvalidBooking("Please choose how many times or until when the appointment repeats.")
+    dates = []
+    step = 0
+    while rule.count is None or len(dates) < rule.count:
+        if rule.frequency == 'monthly':
+            month = first_date.month - 1 + step * rule.interval
+            step += 1
+            try:
+                day = first_date.replace(year=first_date.year + month // 12, month=month % 12 + 1)
+            except ValueError:
+                continue
+        else:
+            days = rule.interval * (7 if rule.frequency == 'weekly' else 1)
+            day = first_date + timedelta(days=step * days)
+            step += 1
+        if rule.until is not None and day > rule.until:
+            break
+        if len(dates) == MAX_OCCURRENCES:
+            raise InvalidBooking(f"A series can have at most {MAX_OCCURRENCES} appointments.")
+        dates.append(day)
+    if not dates:
+        raise InvalidBooking("The series ends before its first appointment.")
+    return dates
+
+
+def _alternatives(calendar, artist_id, start, length, count, hours=None):
+    """The count free starts of start's day closest to it, in time order."""
+    slots = calendar_slots(calendar, artist_id, start.date(), start.date(), length, hours=hours)
+    nearest = sorted(slots, key=lambda slot: abs(slot.start - start))[:count]
+    return tuple(sorted(slot.start for slot in nearest))
+
+
+def book_series(user_name, user_phone, artist_id, service_id, first_date, appointment_time, rule,
+                session_factory=SessionLocal, schedule=shared_schedule, length=None, alternatives=ALTERNATIVES):
+    """Book every free occurrence of a series in one transaction.
+
+    The artist's bookings over the whole series are read with one range query and
+    merged with the occurrences in a single sweep. Free occurrences within the
+    artist's working hours are inserted together, the others are returned as
+    SeriesConflicts with nearby free times.
+    """
+    if length is None:
+        length = _service_length(service_id)
+    dates = occurrence_dates(first_date, rule)
+    duration_minutes = length.seconds // 60
+    starts = [to_timestamp(day, appointment_time) for day in dates]
+    requested = [(start_ts, start_ts + duration_minutes * 60) for start_ts in starts]
+    hours = schedule.shifts.hours(artist_id, dates[0], dates[-1])
+    off_shift = {index for index, day in enumerate(dates)
+                 if not within_hours(hours[day], from_timestamp(starts[index]), from_timestamp(requested[index][1]))}
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        db = session_factory()
+        try:
+            db.connection().exec_driver_sql('BEGIN IMMEDIATE')
+            # Whole days, so the same rows also give the free times around a collision
+            booked = db.query(Appointment.start_ts, Appointment.end_ts, Appointment.appointment_id).filter(
+                Appointment.artist_id == artist_id,
+                Appointment.start_ts > to_timestamp(dates[0], OPENING_TIME) - MAX_APPOINTMENT_SECONDS,
+                Appointment.start_ts < to_timestamp(dates[-1], CLOSING_TIME)
+            ).order_by(Appointment.start_ts).all()
+            overlapping = sweep_conflicts(requested, booked)
+            accepted = [index for index, hits in enumerate(overlapping) if not hits and index not in off_shift]
+
+            appointment_ids = []
+            if accepted:
+                user_id = _user_id(db, user_name, user_phone)
+                # One multi-row INSERT, start_ts is given since bulk inserts skip the ORM events
+                appointment_ids = db.execute(
+                    insert(Appointment).returning(Appointment.appointment_id, sort_by_parameter_order=True),
+                    [{'user_id': user_id, 'artist_id': artist_id, 'service_id': service_id,
+                      'appointment_date': dates[index], 'appointment_time': appointment_time,
+                      'start_ts': starts[index], 'duration_minutes': duration_minutes} for index in accepted]
+                ).scalars().all()
+            db.commit()
+            break
+        except IntegrityError as e:
+            db.rollback()
+            if 'overlaps' not in str(e.orig):
+                raise
+            schedule.invalidate(artist_id)
+            raise BookingConflict()
+        except OperationalError as e:
+            db.rollback()
+            if not is_busy(e) or attempt == MAX_ATTEMPTS:
+                raise
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        finally:
+            db.close()
+
+    if accepted:
+        notify_customer_saved(user_id, user_name, user_phone)
+    booked_starts = []
+    for index, appointment_id in zip(accepted, appointment_ids):
+        start = from_timestamp(starts[index])
+        schedule.add_interval(artist_id, appointment_id, start, start + length)
+        booked_starts.append((start, appointment_id))
+
+    conflicts = []
+    if len(accepted) < len(dates):
+        # Only the days with a collision, the new bookings never share one as occurrences are days apart
+        refused = [index for index, hits in enumerate(overlapping) if hits or index in off_shift]
+        days = {starts[index] // 86400 for index in refused}
+        calendar = build_calendar((appointment_id, start_ts, (end_ts - start_ts) // 60)
+                                  for start_ts, end_ts, appointment_id in booked if start_ts // 86400 in days)
+        for index in refused:
+            start = from_timestamp(starts[index])
+            conflicts.append(SeriesConflict(start, tuple(hit[2] for hit in overlapping[index]),
+                                            _alternatives(calendar, artist_id, start, length, alternatives, hours)))
+    return SeriesResult(True, tuple(booked_starts), tuple(conflicts))
+
+
+def request_series(user_name, user_phone, artist_id, service_id, first_date, appointment_time, rule,
+                   session_factory=SessionLocal, schedule=shared_schedule, catalog=shared_catalog):
+    """Validate and book a series, reporting the outcome as a SeriesResult instead of raising."""
+    try:
+        validate_booking(user_name, user_phone, appointment_time)
+        service = catalog.service_by_id(service_id)
+        artist = catalog.artist_by_id(artist_id)
+        if not service or not artist:
+            raise UnknownServiceOrArtist()
+        if artist not in catalog.eligible_artists(service_id):
+            raise UnknownServiceOrArtist(f"{artist.name} does not perform {service.name}.")
+        length = appointment_length(service)
+        validate_length(first_date, appointment_time, length)
+        result = book_series(user_name, user_phone, artist_id, service_id, first_date, appointment_time, rule,
+                             session_factory, schedule, length)
+    except BookingError as e:
+        return SeriesResult(False, error=e.code, title=e.title, message=str(e))
+
+    total = len(result.booked) + len(result.conflicts)
+    lines = [f"Booked {len(result.booked)} of {total} appointments."]
+    for conflict in result.conflicts:
+        free = ', '.join(f'{start:%H:%M}' for start in conflict.alternatives) or 'nothing free that day'
+        reason = "is taken" if conflict.conflicting_ids else "is outside working hours"
+        lines.append(f"{conflict.start:%d.%m.%Y %H:%M} {reason} ({free})")
+    if not result.conflicts:
+        title = "Success"
+    else:
+        title = "Partially booked" if result.booked else "Not available"
+    return result._replace(title=title, message='\n'.join(lines))
@@ -0,0 +1,316 @@
+from datetime import datetime
+from functools import partial
+
+from PyQt6.QtWidgets import QDialog, QLineEdit, QPushButton, QComboBox, QDateEdit, QMessageBox, QCompleter
+from PyQt6.QtCore import QDate, QStringListModel
+from appointment_dialog import Ui_Dialog
+from scheduling import find_free_slots
+from catalog import catalog
+from customer_index import customers
+from service_search import service_search
+from db_worker import DbWorker
+from booking import InvalidBooking, Recurrence, request_booking, request_series, validate_booking
+import instrumentation
+
+
+# Repeat choices offered in the dialog as (label, frequency, interval)
+REPEAT_CHOICES = [
+    ("Does not repeat", None, 0),
+    ("Every week", 'weekly', 1),
+    ("Every 2 weeks", 'weekly', 2),
+    ("Every 3 weeks", 'weekly', 3),
+    ("Every 4 weeks", 'weekly', 4),
+    ("Every month", 'monthly', 1),
+]
+
+
+class AppointmentDialog(QDialog, Ui_Dialog):
+    def __init__(self, parent=None):
+        super(AppointmentDialog, self).__init__(parent)
+        self.setupUi(self)  # Compiled from appointment_dialog.ui
+
+        # Initialize widgets
+        self.categoryComboBox = self.findChild(QComboBox, 'categoryComboBox')
+        self.serviceComboBox = self.findChild(QComboBox, 'serviceComboBox')
+        self.artistComboBox = self.findChild(QComboBox, 'artistComboBox')
+        self.nameLineEdit = self.findChild(QLineEdit, 'nameLineEdit')
+        self.phoneLineEdit = self.findChild(QLineEdit, 'phoneLineEdit')
+        self.dateEdit = self.findChild(QDateEdit, 'dateEdit')
+        self.timeComboBox = self.findChild(QComboBox, 'timeComboBox')
+        self.repeatComboBox = self.findChild(QComboBox, 'repeatComboBox')
+        self.untilDateEdit = self.findChild(QDateEdit, 'untilDateEdit')
+        self.serviceSearchLineEdit = self.findChild(QLineEdit, 'serviceSearchLineEdit')
+        self.submitButton = self.findChild(QPushButton, 'submitButton')
+        self.cancelBtn = self.findChild(QPushButton, 'cancelBtn')
+
+        # Set date to not allow dates before 2024
+        self.dateEdit.setMinimumDate(QDate(2024, 1, 1))
+        self.dateEdit.setDate(QDate.currentDate())
+        for label, frequency, interval in REPEAT_CHOICES:
+            self.repeatComboBox.addItem(label, (frequency, interval))
+        self.untilDateEdit.setDate(QDate.currentDate().addYears(1))
+
+        # Database calls run on a background pool so the dialog never freezes
+        self.db_worker = DbWorker(self)
+        # Timing tokens of the UI actions in flight, see instrumentation.start_action()
+        self._actions = {}
+        # Counts the resets, a booking submitted before the last one must not close the reopened dialog
+        self._use = 0
+
+        # Returning customers are suggested while typing, from the in-memory index; picking
+        # one fills in both fields so the booking reuses the existing user
+        self._suggestions = {}
+        for line_edit, search in ((self.nameLineEdit, customers.by_name), (self.phoneLineEdit, customers.by_phone)):
+            completer = QCompleter(QStringListModel(self), self)
+            completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+            line_edit.setCompleter(completer)
+            # Connected after setCompleter, so it runs after the line edit took the suggestion's text
+            completer.activated.connect(self.fill_customer)
+            line_edit.textEdited.connect(partial(self.suggest_customers, completer, search))
+        self.db_worker.submit('customers', customers.refresh)
+
+        # Services of every category are searched from the in-memory index, picking one
+        # switches to its category and selects it there
+        self._service_matches = {}
+        self._pending_service_id = None
+        self.serviceCompleter = QCompleter(QStringListModel(self), self)
+        self.serviceCompleter.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.serviceSearchLineEdit.setCompleter(self.serviceCompleter)
+        self.serviceCompleter.activated.connect(self.choose_service)
+        self.serviceSearchLineEdit.textEdited.connect(self.suggest_services)
+        self.db_worker.submit('service search', service_search.refresh)
+
+        # Connect signals
+        self.categoryComboBox.currentIndexChanged.connect(self.update_services)
+        self.serviceComboBox.currentIndexChanged.connect(self.update_artists)
+        self.artistComboBox.currentIndexChanged.connect(self.update_time_slots)
+        self.dateEdit.dateChanged.connect(self.update_time_slots)
+        self.repeatComboBox.currentIndexChanged.connect(self.update_repeat)
+        self.submitButton.clicked.connect(self.book_appointment)
+        self.cancelBtn.clicked.connect(self.close)
+
+        # Populate categories
+        self.populate_categories()
+
+        self.setStyleSheet("QDialog {"
+                           "background-image: url(static/logo3.jpg);"
+                           "background-repeat: no-repeat;"
+                           "background-position: center;"
+                           "}")
+
+    def reset(self):
+        # Called by the dialog factory before the warm instance is shown again
+        self._use += 1
+        self.nameLineEdit.clear()
+        self.phoneLineEdit.clear()
+        # Pick up customers added by other terminals meanwhile
+        self.db_worker.submit('customers', customers.refresh)
+        self.serviceSearchLineEdit.clear()
+        self.db_worker.submit('service search', service_search.refresh)
+        self.dateEdit.setDate(QDate.currentDate())
+        self.repeatComboBox.setCurrentIndex(0)
+        self.untilDateEdit.setDate(QDate.currentDate().addYears(1))
+        if not self.db_worker.is_busy('booking'):
+            self.submitButton.setEnabled(True)
+            self.submitButton.setText("Book appointment")
+        # Otherwise the previous booking is still being saved, its result enables the button
+        if self.categoryComboBox.currentIndex() == 0:
+            self.update_services()  # Refresh services, artists and free times
+        else:
+            self.categoryComboBox.setCurrentIndex(0)
+
+    def populate_categories(self):
+        # Add categories to the categoryComboBox
+        self.categoryComboBox.addItems(['Nails', 'Hair', 'Cosmetics'])
+
+    def update_services(self):
+        self._actions['category'] = instrumentation.start_action('category change')
+        self.serviceComboBox.clear()
+        selected_category = self.categoryComboBox.currentText().lower()
+
+        # Fetch services in the background, a newer category change replaces this request
+        self.db_worker.submit('services', self.get_services_by_category, selected_category,
+                              on_result=self.fill_services, on_error=self.show_db_error)
+
+    def get_services_by_category(self, category):
+        return catalog.services_by_category(category)
+
+    def fill_services(self, services):
+        instrumentation.finish_action(self._actions.pop('category', None))
+        self.serviceComboBox.clear()
+        # Service names are unique, the catalog keeps them sorted
+        for service in services:
+            self.serviceComboBox.addItem(service.name, service.service_id)
+        self.select_pending_service()
+
+        # Update artists based on new service selection
+        self.update_artists()
+
+    def update_artists(self):
+        self.artistComboBox.clear()
+        service_id = self.serviceComboBox.currentData()
+        if service_id is None:
+            return
+        self.db_worker.submit('artists', catalog.eligible_artists, service_id,
+                              on_result=self.fill_artists, on_error=self.show_db_error)
+
+    def fill_artists(self, artists):
+        self.artistComboBox.clear()
+        # Each item carries the artist_id, artists sharing a name stay distinct
+        for artist in artists:
+            self.artistComboBox.addItem(artist.name, artist.artist_id)
+
+    def update_time_slots(self):
+        # Offer only the start times (08:00 - 19:00) at which the artist is free, earlier than
+        # 19:00 for services that would otherwise end after closing time (21:00, see scheduling)
+        self.timeComboBox.clear()
+        service_id = self.serviceComboBox.currentData()
+        artist_id = self.artistComboBox.currentData()
+        if service_id is None or artist_id is None:
+            return
+
+        selected_date = self.dateEdit.date().toPyDate()
+        self._actions['slots'] = instrumentation.start_action('load time slots')
+        self.db_worker.submit('slots', load_time_slots, artist_id, service_id, selected_date,
+                              on_result=self.fill_time_slots, on_error=self.show_db_error)
+
+    def fill_time_slots(self, slots):
+        instrumentation.finish_action(self._actions.pop('slots', None))
+        self.timeComboBox.clear()
+        for slot in slots:
+            self.timeComboBox.addItem(slot.start.strftime('%H:%M'), slot.start.time())
+
+    def suggest_customers(self, completer, search, text):
+        if not customers.loaded:
+            return  # Still loading, typing works as before
+        self._suggestions = {f"{customer.name} · {customer.phone_number}": customer for customer in search(text)}
+        completer.model().setStringList(list(self._suggestions))
+        if self._suggestions:
+            completer.complete()
+        else:
+            completer.popup().hide()
+
+    def fill_customer(self, text):
+        customer = self._suggestions.get(text)
+        if customer is not None:
+            self.nameLineEdit.setText(customer.name)
+            self.phoneLineEdit.setText(customer.phone_number)
+
+    def suggest_services(self, text):
+        if not service_search.loaded:
+            return
+        self._service_matches = {f"{service.name} · {service.category.capitalize()}": service
+                                 for service in service_search.search(text)}
+        self.serviceCompleter.model().setStringList(list(self._service_matches))
+        if self._service_matches:
+            self.serviceCompleter.complete()
+        else:
+            self.serviceCompleter.popup().hide()
+
+    def choose_service(self, text):
+        service = self._service_matches.get(text)
+        if service is None:
+            return
+        index = self.categoryComboBox.findText(service.category.capitalize())
+        if index < 0:
+            return
+        self._pending_service_id = service.service_id
+        if index == self.categoryComboBox.currentIndex():
+            self.select_pending_service()
+        else:
+            self.categoryComboBox.setCurrentIndex(index)  # fill_services() selects it once loaded
+
+    def select_pending_service(self):
+        if self._pending_service_id is None:
+            return
+        index = self.serviceComboBox.findData(self._pending_service_id)
+        if index >= 0:
+            self._pending_service_id = None
+            self.serviceComboBox.setCurrentIndex(index)
+
+    def update_repeat(self):
+        # The end date only matters for a series
+        self.untilDateEdit.setEnabled(self.repeatComboBox.currentIndex() > 0)
+
+    def show_db_error(self, message):
+        QMessageBox.critical(self, "Database Error", f"An error occurred: {message}")
+
+    def book_appointment(self):
+        self._actions['submit'] = instrumentation.start_action('submit')
+        user_name = self.nameLineEdit.text()
+        user_phone = self.phoneLineEdit.text()
+        service_id = self.serviceComboBox.currentData()
+        artist_id = self.artistComboBox.currentData()
+        appointment_date = self.dateEdit.date().toPyDate()
+        appointment_time = self.timeComboBox.currentData()
+
+        # Validate input fields before going to the database
+        try:
+            validate_booking(user_name, user_phone, appointment_time)
+        except InvalidBooking as e:
+            instrumentation.finish_action(self._actions.pop('submit', None))
+            QMessageBox.warning(self, e.title, str(e))
+            return
+
+        # Save in the background and show progress on the button meanwhile
+        self.submitButton.setEnabled(False)
+        self.submitButton.setText("Booking...")
+        frequency, interval = self.repeatComboBox.currentData()
+        if frequency is None:
+            self.db_worker.submit('booking', request_booking, user_name, user_phone, artist_id, service_id,
+                                  appointment_date, appointment_time,
+                                  on_result=partial(self.booking_finished, self._use), on_error=self.booking_failed)
+            return
+        # Every occurrence is checked and booked in one go
+        rule = Recurrence(frequency, interval, until=self.untilDateEdit.date().toPyDate())
+        self.db_worker.submit('booking', request_series, user_name, user_phone, artist_id, service_id,
+                              appointment_date, appointment_time, rule,
+                              on_result=partial(self.series_finished, self._use), on_error=self.booking_failed)
+
+    def booking_finished(self, use, result):
+        instrumentation.finish_action(self._actions.pop('submit', None))
+        self.submitButton.setEnabled(True)
+        self.submitButton.setText("Book appointment")
+        if not result.ok:
+            QMessageBox.warning(self, result.title, result.message)
+            self.update_time_slots()
+            return
+        QMessageBox.information(self, result.title, result.message)
+        self.close_unless_reset(use)
+
+    def series_finished(self, use, result):
+        instrumentation.finish_action(self._actions.pop('submit', None))
+        self.submitButton.setEnabled(True)
+        self.submitButton.setText("Book appointment")
+        if not result.ok or not result.booked:
+            QMessageBox.warning(self, result.title, result.message)
+            self.update_time_slots()
+            return
+        if result.conflicts:
+            # Lists the taken dates with the free times of those days
+            QMessageBox.warning(self, result.title, result.message)
+        else:
+            QMessageBox.information(self, result.title, result.message)
+        self.close_unless_reset(use)
+
+    def close_unless_reset(self, use):
+        if use == self._use:
+            self.close()
+            return
+        # Booked from before the dialog was reopened: keep what is being entered now,
+        # only the times just taken go away
+        self.update_time_slots()
+
+    def booking_failed(self, message):
+        instrumentation.finish_action(self._actions.pop('submit', None))
+        self.submitButton.setEnabled(True)
+        self.submitButton.setText("Book appointment")
+        self.show_db_error(message)
+
+
+def load_time_slots(artist_id, service_id, selected_date):
+    service = catalog.service_by_id(service_id)
+    if service is None:
+        return []
+    slots = find_free_slots(artist_id, service, (selected_date, selected_date), not_before=datetime.now())
+    return slots[artist_id]
@@ -0,0 +1,342 @@
+"""Bulk import and export of bookings as CSV or JSON Lines.
+
+    python bulk_bookings.py import bookings.csv [--report rejected.csv]
+    python bulk_bookings.py export bookings.jsonl
+
+Each booking has the fields user_name, user_phone, service, artist, artist_id,
+appointment_date (YYYY-MM-DD) and appointment_time (HH:MM). artist_id may be
+left empty, the artist is then looked up by name within the service's category.
+Rows are checked like bookings made in the dialog. Rows that fail a check, fall
+outside the artist's working hours or overlap a booking are written to the report
+file together with the reason.
+"""
+import argparse
+import csv
+import json
+import os
+import time as timer
+from datetime import date, time, timedelta
+from itertools import islice
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from database_setup import engine as default_engine, init_db, migrate_db, to_timestamp, from_timestamp
+from database_setup import Base, User, Artist, Service, Appointment
+from booking import BookingError, UnknownServiceOrArtist, validate_hours, validate_length, validate_time
+from catalog import CatalogCache
+from scheduling import ArtistCalendar, ShiftCalendar, appointment_length
+
+FIELDS = ['user_name', 'user_phone', 'service', 'artist', 'artist_id', 'appointment_date', 'appointment_time']
+CHUNK_SIZE = 50000
+CONFLICT_REASON = 'the artist is not available during the selected time'
+
+
+def detect_format(path):
+    return 'jsonl' if path.endswith(('.jsonl', '.json')) else 'csv'
+
+
+def read_bookings(path, fmt):
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class RejectReport:
+    """Writes rejected rows, opened lazily so a clean import leaves no file behind."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def add(self, row, reason):
+        if self._writer is None:
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, FIELDS + ['reason'], extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerow({**row, 'reason': reason})
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class BookingImporter:
+    """Resolves bookings through in-memory maps and inserts them chunk by chunk.
+
+    Every row gets the checks request_booking() makes on a booking: a start time
+    within the booking window, an artist performing the service, the service's
+    length and the artist's working hours. Names and phones only have to be there.
+    SQLite assigns the ids, so bookings made elsewhere during an import only cost
+    the chunk they collide with a row-by-row retry.
+    """
+
+    def __init__(self, bind=default_engine):
+        self.bind = bind
+        session_factory = sessionmaker(bind=bind)
+        # Read from this database, which need not be the application's
+        self.catalog = CatalogCache(session_factory)
+        self.shifts = ShiftCalendar(session_factory)
+        with bind.connect() as conn:
+            self.users = {(name, phone): user_id for user_id, name, phone in conn.execute(
+                select(User.user_id, User.name, User.phone_number))}
+        # Existing bookings, checked with the same overlap rules as the booking dialog
+        self.calendars = {}
+        self._load_calendars()
+
+    def _calendar(self, artist_id):
+        calendar = self.calendars.get(artist_id)
+        if calendar is None:
+            calendar = self.calendars[artist_id] = ArtistCalendar()
+        return calendar
+
+    def _load_calendars(self, artist_ids=None):
+        """(Re)read the bookings of the given artists, or of everyone."""
+        query = select(Appointment.appointment_id, Appointment.artist_id, Appointment.start_ts,
+                       Appointment.duration_minutes).where(Appointment.start_ts.isnot(None))
+        if artist_ids is None:
+            self.calendars = {}
+        else:
+            query = query.where(Appointment.artist_id.in_(artist_ids))
+            for artist_id in artist_ids:
+                self.calendars[artist_id] = ArtistCalendar()
+        with self.bind.connect() as conn:
+            for appointment_id, artist_id, start_ts, duration_minutes in conn.execute(
+                    query.order_by(Appointment.artist_id, Appointment.start_ts)):
+                start = from_timestamp(start_ts)
+                self._calendar(artist_id).add(appointment_id, start, start + timedelta(minutes=duration_minutes))
+
+    def resolve(self, row):
+        """Turn one input row into (user_key, appointment values) or raise ValueError/BookingError with the reason.
+
+        Working hours are checked separately, see import_rows().
+        """
+        service = self.catalog.service_by_name(row.get('service'))
+        if service is None:
+            raise ValueError('unknown service')
+
+        artist_id = row.get('artist_id')
+        if artist_id:
+            try:
+                artist = self.catalog.artist_by_id(int(artist_id))
+            except ValueError:
+                raise ValueError('invalid artist_id')
+            if artist is None:
+                raise ValueError('unknown artist_id')
+        else:
+            artist = next((artist for artist in self.catalog.eligible_artists(service.service_id)
+                           if artist.name == row.get('artist')), None)
+            if artist is None:
+                raise ValueError('no artist with that name for the service category')
+        if artist not in self.catalog.eligible_artists(service.service_id):
+            raise UnknownServiceOrArtist(f"{artist.name} does not perform {service.name}.")
+
+        try:
+            appointment_date = date.fromisoformat(row['appointment_date'])
+            appointment_time = time.fromisoformat(row['appointment_time'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('invalid date or time')
+        user_name = (row.get('user_name') or '').strip()
+        user_phone = (row.get('user_phone') or '').strip()
+        # Not validate_booking(): the dialog's rules for typed-in names and phones would turn away
+        # customers already on file, like the full names an export writes
+        if not user_name or not user_phone:
+            raise ValueError('missing user name or phone')
+        validate_time(appointment_time)
+        length = appointment_length(service)
+        validate_length(appointment_date, appointment_time, length)
+
+        return (user_name, user_phone), {
+            'artist_id': artist.artist_id,
+            'service_id': service.service_id,
+            'appointment_date': appointment_date,
+            'appointment_time': appointment_time,
+            'start_ts': to_timestamp(appointment_date, appointment_time),
+            'duration_minutes': length.seconds // 60,
+        }
+
+    def _load_hours(self, resolved):
+        """Expand the working hours the resolved rows fall in, one read per artist instead of per week."""
+        dates = {}
+        for _, _, values in resolved:
+            first, last = dates.get(values['artist_id'], (values['appointment_date'],) * 2)
+            dates[values['artist_id']] = (min(first, values['appointment_date']),
+                                          max(last, values['appointment_date']))
+        for artist_id, (first, last) in dates.items():
+            self.shifts.hours(artist_id, first, last)
+
+    def import_rows(self, rows, report, chunk_size=CHUNK_SIZE):
+        """Validate and insert rows, returning the number of appointments created."""
+        imported = 0
+        for chunk in chunked(rows, chunk_size):
+            resolved = []
+            for row in chunk:
+                try:
+                    resolved.append((row, *self.resolve(row)))
+                except (ValueError, BookingError) as e:
+                    report.add(row, str(e))
+            self._load_hours(resolved)
+
+            accepted = []
+            for row, user_key, values in resolved:
+                start = from_timestamp(values['start_ts'])
+                length = timedelta(minutes=values['duration_minutes'])
+                try:
+                    validate_hours(self.shifts, values['artist_id'], values['appointment_date'],
+                                   values['appointment_time'], length)
+                except BookingError as e:
+                    report.add(row, str(e))
+                    continue
+                calendar = self._calendar(values['artist_id'])
+                if calendar.conflicts(start, start + length):
+                    report.add(row, CONFLICT_REASON)
+                    continue
+                # Without an id until SQLite assigns one, enough to catch overlaps within the file
+                calendar.add(None, start, start + length)
+                accepted.append((row, user_key, values))
+            imported += self._insert(accepted, report)
+        return imported
+
+    def _insert(self, accepted, report):
+        """Insert a chunk in one transaction, or row by row when something booked meanwhile gets in the way."""
+        if not accepted:
+            return 0
+        try:
+            with self.bind.begin() as conn:
+                user_ids = self._user_ids(conn, {user_key for _, user_key, _ in accepted})
+                conn.execute(Appointment.__table__.insert(),
+                             [{**values, 'user_id': user_ids[user_key]} for _, user_key, values in accepted])
+            self.users.update(user_ids)
+            return len(accepted)
+        except IntegrityError:
+            pass
+
+        # Each row in its own savepoint, the ones the database refuses go to the report
+        imported = 0
+        with self.bind.begin() as conn:
+            for row, user_key, values in accepted:
+                try:
+                    with conn.begin_nested():
+                        user_ids = self._user_ids(conn, {user_key})
+                        conn.execute(Appointment.__table__.insert(), {**values, 'user_id': user_ids[user_key]})
+                except IntegrityError as e:
+                    report.add(row, CONFLICT_REASON if 'overlaps' in str(e.orig) else str(e.orig))
+                    continue
+                self.users.update(user_ids)
+                imported += 1
+        # The calendars are missing whatever was booked meanwhile
+        self._load_calendars({values['artist_id'] for _, _, values in accepted})
+        return imported
+
+    def _user_ids(self, conn, user_keys):
+        """{(name, phone): user_id} for the keys, adding the customers not seen yet."""
+        user_ids = {user_key: self.users[user_key] for user_key in user_keys if user_key in self.users}
+        new_users = [{'name': name, 'phone_number': phone} for name, phone in user_keys - user_ids.keys()]
+        if new_users:
+            # Someone else may have added the customer since the import started
+            statement = sqlite_insert(User).on_conflict_do_update(
+                index_elements=['name', 'phone_number'], set_={'name': sqlite_insert(User).excluded.name})
+            for user_id, name, phone in conn.execute(
+                    statement.returning(User.user_id, User.name, User.phone_number), new_users):
+                user_ids[name, phone] = user_id
+        return user_ids
+
+
+def import_bookings(path, report_path=None, fmt=None, bind=default_engine, chunk_size=CHUNK_SIZE):
+    """Import a CSV/JSONL file of bookings. Returns (imported, rejected)."""
+    fmt = fmt or detect_format(path)
+    report = RejectReport(report_path or os.path.splitext(path)[0] + '.rejected.csv')
+    try:
+        importer = BookingImporter(bind)
+        imported = importer.import_rows(read_bookings(path, fmt), report, chunk_size)
+    finally:
+        report.close()
+    return imported, report.count
+
+
+def export_bookings(path, fmt=None, bind=default_engine):
+    """Write every appointment to a CSV/JSONL file that import_bookings can read back.
+
+    Appointments whose user, service or artist row is missing are written with those
+    fields empty rather than left out. Returns (exported, incomplete).
+    """
+    fmt = fmt or detect_format(path)
+    query = (
+        select(User.name, User.phone_number, Service.name, Artist.name, Appointment.artist_id,
+               Appointment.appointment_date, Appointment.appointment_time,
+               User.user_id.is_(None) | Service.service_id.is_(None) | Artist.artist_id.is_(None))
+        .select_from(Appointment)
+        .outerjoin(User, Appointment.user_id == User.user_id)
+        .outerjoin(Service, Appointment.service_id == Service.service_id)
+        .outerjoin(Artist, Appointment.artist_id == Artist.artist_id)
+        .order_by(Appointment.appointment_id)
+    )
+    count = incomplete = 0
+    with bind.connect() as conn, open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(FIELDS)
+        for row in conn.execution_options(yield_per=CHUNK_SIZE).execute(query):
+            values = [row[0], row[1], row[2], row[3], row[4],
+                      row[5].isoformat(), row[6].strftime('%H:%M')]
+            if writer:
+                writer.writerow(values)
+            else:
+                f.write(json.dumps(dict(zip(FIELDS, values)), ensure_ascii=False) + '\n')
+            count += 1
+            incomplete += bool(row[7])
+    return count, incomplete
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk import and export of bookings.')
+    parser.add_argument('--database', help='SQLAlchemy URL, defaults to the application database')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='default: guessed from the file extension')
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help='import bookings from a file')
+    import_parser.add_argument('path')
+    import_parser.add_argument('--report', help='where to write rejected rows')
+    import_parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    export_parser = commands.add_parser('export', help='export all bookings to a file')
+    export_parser.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.database:
+        bind = create_engine(args.database)
+        Base.metadata.create_all(bind)
+        migrate_db(bind)
+    else:
+        bind = default_engine
+        init_db()
+
+    started = timer.perf_counter()
+    if args.command == 'import':
+        imported, rejected = import_bookings(args.path, args.report, args.format, bind, args.chunk_size)
+        print(f"Imported {imported} bookings, rejected {rejected} in {timer.perf_counter() - started:.1f}s")
+    else:
+        count, incomplete = export_bookings(args.path, args.format, bind)
+        print(f"Exported {count} bookings in {timer.perf_counter() - started:.1f}s")
+        if incomplete:
+            print(f"{incomplete} of them refer to a missing user, service or artist, left empty in the file")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import threading
+from typing import NamedTuple
+
+from database_setup import SessionLocal, Service, Artist, catalog_listeners
+
+
+class ServiceRecord(NamedTuple):
+    service_id: int
+    name: str
+    category: str
+    duration_minutes: int
+    buffer_minutes: int
+
+
+class ArtistRecord(NamedTuple):
+    artist_id: int
+    name: str
+    specialization: str
+
+
+class CatalogCache:
+    """Read-through cache of the service and artist catalog.
+
+    The whole catalog is loaded at once into immutable records and kept until
+    invalidate() is called by a writer.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def load(self):
+        """(Re)load the catalog from the database."""
+        db = self._session_factory()
+        try:
+            services = [ServiceRecord(*row) for row in db.query(
+                Service.service_id, Service.name, Service.category, Service.duration_minutes,
+                Service.buffer_minutes).order_by(Service.name)]
+            artists = [ArtistRecord(*row) for row in db.query(
+                Artist.artist_id, Artist.name, Artist.specialization).order_by(Artist.artist_id)]
+        finally:
+            db.close()
+        self.install(services, artists)
+
+    def install(self, services, artists):
+        """Replace the cached catalog with the given ServiceRecords and ArtistRecords."""
+        services_by_category = {}
+        for service in services:
+            services_by_category.setdefault(service.category, []).append(service)
+        artists_by_name = {}
+        artists_by_specialization = {}
+        for artist in artists:
+            artists_by_name.setdefault(artist.name, []).append(artist)
+            artists_by_specialization.setdefault(artist.specialization, []).append(artist)
+        # An artist can perform every service of their specialization
+        eligible_artists = {
+            service.service_id: tuple(artists_by_specialization.get(service.category, ()))
+            for service in services
+        }
+
+        with self._lock:
+            self._services = tuple(services)
+            self._services_by_category = {key: tuple(value) for key, value in services_by_category.items()}
+            self._services_by_name = {service.name: service for service in services}
+            self._services_by_id = {service.service_id: service for service in services}
+            self._eligible_artists = eligible_artists
+            self._artists = tuple(artists)
+            self._artists_by_id = {artist.artist_id: artist for artist in artists}
+            self._artists_by_name = {key: tuple(value) for key, value in artists_by_name.items()}
+            self._loaded = True
+            self.loads += 1
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            self.hits += 1
+            return
+        # Lookups may come from several DB worker threads, only one of them loads
+        with self._load_lock:
+            if self._loaded:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.load()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+
+    def services(self):
+        self._ensure_loaded()
+        return self._services
+
+    def services_by_category(self, category):
+        self._ensure_loaded()
+        return self._services_by_category.get(category, ())
+
+    def service_by_name(self, name):
+        self._ensure_loaded()
+        return self._services_by_name.get(name)
+
+    def service_by_id(self, service_id):
+        self._ensure_loaded()
+        return self._services_by_id.get(service_id)
+
+    def eligible_artists(self, service_id):
+        """Artists able to perform the service, ordered by artist_id."""
+        self._ensure_loaded()
+        return self._eligible_artists.get(service_id, ())
+
+    def artists(self):
+        self._ensure_loaded()
+        return self._artists
+
+    def artist_by_id(self, artist_id):
+        self._ensure_loaded()
+        return self._artists_by_id.get(artist_id)
+
+    def artist_by_name(self, name):
+        """First artist with the given name, or None."""
+        self._ensure_loaded()
+        matches = self._artists_by_name.get(name)
+        return matches[0] if matches else None
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'loads': self.loads}
+
+
+# Process-wide catalog, dropped whenever database_setup reports a catalog change
+catalog = CatalogCache()
+catalog_listeners.append(catalog.invalidate)
@@ -1,10 +1,22 @@
-from sqlalchemy import create_engine, Column, Integer, String, Enum, Date, Time, ForeignKey
+import calendar
+import os
+from datetime import datetime, timedelta
+from functools import partial
+
+from sqlalchemy import (create_engine, event, inspect, select, text, Column, Computed, Integer, String, Enum, Date, Time,
+                        ForeignKey, Index)
 from sqlalchemy.orm import relationship, sessionmaker, declarative_base
-from sqlalchemy.orm import joinedload
+from sqlalchemy.pool import QueuePool, StaticPool
+
+import instrumentation
 
 # Define the base class for declarative models
 Base = declarative_base()
 
+# How long appointments block an artist when nothing else is known, e.g. bookings made
+# before services had a duration
+DEFAULT_DURATION_MINUTES = 119
+
 
 # Define the User model
 class User(Base):
@@ -13,6 +25,10 @@ class User(Base):
     name = Column(String, nullable=False)
     phone_number = Column(String, nullable=False)
 
+    __table_args__ = (
+        Index('ix_users_name_phone', 'name', 'phone_number', unique=True),
+    )
+
 
 # Define the Service model
 class Service(Base):
@@ -20,6 +36,14 @@ class Service(Base):
     service_id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False)
     category = Column(Enum('nails', 'hair', 'cosmetics'), nullable=False)
+    # Time with the client, and the clean-up/preparation the artist needs afterwards
+    duration_minutes = Column(Integer, nullable=False, default=DEFAULT_DURATION_MINUTES,
+                              server_default=str(DEFAULT_DURATION_MINUTES))
+    buffer_minutes = Column(Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        Index('ix_services_name', 'name', unique=True),
+    )
 
 
 # Define the Artist model
@@ -39,13 +63,45 @@ class Appointment(Base):
     service_id = Column(Integer, ForeignKey('Services.service_id'))
     appointment_date = Column(Date)
     appointment_time = Column(Time)
+    # Start as seconds since the epoch and length in minutes, so overlap checks are one range predicate.
+    # duration_minutes is the whole time the artist is blocked, the service's buffer included
+    start_ts = Column(Integer)
+    duration_minutes = Column(Integer, nullable=False, default=DEFAULT_DURATION_MINUTES,
+                              server_default=str(DEFAULT_DURATION_MINUTES))
+    # Computed by SQLite, so no writer can get it out of step with start_ts and duration_minutes
+    end_ts = Column(Integer, Computed('start_ts + duration_minutes * 60', persisted=False))
 
     user = relationship('User')
     artist = relationship('Artist')
     service = relationship('Service')
 
+    __table_args__ = (
+        Index('ix_appointments_artist_date_time', 'artist_id', 'appointment_date', 'appointment_time'),
+        Index('ix_appointments_artist_start', 'artist_id', 'start_ts'),
+    )
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_timestamp(appointment_date, appointment_time):
+    """Convert a date and time to the integer start_ts stored on appointments."""
+    return calendar.timegm(datetime.combine(appointment_date, appointment_time).timetuple())
+
+
+def from_timestamp(timestamp):
+    return EPOCH + timedelta(seconds=timestamp)
 
-# Define the Availability model
+
+@event.listens_for(Appointment, 'before_insert')
+@event.listens_for(Appointment, 'before_update')
+def _set_start_ts(mapper, connection, appointment):
+    if appointment.appointment_date is not None and appointment.appointment_time is not None:
+        appointment.start_ts = to_timestamp(appointment.appointment_date, appointment.appointment_time)
+
+
+# Define the Availability model: one row per bookable start time, superseded by the shift
+# tables below and no longer read; kept so existing databases still load
 class Availability(Base):
     __tablename__ = 'Availability'
     availability_id = Column(Integer, primary_key=True, autoincrement=True)
@@ -55,20 +111,387 @@ class Availability(Base):
 
     artist = relationship('Artist')
 
+    __table_args__ = (
+        Index('ix_availability_artist_date', 'artist_id', 'available_date'),
+    )
+
+
+SHIFT_EXCEPTION_KINDS = ('holiday', 'sick', 'leave', 'extra')
+
+
+# Define the ShiftTemplate model: an artist's weekly working hours, one row per weekday and
+# shift. Artists without any template work whenever the salon is open
+class ShiftTemplate(Base):
+    __tablename__ = 'ShiftTemplates'
+    shift_id = Column(Integer, primary_key=True, autoincrement=True)
+    artist_id = Column(Integer, ForeignKey('Artists.artist_id'), nullable=False)
+    # 0 is Monday, as date.weekday()
+    weekday = Column(Integer, nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    # Inclusive, open-ended when NULL
+    valid_from = Column(Date)
+    valid_until = Column(Date)
+
+    artist = relationship('Artist')
+
+    __table_args__ = (
+        Index('ix_shift_templates_artist', 'artist_id'),
+    )
+
+
+# Define the ShiftException model: days or hours off (holiday, sick, leave) or extra hours
+# ('extra') between two dates. No artist means everyone, e.g. a public holiday
+class ShiftException(Base):
+    __tablename__ = 'ShiftExceptions'
+    exception_id = Column(Integer, primary_key=True, autoincrement=True)
+    artist_id = Column(Integer, ForeignKey('Artists.artist_id'))
+    first_date = Column(Date, nullable=False)
+    last_date = Column(Date, nullable=False)
+    # The whole day when NULL; extra hours without times are the salon's opening hours
+    start_time = Column(Time)
+    end_time = Column(Time)
+    kind = Column(Enum(*SHIFT_EXCEPTION_KINDS), nullable=False)
+
+    artist = relationship('Artist')
+
+    __table_args__ = (
+        Index('ix_shift_exceptions_artist_last_date', 'artist_id', 'last_date'),
+    )
+
+
+# Define the DailySummary model: per day, artist and service category totals of the
+# appointments, kept up to date by the SUMMARY_TRIGGERS on "Appointments"
+class DailySummary(Base):
+    __tablename__ = 'DailySummary'
+    day = Column(Date, primary_key=True)
+    artist_id = Column(Integer, primary_key=True)
+    # '' for appointments whose service no longer exists
+    category = Column(String, primary_key=True)
+    appointments = Column(Integer, nullable=False)
+    busy_minutes = Column(Integer, nullable=False)
+    first_start_ts = Column(Integer, nullable=False)
+    last_end_ts = Column(Integer, nullable=False)
+
 
 # Define the SQLite database URL
 DATABASE_URL = 'sqlite:///./beauty_salon.db'
 
+# Connection settings per deployment, selected with the BEAUTY_SALON_DB_PROFILE environment variable.
+# 'legacy' keeps SQLite's defaults, 'desktop' suits one terminal, 'shared' several terminals and a kiosk.
+ENGINE_PROFILES = {
+    'legacy': {
+        'pragmas': {},
+        'pool_size': 5,
+        'max_overflow': 10,
+    },
+    'desktop': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'cache_size': -32000,  # negative values are KiB, i.e. 32 MB
+            'mmap_size': 134217728,
+            'temp_store': 'MEMORY',
+        },
+        'pool_size': 4,
+        'max_overflow': 4,
+    },
+    'shared': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 15000,
+            'cache_size': -64000,
+            'mmap_size': 268435456,
+            'temp_store': 'MEMORY',
+        },
+        'pool_size': 8,
+        'max_overflow': 8,
+    },
+}
+DEFAULT_PROFILE = os.environ.get('BEAUTY_SALON_DB_PROFILE', 'desktop')
+
+
+def _apply_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+def pragma_listener(profile=DEFAULT_PROFILE):
+    """'connect' event listener applying the profile's pragmas, for engines not made by create_salon_engine."""
+    return partial(_apply_pragmas, ENGINE_PROFILES[profile]['pragmas'])
+
+
+def create_salon_engine(url=DATABASE_URL, profile=DEFAULT_PROFILE):
+    """Create an engine that applies the profile's pragmas on every new connection."""
+    settings = ENGINE_PROFILES[profile]
+    if url in ('sqlite://', 'sqlite:///:memory:'):
+        # One shared connection, otherwise every connection would see its own empty database
+        new_engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        new_engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=QueuePool,
+            pool_size=settings['pool_size'],
+            max_overflow=settings['max_overflow'],
+            pool_timeout=30,
+        )
+    event.listen(new_engine, 'connect', pragma_listener(profile))
+    if instrumentation.enabled:
+        instrumentation.instrument_engine(new_engine)
+    return new_engine
+
+
 # Create the SQLAlchemy engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_salon_engine()
 
 # Create a session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-def init_db():
+# Callbacks run after services or artists change, used to invalidate in-memory caches
+catalog_listeners = []
+
+
+def notify_catalog_changed():
+    for listener in catalog_listeners:
+        listener()
+
+
+# Callbacks run with (user_id, name, phone_number) after a booking saved a customer
+customer_listeners = []
+
+
+def notify_customer_saved(user_id, name, phone_number):
+    for listener in customer_listeners:
+        listener(user_id, name, phone_number)
+
+
+# Callbacks run after shift templates or exceptions change
+shift_listeners = []
+
+
+def notify_shifts_changed():
+    for listener in shift_listeners:
+        listener()
+
+
+# Longest booking the overlap guard looks back for, keeps its lookup on the (artist_id, start_ts) index
+MAX_APPOINTMENT_SECONDS = 24 * 60 * 60
+
+# NEW.end_ts is not computed yet in a BEFORE trigger (NULL when start_ts changes), so the new
+# row's end is spelled out; the existing row's end_ts is fine
+_OVERLAP_CONDITION = (
+    'SELECT RAISE(ABORT, \'appointment overlaps an existing booking\') '
+    'WHERE EXISTS (SELECT 1 FROM "Appointments" a '
+    'WHERE a.artist_id = NEW.artist_id '
+    f'AND a.start_ts > NEW.start_ts - {MAX_APPOINTMENT_SECONDS} '
+    'AND a.start_ts < NEW.start_ts + NEW.duration_minutes * 60 '
+    'AND a.end_ts > NEW.start_ts '
+    'AND a.appointment_id IS NOT NEW.appointment_id);'
+)
+
+# Database-level guard against double booking, holds even for writers that skip the Python checks.
+# Written the way sqlite_master stores them, so migrate_db can tell when one is out of date.
+OVERLAP_GUARD = {
+    'appointments_no_overlap_insert':
+        'CREATE TRIGGER appointments_no_overlap_insert '
+        'BEFORE INSERT ON "Appointments" WHEN NEW.start_ts IS NOT NULL '
+        f'BEGIN {_OVERLAP_CONDITION} END',
+    'appointments_no_overlap_update':
+        'CREATE TRIGGER appointments_no_overlap_update '
+        'BEFORE UPDATE OF artist_id, start_ts, duration_minutes ON "Appointments" WHEN NEW.start_ts IS NOT NULL '
+        f'BEGIN {_OVERLAP_CONDITION} END',
+}
+
+
+# Appointments counted in DailySummary, and the summary row an appointment belongs to
+_SUMMARIZED = '{row}.artist_id IS NOT NULL AND {row}.appointment_date IS NOT NULL AND {row}.start_ts IS NOT NULL'
+_SUMMARY_CATEGORY = 'COALESCE((SELECT category FROM "Services" WHERE service_id = {row}.service_id), \'\')'
+_SUMMARY_COLUMNS = '"DailySummary" (day, artist_id, category, appointments, busy_minutes, first_start_ts, last_end_ts)'
+_SUMMARY_SELECT = (
+    'SELECT a.appointment_date, a.artist_id, COALESCE(s.category, \'\'), count(*), sum(a.duration_minutes), '
+    'min(a.start_ts), max(a.end_ts) '
+    'FROM "Appointments" a LEFT JOIN "Services" s ON s.service_id = a.service_id '
+    f'WHERE {_SUMMARIZED.format(row="a")} '
+)
+
+
+def _summary_recount(row):
+    """Statements recounting the summary row of the OLD or NEW appointment from scratch."""
+    category = _SUMMARY_CATEGORY.format(row=row)
+    return (
+        f'DELETE FROM "DailySummary" WHERE day = {row}.appointment_date AND artist_id = {row}.artist_id '
+        f'AND category = {category}; '
+        f'INSERT INTO {_SUMMARY_COLUMNS} {_SUMMARY_SELECT}'
+        f'AND a.artist_id = {row}.artist_id AND a.appointment_date = {row}.appointment_date '
+        f'AND COALESCE(s.category, \'\') = {category} '
+        'GROUP BY a.appointment_date, a.artist_id, COALESCE(s.category, \'\'); '
+    )
+
+
+# Keep DailySummary in step with "Appointments" inside the writing transaction, whoever the writer is.
+# A booking adds to its row; updates and deletes, which are rare, recount the rows they touch.
+SUMMARY_TRIGGERS = {
+    'appointments_summary_insert':
+        'CREATE TRIGGER appointments_summary_insert '
+        f'AFTER INSERT ON "Appointments" WHEN {_SUMMARIZED.format(row="NEW")} '
+        f'BEGIN INSERT INTO {_SUMMARY_COLUMNS} '
+        f'VALUES (NEW.appointment_date, NEW.artist_id, {_SUMMARY_CATEGORY.format(row="NEW")}, 1, '
+        'NEW.duration_minutes, NEW.start_ts, NEW.end_ts) '
+        'ON CONFLICT (day, artist_id, category) DO UPDATE SET '
+        'appointments = appointments + 1, busy_minutes = busy_minutes + excluded.busy_minutes, '
+        'first_start_ts = min(first_start_ts, excluded.first_start_ts), '
+        'last_end_ts = max(last_end_ts, excluded.last_end_ts); END',
+    'appointments_summary_update':
+        'CREATE TRIGGER appointments_summary_update '
+        'AFTER UPDATE OF artist_id, service_id, appointment_date, start_ts, duration_minutes ON "Appointments" '
+        'WHEN OLD.artist_id IS NOT NEW.artist_id OR OLD.service_id IS NOT NEW.service_id '
+        'OR OLD.appointment_date IS NOT NEW.appointment_date OR OLD.start_ts IS NOT NEW.start_ts '
+        'OR OLD.duration_minutes IS NOT NEW.duration_minutes '
+        f'BEGIN {_summary_recount("OLD")}{_summary_recount("NEW")}END',
+    'appointments_summary_delete':
+        'CREATE TRIGGER appointments_summary_delete '
+        f'AFTER DELETE ON "Appointments" WHEN {_SUMMARIZED.format(row="OLD")} '
+        f'BEGIN {_summary_recount("OLD")}END',
+}
+
+
+def rebuild_daily_summary(conn):
+    """Recompute DailySummary from every appointment, e.g. after a service changed category."""
+    conn.execute(text('DELETE FROM "DailySummary"'))
+    conn.execute(text(f'INSERT INTO {_SUMMARY_COLUMNS} {_SUMMARY_SELECT}'
+                      'GROUP BY a.appointment_date, a.artist_id, COALESCE(s.category, \'\')'))
+
+
+# Surviving artists of a merge that would give them overlapping bookings, from two of their duplicates
+_ARTIST_MERGE_CLASHES = (
+    'WITH survivor AS ('
+    '  SELECT a1.artist_id, MIN(a2.artist_id) AS keep_id FROM "Artists" a1 JOIN "Artists" a2'
+    '  ON a1.name = a2.name AND a1.specialization = a2.specialization'
+    '  GROUP BY a1.artist_id HAVING COUNT(*) > 1) '
+    'SELECT DISTINCT s1.keep_id, a.name, a.specialization '
+    'FROM survivor s1 JOIN survivor s2 ON s2.keep_id = s1.keep_id AND s2.artist_id > s1.artist_id '
+    'JOIN "Appointments" x ON x.artist_id = s1.artist_id '
+    'JOIN "Appointments" y ON y.artist_id = s2.artist_id '
+    f'AND y.start_ts > x.start_ts - {MAX_APPOINTMENT_SECONDS} AND y.start_ts < x.end_ts AND y.end_ts > x.start_ts '
+    'JOIN "Artists" a ON a.artist_id = s1.keep_id '
+    'ORDER BY s1.keep_id'
+)
+
+
+def _has_duplicates(conn, table, columns):
+    """Whether rows of table share the given columns; uses the unique index once it exists."""
+    return conn.execute(text(
+        f'SELECT 1 FROM "{table}" GROUP BY {columns} HAVING COUNT(*) > 1 LIMIT 1')).first() is not None
+
+
+def _duplicate_ids(table, key, columns):
+    """Subquery of the keys of the rows duplicating an earlier row of table."""
+    return f'SELECT {key} FROM "{table}" WHERE {key} NOT IN (SELECT MIN({key}) FROM "{table}" GROUP BY {columns})'
+
+
+def init_db(bind=engine):
     """Create database tables."""
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=bind)
+    migrate_db(bind)
+
+
+def migrate_db(bind=engine):
+    """Bring an existing database up to the current schema in place."""
+    with bind.begin() as conn:
+        columns = {column['name'] for column in inspect(conn).get_columns('Appointments')}
+        if 'start_ts' not in columns:
+            conn.execute(text('ALTER TABLE "Appointments" ADD COLUMN start_ts INTEGER'))
+        if 'duration_minutes' not in columns:
+            conn.execute(text('ALTER TABLE "Appointments" ADD COLUMN duration_minutes INTEGER NOT NULL '
+                              f'DEFAULT {DEFAULT_DURATION_MINUTES}'))
+        if 'end_ts' not in columns:
+            # SQLite can only add virtual generated columns to an existing table
+            conn.execute(text('ALTER TABLE "Appointments" ADD COLUMN end_ts INTEGER '
+                              'GENERATED ALWAYS AS (start_ts + duration_minutes * 60) VIRTUAL'))
+
+        service_columns = {column['name'] for column in inspect(conn).get_columns('Services')}
+        if 'duration_minutes' not in service_columns:
+            conn.execute(text('ALTER TABLE "Services" ADD COLUMN duration_minutes INTEGER NOT NULL '
+                              f'DEFAULT {DEFAULT_DURATION_MINUTES}'))
+            conn.execute(text('ALTER TABLE "Services" ADD COLUMN buffer_minutes INTEGER NOT NULL DEFAULT 0'))
+            # Known services get their real length, anything else keeps the old fixed block
+            conn.execute(text('UPDATE "Services" SET duration_minutes = :duration, buffer_minutes = :buffer '
+                              'WHERE name = :name'),
+                         [{'name': name, 'duration': duration, 'buffer': buffer}
+                          for name, _, duration, buffer in DEFAULT_SERVICES])
+
+        # Times are stored as 'HH:MM:SS.ffffff', strftime only needs the first 8 characters
+        conn.execute(text(
+            'UPDATE "Appointments" '
+            "SET start_ts = CAST(strftime('%s', appointment_date || ' ' || substr(appointment_time, 1, 8)) AS INTEGER) "
+            'WHERE start_ts IS NULL AND appointment_date IS NOT NULL AND appointment_time IS NOT NULL'
+        ))
+
+        # Merge duplicate services, artists and users (populate_db used to re-add them). Probed first:
+        # the merge rewrites the rows pointing at them through the triggers, under the write lock
+        if _has_duplicates(conn, 'Services', 'name'):
+            duplicates = _duplicate_ids('Services', 'service_id', 'name')
+            conn.execute(text(
+                'UPDATE "Appointments" SET service_id = ('
+                '  SELECT MIN(s2.service_id) FROM "Services" s1 JOIN "Services" s2 ON s1.name = s2.name'
+                '  WHERE s1.service_id = "Appointments".service_id)'
+                f' WHERE service_id IN ({duplicates})'
+            ))
+            conn.execute(text(f'DELETE FROM "Services" WHERE service_id IN ({duplicates})'))
+        if _has_duplicates(conn, 'Artists', 'name, specialization'):
+            duplicates = _duplicate_ids('Artists', 'artist_id', 'name, specialization')
+            # Merging must not stack two bookings on the surviving artist, such duplicates stay apart
+            clashes = conn.execute(text(_ARTIST_MERGE_CLASHES)).all()
+            for artist_id, name, specialization in clashes:
+                print(f"Not merging the duplicates of artist {artist_id} ({name}, {specialization}): "
+                      "their bookings overlap")
+            if clashes:
+                duplicates += (' AND (name, specialization) NOT IN (SELECT name, specialization FROM "Artists" '
+                               f'WHERE artist_id IN ({", ".join(str(row[0]) for row in clashes)}))')
+            for table in ('Appointments', 'Availability'):
+                conn.execute(text(
+                    f'UPDATE "{table}" SET artist_id = ('
+                    '  SELECT MIN(a2.artist_id) FROM "Artists" a1 JOIN "Artists" a2'
+                    '  ON a1.name = a2.name AND a1.specialization = a2.specialization'
+                    f'  WHERE a1.artist_id = "{table}".artist_id)'
+                    f' WHERE artist_id IN ({duplicates})'
+                ))
+            conn.execute(text(f'DELETE FROM "Artists" WHERE artist_id IN ({duplicates})'))
+        if _has_duplicates(conn, 'Users', 'name, phone_number'):
+            duplicates = _duplicate_ids('Users', 'user_id', 'name, phone_number')
+            conn.execute(text(
+                'UPDATE "Appointments" SET user_id = ('
+                '  SELECT MIN(u2.user_id) FROM "Users" u1 JOIN "Users" u2'
+                '  ON u1.name = u2.name AND u1.phone_number = u2.phone_number'
+                '  WHERE u1.user_id = "Appointments".user_id)'
+                f' WHERE user_id IN ({duplicates})'
+            ))
+            conn.execute(text(f'DELETE FROM "Users" WHERE user_id IN ({duplicates})'))
+
+        for table in (DailySummary, ShiftTemplate, ShiftException):
+            table.__table__.create(conn, checkfirst=True)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+        # Replace triggers created from an older definition
+        triggers = dict(conn.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")).all())
+        stale_summary = False
+        for name, statement in {**OVERLAP_GUARD, **SUMMARY_TRIGGERS}.items():
+            if triggers.get(name) != statement:
+                conn.execute(text(f'DROP TRIGGER IF EXISTS {name}'))
+                conn.execute(text(statement))
+                stale_summary = stale_summary or name in SUMMARY_TRIGGERS
+        # Appointments written while the summary triggers were missing or different are not counted yet
+        if stale_summary:
+            rebuild_daily_summary(conn)
+    notify_catalog_changed()
 
 
 def delete_all_users():
@@ -98,78 +521,86 @@ def delete_all_data():
     finally:
         db.close()
 
+
+# Services and artists added by populate_db(); services are (name, category, duration, buffer) in minutes
+DEFAULT_SERVICES = [
+    ('Manichiura Semipermanentă', 'nails', 60, 10),
+    ('Manichiura Gel', 'nails', 90, 10),
+    ('Manichiura Simplă', 'nails', 40, 10),
+    ('Întreținere Manichiură', 'nails', 75, 10),
+    ('Pedichiură Semipermanentă', 'nails', 75, 10),
+    ('Întreținere Pedichiură', 'nails', 60, 10),
+    ('Manichiură și Pedichiură Simplă', 'nails', 90, 10),
+    ('Manichiură și Pedichiură Semipermanentă', 'nails', 120, 10),
+    ('Manichiură Gel și Pedichiură Simplă', 'nails', 140, 10),
+    ('Manichiură Gel și Pedichiură Semipermanentă', 'nails', 165, 15),
+    ('Tuns Păr Lung', 'hair', 45, 10),
+    ('Tuns Păr Scurt', 'hair', 30, 10),
+    ('Tuns Păr Mediu', 'hair', 40, 10),
+    # ('Coafat', 'hair'),
+    ('Tuns Păr Lung + Coafat', 'hair', 90, 10),
+    ('Tuns Păr Scurt + Coafat', 'hair', 60, 10),
+    ('Tuns Păr Mediu + Coafat', 'hair', 75, 10),
+    ('Vopsit Păr Lung', 'hair', 150, 15),
+    ('Vopsit Păr Scurt', 'hair', 90, 15),
+    ('Vopsit Păr Mediu', 'hair', 120, 15),
+    ('Decolorare Păr Scurt', 'hair', 120, 15),
+    ('Decolorare Păr Lung', 'hair', 210, 15),
+    ('Decolorare Păr Mediu', 'hair', 165, 15),
+    ('Spălat', 'hair', 15, 5),
+    ('Coafat Păr Lung', 'hair', 60, 10),
+    ('Coafat Păr Scurt', 'hair', 30, 10),
+    ('Coafat Păr Mediu', 'hair', 45, 10),
+    ('Coafat Ocazie', 'hair', 90, 10),
+    ('Epilare Definitivă Full Body', 'cosmetics', 120, 15),
+    ('Epilare Definitivă Zona Inghinală', 'cosmetics', 30, 10),
+    ('Epilare Definitivă Axile', 'cosmetics', 20, 10),
+    ('Epilare Definitivă Mâini', 'cosmetics', 30, 10),
+    ('Epilare Definitivă Picioare', 'cosmetics', 60, 10),
+    ('Epilare cu Ceară Full-Body', 'cosmetics', 90, 10),
+    ('Epilare cu Ceară Axile', 'cosmetics', 15, 5),
+    ('Epilare cu Ceară Zona Inghinală', 'cosmetics', 30, 10),
+    ('Epilare cu Ceară Picioare', 'cosmetics', 45, 10),
+    ('Epilare cu Ceară Mâini', 'cosmetics', 30, 5),
+    ('Epilare cu Ceară Mustață', 'cosmetics', 10, 5),
+    ('Pensat', 'cosmetics', 15, 5),
+    ('Machiaj de Zi', 'cosmetics', 45, 10),
+    ('Machiaj de Seară', 'cosmetics', 60, 10),
+    ('Machiaj de Ocazie', 'cosmetics', 75, 10),
+    ('Remodelare Corporală', 'cosmetics', 60, 15),
+    ('Ședință de Îndepărtare Tatuaj', 'cosmetics', 45, 15),
+    ('Solar', 'cosmetics', 15, 10)
+]
+
+DEFAULT_ARTISTS = [
+    ('Roxana', 'nails'),
+    ('Maria', 'nails'),
+    ('Eva', 'cosmetics'),
+    ('Daria', 'hair'),
+    ('Roxana', 'hair'),
+    ('Maria', 'hair'),
+]
+
+
 def populate_db():
     """Populate the database with initial data."""
     db = SessionLocal()
 
-    # Add services
-    services = [
-        ('Manichiura Semipermanentă', 'nails'),
-        ('Manichiura Gel', 'nails'),
-        ('Manichiura Simplă', 'nails'),
-        ('Întreținere Manichiură', 'nails'),
-        ('Pedichiură Semipermanentă', 'nails'),
-        ('Întreținere Pedichiură', 'nails'),
-        ('Manichiură și Pedichiură Simplă', 'nails'),
-        ('Manichiură și Pedichiură Semipermanentă', 'nails'),
-        ('Manichiură Gel și Pedichiură Simplă', 'nails'),
-        ('Manichiură Gel și Pedichiură Semipermanentă', 'nails'),
-        ('Tuns Păr Lung', 'hair'),
-        ('Tuns Păr Scurt', 'hair'),
-        ('Tuns Păr Mediu', 'hair'),
-        # ('Coafat', 'hair'),
-        ('Tuns Păr Lung + Coafat', 'hair'),
-        ('Tuns Păr Scurt + Coafat', 'hair'),
-        ('Tuns Păr Mediu + Coafat', 'hair'),
-        ('Vopsit Păr Lung', 'hair'),
-        ('Vopsit Păr Scurt', 'hair'),
-        ('Vopsit Păr Mediu', 'hair'),
-        ('Decolorare Păr Scurt', 'hair'),
-        ('Decolorare Păr Lung', 'hair'),
-        ('Decolorare Păr Mediu', 'hair'),
-        ('Spălat', 'hair'),
-        ('Coafat Păr Lung', 'hair'),
-        ('Coafat Păr Scurt', 'hair'),
-        ('Coafat Păr Mediu', 'hair'),
-        ('Coafat Ocazie', 'hair'),
-        ('Epilare Definitivă Full Body', 'cosmetics'),
-        ('Epilare Definitivă Zona Inghinală', 'cosmetics'),
-        ('Epilare Definitivă Axile', 'cosmetics'),
-        ('Epilare Definitivă Mâini', 'cosmetics'),
-        ('Epilare Definitivă Picioare', 'cosmetics'),
-        ('Epilare cu Ceară Full-Body', 'cosmetics'),
-        ('Epilare cu Ceară Axile', 'cosmetics'),
-        ('Epilare cu Ceară Zona Inghinală', 'cosmetics'),
-        ('Epilare cu Ceară Picioare', 'cosmetics'),
-        ('Epilare cu Ceară Mâini', 'cosmetics'),
-        ('Epilare cu Ceară Mustață', 'cosmetics'),
-        ('Pensat', 'cosmetics'),
-        ('Machiaj de Zi', 'cosmetics'),
-        ('Machiaj de Seară', 'cosmetics'),
-        ('Machiaj de Ocazie', 'cosmetics'),
-        ('Remodelare Corporală', 'cosmetics'),
-        ('Ședință de Îndepărtare Tatuaj', 'cosmetics'),
-        ('Solar', 'cosmetics')
-    ]
-
-    for name, category in services:
-        db.add(Service(name=name, category=category))
+    # Service names are unique, only add the ones that are missing
+    existing_services = {name for name, in db.query(Service.name)}
+    for name, category, duration, buffer in DEFAULT_SERVICES:
+        if name not in existing_services:
+            db.add(Service(name=name, category=category, duration_minutes=duration, buffer_minutes=buffer))
 
     # Add artists
-    artists = [
-        ('Roxana', 'nails'),
-        ('Maria', 'nails'),
-        ('Eva', 'cosmetics'),
-        ('Daria', 'hair'),
-        ('Roxana', 'hair'),
-        ('Maria', 'hair'),
-    ]
-
-    for name, specialization in artists:
-        db.add(Artist(name=name, specialization=specialization))
+    existing_artists = set(db.query(Artist.name, Artist.specialization))
+    for name, specialization in DEFAULT_ARTISTS:
+        if (name, specialization) not in existing_artists:
+            db.add(Artist(name=name, specialization=specialization))
 
     db.commit()  # Make sure to commit changes to the database
     db.close()  # Close the session
+    notify_catalog_changed()
 
 
 def update_service_names():
@@ -226,36 +657,76 @@ def update_service_names():
     }
 
     for old_name, new_name in updates.items():
-        db.query(Service).filter(Service.name == old_name).update({'name': new_name}, synchronize_session=False)
+        old_service = db.query(Service).filter(Service.name == old_name).first()
+        if old_service is None:
+            continue
+        # Names are unique, so fold the old entry into an existing one instead of renaming onto it
+        new_service = db.query(Service).filter(Service.name == new_name).first()
+        if new_service is None:
+            old_service.name = new_name
+        else:
+            db.query(Appointment).filter(Appointment.service_id == old_service.service_id).update(
+                {'service_id': new_service.service_id}, synchronize_session=False)
+            db.delete(old_service)
+        db.flush()
 
     db.commit()
     db.close()
-
-
-def get_appointment_details():
+    notify_catalog_changed()
+
+
+def iter_appointment_details(start_date=None, end_date=None, artist_id=None, category=None,
+                             after_id=None, limit=None, batch_size=1000, bind=None):
+    """Stream appointment details as named rows, ordered by appointment_id.
+
+    Only the displayed columns are selected and rows are fetched batch_size at a
+    time, so memory stays flat however many appointments there are. Appointments
+    whose user, service or artist is gone are kept, with None in those columns.
+    For keyset pagination pass the appointment_id of the last row seen as after_id.
+    """
+    query = select(
+        Appointment.appointment_id,
+        User.name.label('user_name'),
+        User.phone_number.label('user_phone'),
+        Service.name.label('service_name'),
+        Service.category,
+        Artist.name.label('artist_name'),
+        Appointment.appointment_date,
+        Appointment.appointment_time
+    ).select_from(Appointment).outerjoin(
+        User, Appointment.user_id == User.user_id
+    ).outerjoin(
+        Service, Appointment.service_id == Service.service_id
+    ).outerjoin(
+        Artist, Appointment.artist_id == Artist.artist_id
+    ).order_by(Appointment.appointment_id)
+
+    if start_date is not None:
+        query = query.where(Appointment.appointment_date >= start_date)
+    if end_date is not None:
+        query = query.where(Appointment.appointment_date <= end_date)
+    if artist_id is not None:
+        query = query.where(Appointment.artist_id == artist_id)
+    if category is not None:
+        query = query.where(Service.category == category)
+    if after_id is not None:
+        query = query.where(Appointment.appointment_id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+
+    with (bind or engine).connect() as conn:
+        for row in conn.execution_options(yield_per=batch_size).execute(query):
+            yield row
+
+
+def get_appointment_details(**filters):
     """Retrieve detailed appointment information."""
-    db = SessionLocal()
-
-    appointments = db.query(Appointment).options(
-        joinedload(Appointment.user),
-        joinedload(Appointment.artist),
-        joinedload(Appointment.service)
-    ).all()
-
     details = []
-    for appt in appointments:
-        detail = {
-            'user_name': appt.user.name,
-            'user_phone': appt.user.phone_number,
-            'service_name': appt.service.name,
-            'category': appt.service.category,
-            'artist_name': appt.artist.name,
-            'appointment_date': appt.appointment_date,
-            'appointment_time': appt.appointment_time
-        }
+    for row in iter_appointment_details(**filters):
+        detail = row._asdict()
+        # Only there for paging, the dicts keep the keys callers know
+        del detail['appointment_id']
         details.append(detail)
-
-    db.close()
     return details
 
 
@@ -0,0 +1,89 @@
+import itertools
+import traceback
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _TaskSignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class _DbTask(QRunnable):
+    def __init__(self, request_id, fn, args, kwargs):
+        super(_DbTask, self).__init__()
+        self.setAutoDelete(False)
+        self.request_id = request_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = _TaskSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(self.request_id, str(e))
+        else:
+            self.signals.finished.emit(self.request_id, result)
+
+
+class DbWorker(QObject):
+    """Runs database calls on a thread pool and delivers the results on the GUI thread.
+
+    Every call belongs to a channel (e.g. 'services'). Submitting a new call on a
+    channel cancels the previous one if it has not started yet, and the result of
+    a call that has been superseded is dropped instead of being delivered.
+    """
+
+    def __init__(self, parent=None, max_threads=2):
+        super(DbWorker, self).__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+        self._ids = itertools.count(1)
+        self._latest = {}
+        self._pending = {}
+
+    def submit(self, channel, fn, *args, on_result=None, on_error=None, **kwargs):
+        previous = self._latest.get(channel)
+        if previous is not None and previous in self._pending:
+            task = self._pending[previous][0]
+            if self._pool.tryTake(task):
+                del self._pending[previous]
+
+        request_id = next(self._ids)
+        task = _DbTask(request_id, fn, args, kwargs)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        self._latest[channel] = request_id
+        self._pending[request_id] = (task, channel, on_result, on_error)
+        self._pool.start(task)
+        return request_id
+
+    def is_busy(self, channel):
+        request_id = self._latest.get(channel)
+        return request_id is not None and request_id in self._pending
+
+    def wait(self, msecs=-1):
+        """Block until every submitted call has finished (used on shutdown)."""
+        return self._pool.waitForDone(msecs)
+
+    def _take(self, request_id):
+        entry = self._pending.pop(request_id, None)
+        if entry is None:
+            return None
+        task, channel, on_result, on_error = entry
+        if self._latest.get(channel) != request_id:
+            return None  # a newer call on the same channel replaced this one
+        return on_result, on_error
+
+    def _on_finished(self, request_id, result):
+        callbacks = self._take(request_id)
+        if callbacks is not None and callbacks[0] is not None:
+            callbacks[0](result)
+
+    def _on_failed(self, request_id, message):
+        callbacks = self._take(request_id)
+        if callbacks is not None and callbacks[1] is not None:
+            callbacks[1](message)
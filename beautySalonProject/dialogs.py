@@ -0,0 +1,51 @@
+import time
+
+from PyQt6.QtCore import QTimer
+
+import instrumentation
+
+
+class DialogFactory:
+    """Builds each dialog once and hands out the same warm instance afterwards.
+
+    Dialogs are built from the compiled Ui_* classes, so no .ui XML is parsed at
+    runtime. A dialog that defines reset() gets it called before being re-shown,
+    to clear whatever the previous visit left behind.
+    """
+
+    def __init__(self):
+        self._instances = {}
+        # dialog class name -> {'cold': seconds, 'warm': [seconds, ...]}
+        self.timings = {}
+
+    def get(self, dialog_class):
+        started = time.perf_counter()
+        dialog = self._instances.get(dialog_class)
+        timing = self.timings.setdefault(dialog_class.__name__, {'cold': None, 'warm': []})
+        if dialog is None:
+            dialog = dialog_class()
+            self._instances[dialog_class] = dialog
+            timing['cold'] = time.perf_counter() - started
+        else:
+            if hasattr(dialog, 'reset'):
+                dialog.reset()
+            timing['warm'].append(time.perf_counter() - started)
+        return dialog
+
+    def exec(self, dialog_class):
+        """Show the dialog modally, reusing the warm instance when there is one."""
+        token = instrumentation.start_action(f'open {dialog_class.__name__}')
+        dialog = self.get(dialog_class)
+        if token is not None:
+            # Runs once the dialog's event loop is up, i.e. the dialog is on screen
+            QTimer.singleShot(0, lambda: instrumentation.finish_action(token))
+        return dialog.exec()
+
+    def discard(self, dialog_class):
+        dialog = self._instances.pop(dialog_class, None)
+        if dialog is not None:
+            dialog.deleteLater()
+
+
+# Shared by every window of the application
+dialogs = DialogFactory()
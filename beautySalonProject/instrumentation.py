@@ -0,0 +1,267 @@
+"""Opt-in timing of SQL statements and UI actions.
+
+Disabled unless BEAUTY_SALON_INSTRUMENT=1 is set (or enable() is called). While
+disabled no SQLAlchemy event listener is attached and start_action() returns None
+straight away, so the hot paths pay nothing but one global lookup.
+
+When enabled:
+- every statement and UI action is recorded in a log2-bucketed histogram;
+- statements slower than BEAUTY_SALON_SLOW_MS (default 50) are appended to
+  slow_queries.jsonl together with their EXPLAIN QUERY PLAN;
+- snapshot() is written to BEAUTY_SALON_METRICS_FILE at exit, and served as
+  JSON on http://127.0.0.1:<BEAUTY_SALON_METRICS_PORT>/metrics when a port is set.
+
+This module imports nothing heavy, main.py loads it before the first frame.
+"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+
+SLOW_QUERY_LOG = 'slow_queries.jsonl'
+DEFAULT_SLOW_MS = 50
+# Bucket i holds durations of [2**(i-1), 2**i) microseconds, the last one everything above
+BUCKETS = 32
+
+enabled = False
+_settings = {'slow_ms': DEFAULT_SLOW_MS, 'slow_log': SLOW_QUERY_LOG}
+_engines = []
+_lock = threading.Lock()
+_statements = {}
+_actions = {}
+_counters = {'slow_statements': 0, 'errors': 0}
+_explained = set()
+_started = time.time()
+
+# Statements EXPLAIN QUERY PLAN accepts
+EXPLAINABLE = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'}
+# "IN (?, ?, ?)" of any length is one statement
+_PARAMETER_LIST = re.compile(r'\?(?:, \?)+')
+
+
+class Histogram:
+    """Count, sum, min, max and log2 buckets of durations in seconds."""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.buckets = [0] * BUCKETS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1000000).bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of the samples, in seconds."""
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(2 ** index / 1000000, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'min_ms': (self.min or 0.0) * 1000,
+            'max_ms': self.max * 1000,
+            'p50_ms': self.percentile(0.5) * 1000,
+            'p95_ms': self.percentile(0.95) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+        }
+
+
+def _record(table, key, seconds):
+    with _lock:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram()
+        histogram.add(seconds)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('instrumentation_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['instrumentation_started'].pop()
+    key = _PARAMETER_LIST.sub('?, ...', statement)
+    _record(_statements, key, elapsed)
+    if elapsed * 1000 >= _settings['slow_ms']:
+        _log_slow_query(conn, key, statement, parameters, executemany, elapsed)
+
+
+def _handle_error(exception_context):
+    with _lock:
+        _counters['errors'] += 1
+
+
+def _explain(conn, statement, parameters):
+    # A separate cursor, so the rows of the instrumented one are left alone
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+        return [row[-1] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(conn, key, statement, parameters, executemany, elapsed):
+    with _lock:
+        _counters['slow_statements'] += 1
+        first_time = key not in _explained
+        _explained.add(key)
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    entry = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'ms': round(elapsed * 1000, 3),
+        'statement': statement,
+        'parameters': [str(value)[:100] for value in (parameters or ())],
+        'executemany': executemany,
+    }
+    # The plan of a statement does not change between calls, capture it once
+    if first_time and statement.split(None, 1)[0].upper() in EXPLAINABLE:
+        try:
+            entry['plan'] = _explain(conn, statement, parameters)
+        except Exception as e:
+            entry['plan_error'] = str(e)
+    try:
+        with _lock, open(_settings['slow_log'], 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    except OSError as e:
+        print(f"Could not write the slow query log: {e}")
+
+
+def instrument_engine(engine):
+    """Time every statement run through engine (a sync Engine, or AsyncEngine.sync_engine)."""
+    from sqlalchemy import event
+    if engine in _engines:
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+    _engines.append(engine)
+
+
+def _detach_engines():
+    from sqlalchemy import event
+    for engine in _engines:
+        event.remove(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.remove(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.remove(engine, 'handle_error', _handle_error)
+    _engines.clear()
+
+
+def start_action(name):
+    """Start timing a UI action; pass the returned token to finish_action()."""
+    if not enabled:
+        return None
+    return name, time.perf_counter()
+
+
+def finish_action(token):
+    if token is None:
+        return
+    name, started = token
+    _record(_actions, name, time.perf_counter() - started)
+
+
+def snapshot():
+    """Counters and histogram summaries as a JSON-ready dict."""
+    with _lock:
+        return {
+            'enabled': enabled,
+            'uptime_s': round(time.time() - _started, 3),
+            'counters': dict(_counters,
+                             statements=sum(histogram.count for histogram in _statements.values()),
+                             actions=sum(histogram.count for histogram in _actions.values())),
+            'statements': {key: histogram.summary() for key, histogram in
+                           sorted(_statements.items(), key=lambda item: -item[1].total)},
+            'actions': {key: histogram.summary() for key, histogram in sorted(_actions.items())},
+        }
+
+
+def export(path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(snapshot(), file, indent=2, ensure_ascii=False)
+
+
+def reset():
+    with _lock:
+        _statements.clear()
+        _actions.clear()
+        _explained.clear()
+        for key in _counters:
+            _counters[key] = 0
+
+
+def serve(port, host='127.0.0.1'):
+    """Serve snapshot() as JSON on http://host:port/metrics from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = json.dumps(snapshot(), ensure_ascii=False).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
+
+
+def enable(slow_ms=DEFAULT_SLOW_MS, slow_log=SLOW_QUERY_LOG, export_path=None, port=None, engine=None):
+    """Turn instrumentation on. Engines made by create_salon_engine() from now on are
+    instrumented automatically; pass engine to instrument one that already exists."""
+    global enabled
+    _settings['slow_ms'] = slow_ms
+    _settings['slow_log'] = slow_log
+    enabled = True
+    if engine is not None:
+        instrument_engine(engine)
+    if export_path:
+        atexit.register(export, export_path)
+    if port:
+        serve(port)
+
+
+def disable():
+    global enabled
+    enabled = False
+    if _engines:
+        _detach_engines()
+
+
+def configure_from_env(environ=os.environ):
+    """Enable instrumentation when BEAUTY_SALON_INSTRUMENT is set to 1."""
+    if environ.get('BEAUTY_SALON_INSTRUMENT', '') not in ('1', 'true', 'yes'):
+        return False
+    enable(slow_ms=float(environ.get('BEAUTY_SALON_SLOW_MS', DEFAULT_SLOW_MS)),
+           slow_log=environ.get('BEAUTY_SALON_SLOW_LOG', SLOW_QUERY_LOG),
+           export_path=environ.get('BEAUTY_SALON_METRICS_FILE'),
+           port=int(environ.get('BEAUTY_SALON_METRICS_PORT', 0)) or None)
+    return True
@@ -0,0 +1,282 @@
+"""Plan one visit covering several services, back to back or in parallel across artists.
+
+The planner works on the cached ArtistCalendars and working hours of the ScheduleEngine,
+time outside an artist's shifts counting as booked. For every day of the horizon it runs
+a depth-first branch-and-bound over the order of the services, the eligible artist of
+each and its earliest free start, and keeps the best options ranked by the time the
+client is done.
+
+    python itinerary.py "Tuns Păr Mediu + Coafat" "Manichiură Gel" [--from 2025-06-02] [--days 14]
+                        [--options 5] [--sequential] [--in-order]
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Tuple
+
+from catalog import catalog as shared_catalog
+from scheduling import (OPENING_TIME, CLOSING_TIME, SLOT_GRANULARITY, appointment_length, free_starts, latest_start,
+                        with_closed, schedule as shared_schedule)
+
+PLAN_DAYS = 14
+PLAN_OPTIONS = 5
+# Longest the client waits between two services
+MAX_WAIT = timedelta(minutes=30)
+
+
+class ItineraryStep(NamedTuple):
+    service_id: int
+    artist_id: int
+    start: datetime
+    # When the client is done, the artist stays blocked for the service's buffer after that
+    end: datetime
+
+
+class Itinerary(NamedTuple):
+    start: datetime
+    end: datetime
+    # Time the client spends waiting between services
+    waiting: timedelta
+    steps: Tuple[ItineraryStep, ...]
+
+
+class _Service(NamedTuple):
+    service_id: int
+    category: str
+    duration: timedelta
+    # Duration plus buffer, what the artist's calendar is blocked for
+    length: timedelta
+    artist_ids: Tuple[int, ...]
+
+
+def earliest_start(busy, earliest, latest, length):
+    """First start in [earliest, latest] at which [start, start + length) misses all busy (start, end, ...) intervals.
+
+    busy must be sorted by start. Returns None when there is no such start.
+    """
+    start = earliest
+    for interval in busy:
+        if start > latest or interval[0] >= start + length:
+            break
+        if interval[1] > start:
+            start = interval[1]
+    return start if start <= latest else None
+
+
+def _remaining_bounds(services, remaining, parallel):
+    """(time the remaining services take at least, the same when one may join the previous service).
+
+    Back to back they take the sum of their durations; in parallel services of one
+    category still never overlap, so the busiest category's sum, and one service
+    joining the previous one saves at most its own duration.
+    """
+    if not parallel:
+        total = sum((services[index].duration for index in remaining), timedelta(0))
+        return total, total
+    totals = {}
+    for index in remaining:
+        service = services[index]
+        totals[service.category] = totals.get(service.category, timedelta(0)) + service.duration
+    alone = max(totals.values(), default=timedelta(0))
+    longest = max((services[index].duration for index in remaining), default=timedelta(0))
+    return alone, max(timedelta(0), alone - longest)
+
+
+class _DaySearch:
+    """Branch-and-bound over one day, adding options to a shared ranking."""
+
+    def __init__(self, services, bounds, busy, day, ranking, parallel, in_order, max_wait):
+        self.services = services
+        # remaining -> _remaining_bounds, shared by the days of one plan
+        self.bounds = bounds
+        self.busy = busy
+        self.day = day
+        self.ranking = ranking
+        self.parallel = parallel
+        self.in_order = in_order
+        self.max_wait = max_wait
+        self.seen = set()
+
+    def bound(self, remaining, free_at, can_join):
+        """Lower bound of the end of the visit."""
+        bounds = self.bounds.get(remaining)
+        if bounds is None:
+            bounds = self.bounds[remaining] = _remaining_bounds(self.services, remaining, self.parallel)
+        return free_at + bounds[can_join]
+
+    def candidates(self, remaining):
+        return remaining[:1] if self.in_order else remaining
+
+    def artist_busy(self, artist_id, planned):
+        busy = self.busy[artist_id]
+        mine = [(start, start + length) for step_artist, start, length in planned if step_artist == artist_id]
+        return sorted(busy + mine, key=lambda interval: interval[0]) if mine else busy
+
+    def first_steps(self, not_before):
+        """(end of the step, step) of every free grid start of every first service and artist."""
+        children = []
+        first = datetime.combine(self.day, OPENING_TIME)
+        if not_before is not None and not_before > first:
+            first += -((first - not_before) // SLOT_GRANULARITY) * SLOT_GRANULARITY
+        for index in self.candidates(tuple(range(len(self.services)))):
+            service = self.services[index]
+            last = latest_start(self.day, service.length)
+            for artist_id in service.artist_ids:
+                for start in free_starts(self.busy[artist_id], first, last, service.length, SLOT_GRANULARITY):
+                    children.append((start, start + service.duration, index, artist_id))
+        children.sort()
+        return children
+
+    def run(self, not_before):
+        everything = tuple(range(len(self.services)))
+        for start, end, index, artist_id in self.first_steps(not_before):
+            # Children come by start time, no later one can end the visit sooner
+            if self.ranking.worse(self.bound(everything, start, False)):
+                break
+            remaining = tuple(other for other in everything if other != index)
+            step = ItineraryStep(self.services[index].service_id, artist_id, start, end)
+            self.search(remaining, end, start, (step,), ((artist_id, start, self.services[index].length),),
+                        timedelta(0), index)
+
+    def search(self, remaining, free_at, visit_start, steps, planned, waiting, joinable):
+        """Extend steps; joinable is the index of the last service when it ran alone, else None."""
+        if not remaining:
+            self.ranking.add(Itinerary(visit_start, free_at, waiting, steps))
+            return
+        key = (remaining, free_at, joinable, planned)
+        if key in self.seen:
+            return
+        self.seen.add(key)
+
+        children = []
+        previous = steps[-1]
+        for index in self.candidates(remaining):
+            service = self.services[index]
+            last = latest_start(self.day, service.length)
+            # Alongside the previous service, with another category's artist
+            join = (self.parallel and joinable is not None
+                    and self.services[joinable].category != service.category)
+            for artist_id in service.artist_ids:
+                busy = self.artist_busy(artist_id, planned)
+                start = earliest_start(busy, free_at, min(last, free_at + self.max_wait), service.length)
+                if start is not None:
+                    children.append((start + service.duration, start, index, artist_id, start - free_at, False))
+                if join:
+                    start = earliest_start(busy, previous.start, min(last, previous.start + self.max_wait),
+                                           service.length)
+                    # Starting once the previous service is over is no join, the sequential child
+                    # above already covers it with its waiting
+                    if start is not None and start < free_at:
+                        # The client is busy with the previous service meanwhile, that is not waiting
+                        children.append((max(free_at, start + service.duration), start, index, artist_id,
+                                         timedelta(0), True))
+        children.sort()
+
+        for end, start, index, artist_id, wait, joined in children:
+            rest = tuple(other for other in remaining if other != index)
+            if self.ranking.worse(self.bound(rest, end, not joined)):
+                continue
+            service = self.services[index]
+            step = ItineraryStep(service.service_id, artist_id, start, start + service.duration)
+            self.search(rest, end, visit_start, steps + (step,),
+                        planned + ((artist_id, start, service.length),), waiting + wait,
+                        None if joined else index)
+
+
+class _Ranking:
+    """The best distinct itineraries found so far, by end, then length of the visit, then waiting."""
+
+    def __init__(self, size):
+        self.size = size
+        self.options = []
+        self.timetables = set()
+
+    def worse(self, end):
+        """Whether a visit ending at end cannot make it into a full ranking."""
+        return len(self.options) == self.size and end >= self.options[-1].end
+
+    def add(self, itinerary):
+        # The same times with other artists are not a new option, the first found is kept
+        timetable = tuple(sorted((step.service_id, step.start) for step in itinerary.steps))
+        if timetable in self.timetables:
+            return
+        self.timetables.add(timetable)
+        self.options.append(itinerary)
+        self.options.sort(key=lambda option: (option.end, option.end - option.start, option.waiting))
+        if len(self.options) > self.size:
+            dropped = self.options.pop()
+            self.timetables.discard(tuple(sorted((step.service_id, step.start) for step in dropped.steps)))
+
+
+def plan_itinerary(service_ids, first_date, days=PLAN_DAYS, options=PLAN_OPTIONS, parallel=True, in_order=False,
+                   max_wait=MAX_WAIT, not_before=None, schedule=shared_schedule, catalog=shared_catalog):
+    """Up to options Itineraries covering service_ids, the earliest ending first.
+
+    Services follow each other with at most max_wait in between; with parallel, a
+    service may also run alongside the previous one when their categories differ.
+    in_order keeps the services in the given order. The search stops after the first
+    day of the horizon that fills the ranking, later days cannot end sooner.
+    """
+    services = []
+    for service_id in service_ids:
+        service = catalog.service_by_id(service_id)
+        if service is None:
+            raise ValueError(f"Unknown service {service_id}")
+        artist_ids = tuple(artist.artist_id for artist in catalog.eligible_artists(service_id))
+        services.append(_Service(service_id, service.category, timedelta(minutes=service.duration_minutes),
+                                 appointment_length(service), artist_ids))
+    if not services:
+        return []
+
+    artist_ids = {artist_id for service in services for artist_id in service.artist_ids}
+    last_date = first_date + timedelta(days=days - 1)
+    hours = {artist_id: schedule.shifts.hours(artist_id, first_date, last_date) for artist_id in artist_ids}
+    ranking = _Ranking(options)
+    bounds = {}
+    for offset in range(days):
+        day = first_date + timedelta(days=offset)
+        opening = datetime.combine(day, OPENING_TIME)
+        closing = datetime.combine(day, CLOSING_TIME)
+        busy = {artist_id: with_closed(schedule.find_conflicts(artist_id, opening, closing), day,
+                                       hours[artist_id][day]) for artist_id in artist_ids}
+        _DaySearch(services, bounds, busy, day, ranking, parallel, in_order, max_wait).run(not_before)
+        if len(ranking.options) == options:
+            break
+    return ranking.options
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('services', nargs='+', help='service names')
+    parser.add_argument('--from', dest='first_date', type=date.fromisoformat, default=date.today())
+    parser.add_argument('--days', type=int, default=PLAN_DAYS)
+    parser.add_argument('--options', type=int, default=PLAN_OPTIONS)
+    parser.add_argument('--sequential', action='store_true', help='never run two services at the same time')
+    parser.add_argument('--in-order', action='store_true', help='keep the services in the given order')
+    args = parser.parse_args()
+
+    service_ids = []
+    for name in args.services:
+        service = shared_catalog.service_by_name(name)
+        if service is None:
+            parser.error(f"unknown service {name!r}")
+        service_ids.append(service.service_id)
+
+    started = time.perf_counter()
+    itineraries = plan_itinerary(service_ids, args.first_date, args.days, args.options, not args.sequential,
+                                 args.in_order, not_before=datetime.now())
+    elapsed = (time.perf_counter() - started) * 1000
+    for rank, itinerary in enumerate(itineraries, start=1):
+        print(f"{rank}. {itinerary.start:%Y-%m-%d %H:%M}-{itinerary.end:%H:%M}  "
+              f"waiting {itinerary.waiting.seconds // 60} min")
+        for step in itinerary.steps:
+            service = shared_catalog.service_by_id(step.service_id)
+            artist = shared_catalog.artist_by_id(step.artist_id)
+            print(f"     {step.start:%H:%M}-{step.end:%H:%M}  {service.name} with {artist.name}")
+    if not itineraries:
+        print("No free combination in the horizon.")
+    print(f"Planned in {elapsed:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
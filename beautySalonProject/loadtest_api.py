@@ -0,0 +1,175 @@
+"""Load-test the booking API with many concurrent keep-alive clients.
+
+Starts api_server.py on a fresh temporary database, opens one connection per client
+and has every client send a mix of catalog, free slot and booking requests. Reports
+p50/p99 latency per endpoint and the overall requests/second.
+
+    python loadtest_api.py [--clients 1000] [--requests 20] [--url http://127.0.0.1:8080]
+
+With --url the test runs against an already running server instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from sqlalchemy import insert
+
+from database_setup import Base, Artist, Service, DEFAULT_SERVICES, create_salon_engine, migrate_db
+
+# Share of each kind of request in the mix
+MIX = [('slots', 0.7), ('catalog', 0.2), ('booking', 0.1)]
+ARTISTS = ['Daria', 'Roxana', 'Maria', 'Ioana', 'Elena', 'Andreea']
+FIRST_DAY = date.today() + timedelta(days=7)
+
+
+def seed_database(path):
+    engine = create_salon_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    migrate_db(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Service), [{'name': name, 'category': category, 'duration_minutes': duration,
+                                        'buffer_minutes': buffer}
+                                       for name, category, duration, buffer in DEFAULT_SERVICES
+                                       if category == 'hair'][:3])
+        conn.execute(insert(Artist), [{'name': name, 'specialization': 'hair'} for name in ARTISTS])
+    engine.dispose()
+
+
+def start_server(database):
+    server = subprocess.Popen([sys.executable, 'api_server.py', '--port', '0', '--database', database],
+                              stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if 'http://' not in line:
+        server.kill()
+        raise SystemExit(f'api_server.py did not start: {line!r}')
+    return server, line.strip().rsplit(' ', 1)[-1]
+
+
+async def request(reader, writer, method, target, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write((f'{method} {target} HTTP/1.1\r\nHost: loadtest\r\n'
+                  f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n').encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+def next_request(rng, client):
+    kind = rng.choices([kind for kind, _ in MIX], [weight for _, weight in MIX])[0]
+    day = FIRST_DAY + timedelta(days=rng.randrange(30))
+    service_id = rng.randint(1, 3)
+    if kind == 'catalog':
+        return kind, 'GET', '/catalog', None
+    if kind == 'slots':
+        return kind, 'GET', f'/slots?service_id={service_id}&date={day.isoformat()}', None
+    return kind, 'POST', '/bookings', {
+        'user_name': 'Client' + ''.join(rng.choice('abcdefghij') for _ in range(4)),
+        'user_phone': f'07{client:08d}',
+        'artist_id': rng.randint(1, len(ARTISTS)),
+        'service_id': service_id,
+        'date': day.isoformat(),
+        'time': f'{rng.randint(8, 18):02d}:{rng.choice((0, 30)):02d}',
+    }
+
+
+async def client(host, port, client_id, requests, latencies, statuses, start_gate):
+    rng = random.Random(client_id)
+    await start_gate.wait()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(requests):
+            kind, method, target, payload = next_request(rng, client_id)
+            started = time.perf_counter()
+            status = await request(reader, writer, method, target, payload)
+            latencies[kind].append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(url, clients, requests):
+    address = urlsplit(url)
+    latencies = {kind: [] for kind, _ in MIX}
+    statuses = {}
+    start_gate = asyncio.Event()
+    tasks = [asyncio.create_task(client(address.hostname, address.port, i, requests, latencies, statuses, start_gate))
+             for i in range(clients)]
+    started = time.perf_counter()
+    start_gate.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    failures = [result for result in results if isinstance(result, Exception)]
+    return latencies, statuses, failures, elapsed
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def raise_open_file_limit(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=20, help='requests per client')
+    parser.add_argument('--url', help='test an already running server')
+    args = parser.parse_args()
+
+    # One socket per client here and, when the server is started below, one in the server too
+    raise_open_file_limit(2 * args.clients + 256)
+    server = None
+    if args.url:
+        url = args.url
+    else:
+        path = os.path.join(tempfile.mkdtemp(), 'loadtest.db')
+        seed_database(path)
+        server, url = start_server(f'sqlite+aiosqlite:///{path}')
+    try:
+        latencies, statuses, failures, elapsed = asyncio.run(run(url, args.clients, args.requests))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    total = sum(len(values) for values in latencies.values())
+    print(f'{args.clients} clients x {args.requests} requests against {url}')
+    for kind, values in latencies.items():
+        if values:
+            print(f'  {kind:8} {len(values):7d} requests  p50 {percentile(values, 0.5) * 1000:8.1f} ms  '
+                  f'p99 {percentile(values, 0.99) * 1000:8.1f} ms')
+    everything = [value for values in latencies.values() for value in values]
+    if everything:
+        print(f'  {"all":8} {total:7d} requests  p50 {statistics.median(everything) * 1000:8.1f} ms  '
+              f'p99 {percentile(everything, 0.99) * 1000:8.1f} ms')
+    print(f'{total / elapsed:.0f} requests/s over {elapsed:.1f} s')
+    print('responses by status:', dict(sorted(statuses.items())))
+    if failures:
+        print(f'{len(failures)} clients failed, first error: {failures[0]!r}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
 from PyQt6 import QtCore, QtGui, QtWidgets
 
+from assets import pixmap
+
 class Ui_meet_the_team(object):
     def setupUi(self, meet_the_team):
         meet_the_team.setObjectName("meet_the_team")
@@ -82,75 +84,85 @@ class Ui_meet_the_team(object):
         self.cosmeticslbl.setStyleSheet("color: rgb(170, 0, 255);")
         self.cosmeticslbl.setObjectName("cosmeticslbl")
 
-        # Updated paths
+        # Photos come pre-scaled from the shared asset cache, fitted into the labels with their aspect ratio
         self.member1_photo = QtWidgets.QLabel(parent=meet_the_team)
         self.member1_photo.setGeometry(QtCore.QRect(20, 30, 161, 221))
         self.member1_photo.setStyleSheet("border: 2px solid black; border-radius: 10px;")
         self.member1_photo.setText("")
-        self.member1_photo.setPixmap(QtGui.QPixmap("static/IMG-20240730-WA0116.jpg"))
+        self.member1_photo.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.member1_photo.setPixmap(pixmap("static/IMG-20240730-WA0116.jpg", self.member1_photo.size()))
         self.member1_photo.setObjectName("member1_photo")
 
         self.member2_photo = QtWidgets.QLabel(parent=meet_the_team)
         self.member2_photo.setGeometry(QtCore.QRect(210, 30, 141, 221))
         self.member2_photo.setStyleSheet("border: 2px solid black; border-radius: 10px;")
         self.member2_photo.setText("")
-        self.member2_photo.setPixmap(QtGui.QPixmap("static/IMG-20240730-WA0114.jpg"))
+        self.member2_photo.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.member2_photo.setPixmap(pixmap("static/IMG-20240730-WA0114.jpg", self.member2_photo.size()))
         self.member2_photo.setObjectName("member2_photo")
 
         self.member3_photo = QtWidgets.QLabel(parent=meet_the_team)
         self.member3_photo.setGeometry(QtCore.QRect(380, 30, 141, 221))
         self.member3_photo.setStyleSheet("border: 2px solid black; border-radius: 10px;")
         self.member3_photo.setText("")
-        self.member3_photo.setPixmap(QtGui.QPixmap("static/IMG-20240730-WA0115.jpg"))
+        self.member3_photo.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.member3_photo.setPixmap(pixmap("static/IMG-20240730-WA0115.jpg", self.member3_photo.size()))
         self.member3_photo.setObjectName("member3_photo")
 
         self.member4_photo = QtWidgets.QLabel(parent=meet_the_team)
         self.member4_photo.setGeometry(QtCore.QRect(548, 30, 141, 221))
         self.member4_photo.setStyleSheet("border: 2px solid black; border-radius: 10px;")
         self.member4_photo.setText("")
-        self.member4_photo.setPixmap(QtGui.QPixmap("static/IMG-20240730-WA0117.jpg"))
+        self.member4_photo.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.member4_photo.setPixmap(pixmap("static/IMG-20240730-WA0117.jpg", self.member4_photo.size()))
         self.member4_photo.setObjectName("member4_photo")
 
         self.member1_photo_2 = QtWidgets.QLabel(parent=meet_the_team)
         self.member1_photo_2.setGeometry(QtCore.QRect(300, 330, 101, 131))
         self.member1_photo_2.setStyleSheet("border: 2px solid black; border-radius: 10px;")
         self.member1_photo_2.setText("")
-        self.member1_photo_2.setPixmap(QtGui.QPixmap("static/IMG-20240730-WA0116.jpg"))
+        self.member1_photo_2.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.member1_photo_2.setPixmap(pixmap("static/IMG-20240730-WA0116.jpg", self.member1_photo_2.size()))
         self.member1_photo_2.setObjectName("member1_photo_2")
 
         self.member3_photo_2 = QtWidgets.QLabel(parent=meet_the_team)
         self.member3_photo_2.setGeometry(QtCore.QRect(300, 470, 101, 131))
         self.member3_photo_2.setStyleSheet("border: 2px solid black; border-radius: 10px;")
         self.member3_photo_2.setText("")
-        self.member3_photo_2.setPixmap(QtGui.QPixmap("static/IMG-20240730-WA0115.jpg"))
+        self.member3_photo_2.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.member3_photo_2.setPixmap(pixmap("static/IMG-20240730-WA0115.jpg", self.member3_photo_2.size()))
         self.member3_photo_2.setObjectName("member3_photo_2")
 
         self.member4_photo_2 = QtWidgets.QLabel(parent=meet_the_team)
         self.member4_photo_2.setGeometry(QtCore.QRect(300, 610, 101, 141))
         self.member4_photo_2.setStyleSheet("border: 2px solid black; border-radius: 10px;")
         self.member4_photo_2.setText("")
-        self.member4_photo_2.setPixmap(QtGui.QPixmap("static/IMG-20240730-WA0117.jpg"))
+        self.member4_photo_2.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.member4_photo_2.setPixmap(pixmap("static/IMG-20240730-WA0117.jpg", self.member4_photo_2.size()))
         self.member4_photo_2.setObjectName("member4_photo_2")
 
         self.member1_photo_3 = QtWidgets.QLabel(parent=meet_the_team)
         self.member1_photo_3.setGeometry(QtCore.QRect(560, 470, 101, 131))
         self.member1_photo_3.setStyleSheet("border: 2px solid black; border-radius: 10px;")
         self.member1_photo_3.setText("")
-        self.member1_photo_3.setPixmap(QtGui.QPixmap("static/IMG-20240730-WA0116.jpg"))
+        self.member1_photo_3.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.member1_photo_3.setPixmap(pixmap("static/IMG-20240730-WA0116.jpg", self.member1_photo_3.size()))
         self.member1_photo_3.setObjectName("member1_photo_3")
 
         self.member3_photo_3 = QtWidgets.QLabel(parent=meet_the_team)
         self.member3_photo_3.setGeometry(QtCore.QRect(560, 620, 101, 131))
         self.member3_photo_3.setStyleSheet("border: 2px solid black; border-radius: 10px;")
         self.member3_photo_3.setText("")
-        self.member3_photo_3.setPixmap(QtGui.QPixmap("static/IMG-20240730-WA0115.jpg"))
+        self.member3_photo_3.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.member3_photo_3.setPixmap(pixmap("static/IMG-20240730-WA0115.jpg", self.member3_photo_3.size()))
         self.member3_photo_3.setObjectName("member3_photo_3")
 
         self.member2_photo_2 = QtWidgets.QLabel(parent=meet_the_team)
         self.member2_photo_2.setGeometry(QtCore.QRect(40, 490, 101, 131))
         self.member2_photo_2.setStyleSheet("border: 2px solid black; border-radius: 10px;")
         self.member2_photo_2.setText("")
-        self.member2_photo_2.setPixmap(QtGui.QPixmap("static/IMG-20240730-WA0114.jpg"))
+        self.member2_photo_2.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.member2_photo_2.setPixmap(pixmap("static/IMG-20240730-WA0114.jpg", self.member2_photo_2.size()))
         self.member2_photo_2.setObjectName("member2_photo_2")
 
         self.bookApptBtn = QtWidgets.QPushButton(parent=meet_the_team)
@@ -0,0 +1,130 @@
+"""Per-artist, per-day occupancy reports read from the DailySummary table.
+
+DailySummary is maintained by triggers on "Appointments" inside the transaction that
+books, moves or deletes an appointment, so a report reads one row per artist, day and
+category instead of scanning every appointment.
+
+    python reports.py [--from 2025-06-01] [--to 2025-06-30] [--artist-id 3] [--rebuild]
+"""
+import argparse
+import calendar
+import time
+from datetime import date, datetime
+from typing import NamedTuple
+
+from sqlalchemy import func, select
+
+from database_setup import DailySummary, engine, from_timestamp, rebuild_daily_summary
+from scheduling import OPENING_TIME, CLOSING_TIME
+
+# Minutes an artist can be booked on one day
+OPEN_MINUTES = (datetime.combine(date.min, CLOSING_TIME) - datetime.combine(date.min, OPENING_TIME)).seconds // 60
+
+
+class DaySummary(NamedTuple):
+    day: date
+    artist_id: int
+    category: str
+    appointments: int
+    busy_minutes: int
+    first_start: datetime
+    last_end: datetime
+
+
+class ArtistDay(NamedTuple):
+    day: date
+    artist_id: int
+    appointments: int
+    busy_minutes: int
+    # Share of the opening hours the artist is booked
+    occupancy: float
+    first_start: datetime
+    last_end: datetime
+    # Appointments per service category
+    categories: dict
+
+
+def _filtered(query, first_date, last_date, artist_id):
+    query = query.where(DailySummary.day.between(first_date, last_date))
+    if artist_id is not None:
+        query = query.where(DailySummary.artist_id == artist_id)
+    return query
+
+
+def daily_summary(first_date, last_date, artist_id=None, bind=None):
+    """DaySummary rows between first_date and last_date inclusive, ordered by day and artist."""
+    query = _filtered(select(DailySummary), first_date, last_date, artist_id).order_by(
+        DailySummary.day, DailySummary.artist_id, DailySummary.category)
+    with (bind or engine).connect() as conn:
+        return [DaySummary(day, artist_id, category, appointments, busy_minutes,
+                           from_timestamp(first_start_ts), from_timestamp(last_end_ts))
+                for day, artist_id, category, appointments, busy_minutes, first_start_ts, last_end_ts
+                in conn.execute(query)]
+
+
+def artist_days(first_date, last_date, artist_id=None, bind=None):
+    """One ArtistDay per artist and day with at least one appointment."""
+    days = []
+    # Rows arrive ordered by day and artist, an artist-day's categories are next to each other
+    for summary in daily_summary(first_date, last_date, artist_id, bind):
+        current = days[-1] if days else None
+        if current is None or (current.day, current.artist_id) != (summary.day, summary.artist_id):
+            days.append(ArtistDay(summary.day, summary.artist_id, summary.appointments, summary.busy_minutes,
+                                  summary.busy_minutes / OPEN_MINUTES, summary.first_start, summary.last_end,
+                                  {summary.category: summary.appointments}))
+            continue
+        current.categories[summary.category] = summary.appointments
+        busy_minutes = current.busy_minutes + summary.busy_minutes
+        days[-1] = current._replace(
+            appointments=current.appointments + summary.appointments,
+            busy_minutes=busy_minutes,
+            occupancy=busy_minutes / OPEN_MINUTES,
+            first_start=min(current.first_start, summary.first_start),
+            last_end=max(current.last_end, summary.last_end))
+    return days
+
+
+def artist_totals(first_date, last_date, bind=None):
+    """{artist_id: (days worked, appointments, busy minutes, average occupancy of the days worked)}."""
+    query = _filtered(select(
+        DailySummary.artist_id,
+        func.count(func.distinct(DailySummary.day)),
+        func.sum(DailySummary.appointments),
+        func.sum(DailySummary.busy_minutes)
+    ), first_date, last_date, None).group_by(DailySummary.artist_id)
+    with (bind or engine).connect() as conn:
+        return {artist_id: (days, appointments, busy_minutes, busy_minutes / (days * OPEN_MINUTES))
+                for artist_id, days, appointments, busy_minutes in conn.execute(query)}
+
+
+def rebuild(bind=None):
+    """Recompute the whole summary from the appointments."""
+    with (bind or engine).begin() as conn:
+        rebuild_daily_summary(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--from', dest='first_date', type=date.fromisoformat,
+                        default=date.today().replace(day=1))
+    parser.add_argument('--to', dest='last_date', type=date.fromisoformat)
+    parser.add_argument('--artist-id', type=int)
+    parser.add_argument('--rebuild', action='store_true', help='recompute the summary from the appointments first')
+    args = parser.parse_args()
+    # Defaults to the end of the first month
+    last_date = args.last_date or args.first_date.replace(
+        day=calendar.monthrange(args.first_date.year, args.first_date.month)[1])
+
+    if args.rebuild:
+        started = time.perf_counter()
+        rebuild()
+        print(f"Rebuilt the daily summary in {time.perf_counter() - started:.2f}s")
+    for row in artist_days(args.first_date, last_date, args.artist_id):
+        categories = ', '.join(f'{category or "?"} {count}' for category, count in sorted(row.categories.items()))
+        print(f'{row.day}  artist {row.artist_id:4d}  {row.appointments:3d} appointments  '
+              f'{row.busy_minutes:4d} min  {row.occupancy:6.1%}  '
+              f'{row.first_start:%H:%M}-{row.last_end:%H:%M}  ({categories})')
+
+
+if __name__ == '__main__':
+    main()
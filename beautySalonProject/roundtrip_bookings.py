@@ -0,0 +1,75 @@
+"""Round-trip check for bulk_bookings: what export writes, import has to take back.
+
+Generates a small synthetic salon (see synthetic_data.py), exports its bookings,
+imports them into an empty database holding only the same catalog and asserts
+that no row is rejected and that exporting that database gives the same file.
+Then deletes a customer and a service and checks that their bookings are still
+exported.
+
+    python roundtrip_bookings.py [--appointments 5000] [--format csv]
+"""
+import argparse
+import filecmp
+import os
+import shutil
+import tempfile
+
+from sqlalchemy import delete, func, insert, select
+
+from database_setup import Base, Appointment, Artist, Service, User, create_salon_engine, migrate_db
+from bulk_bookings import export_bookings, import_bookings
+from synthetic_data import SalonSpec, generate_salon
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--appointments', type=int, default=5000)
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    source = create_salon_engine(f"sqlite:///{os.path.join(workdir, 'source.db')}")
+    target = create_salon_engine(f"sqlite:///{os.path.join(workdir, 'target.db')}")
+    exported = os.path.join(workdir, f'exported.{args.format}')
+    restored = os.path.join(workdir, f'restored.{args.format}')
+    try:
+        generate_salon(source, SalonSpec(artists=6, users=args.appointments // 5, appointments=args.appointments))
+        # The catalog is not part of an export, the empty database gets the same one with the same ids
+        Base.metadata.create_all(target)
+        migrate_db(target)
+        with source.connect() as conn:
+            artists = [dict(row._mapping) for row in conn.execute(select(Artist.__table__))]
+            services = [dict(row._mapping) for row in conn.execute(select(Service.__table__))]
+        with target.begin() as conn:
+            conn.execute(insert(Artist), artists)
+            conn.execute(insert(Service), services)
+
+        count, _ = export_bookings(exported, args.format, source)
+        imported, rejected = import_bookings(exported, os.path.join(workdir, 'rejected.csv'), args.format, target)
+        print(f'exported {count}, imported {imported}, rejected {rejected}')
+        assert rejected == 0, f'{rejected} exported bookings were rejected on import'
+        assert imported == count, f'imported {imported} of {count} bookings'
+
+        export_bookings(restored, args.format, target)
+        assert filecmp.cmp(exported, restored, shallow=False), 'the restored database exports differently'
+        print('round trip:     the restored database exports the same file')
+
+        # Deleted while their bookings stay, nothing enforces the foreign keys
+        with source.begin() as conn:
+            user_id, service_id = conn.execute(select(Appointment.user_id, Appointment.service_id).limit(1)).one()
+            orphaned = conn.execute(select(func.count()).select_from(Appointment).where(
+                (Appointment.user_id == user_id) | (Appointment.service_id == service_id))).scalar()
+            conn.execute(delete(User).where(User.user_id == user_id))
+            conn.execute(delete(Service).where(Service.service_id == service_id))
+        exported_again, incomplete = export_bookings(exported, args.format, source)
+        print(f'missing rows:   exported {exported_again}, {incomplete} with a missing user or service')
+        assert exported_again == count, f'exported {exported_again} of {count} bookings'
+        assert incomplete == orphaned, f'{incomplete} incomplete bookings, expected {orphaned}'
+    finally:
+        source.dispose()
+        target.dispose()
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,440 @@
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple, Optional
+
+from sqlalchemy import or_
+
+from database_setup import (SessionLocal, Appointment, Artist, ShiftException, ShiftTemplate, DEFAULT_DURATION_MINUTES,
+                            from_timestamp, shift_listeners)
+
+# Length of a booking whose service is unknown, and of every booking made before services had durations
+APPOINTMENT_BLOCK = timedelta(minutes=DEFAULT_DURATION_MINUTES)
+
+# Appointments may start between 08:00 and 19:00, same as the booking dialog, and must be
+# over by closing time. The dialog never had a closing time; 21:00 is an adaptation that
+# still lets the usual services start at 19:00, only the longest ones have to start earlier
+# (a 225 minute colouring at 17:15 the latest)
+OPENING_TIME = time(8, 0)
+LAST_START_TIME = time(19, 0)
+CLOSING_TIME = time(21, 0)
+SLOT_GRANULARITY = timedelta(minutes=30)
+
+
+class BookedInterval(NamedTuple):
+    start: datetime
+    end: datetime
+    appointment_id: int
+
+
+class FreeSlot(NamedTuple):
+    artist_id: int
+    start: datetime
+    end: datetime
+
+
+class WeeklyShift(NamedTuple):
+    weekday: int
+    start: time
+    end: time
+    valid_from: Optional[date]
+    valid_until: Optional[date]
+
+
+class ShiftChange(NamedTuple):
+    first_date: date
+    last_date: date
+    # None for the whole day
+    start: Optional[time]
+    end: Optional[time]
+    kind: str
+
+
+def appointment_length(service):
+    """How long a booking of the given service blocks the artist, buffer included."""
+    return timedelta(minutes=service.duration_minutes + service.buffer_minutes)
+
+
+def latest_start(day, length):
+    """Latest start on day for a booking of the given length: 19:00, or earlier when it would end after closing time."""
+    return min(datetime.combine(day, LAST_START_TIME), datetime.combine(day, CLOSING_TIME) - length)
+
+
+def free_starts(busy, first_start, last_start, length, granularity):
+    """Sweep the busy intervals of one day (sorted by start) and return the free start times."""
+    starts = []
+    candidate = first_start
+    for busy_start, busy_end, _ in busy:
+        # Grid points that still end before this booking starts are free
+        while candidate <= last_start and candidate + length <= busy_start:
+            starts.append(candidate)
+            candidate += granularity
+        # Jump past the booking, staying on the grid
+        if busy_end > candidate:
+            candidate += -((candidate - busy_end) // granularity) * granularity
+    while candidate <= last_start:
+        starts.append(candidate)
+        candidate += granularity
+    return starts
+
+
+def sweep_conflicts(requested, booked):
+    """Merge requested (start, end) intervals with booked (start, end, appointment_id) ones.
+
+    Both lists are sorted by start and hold timestamps. Returns, for every requested
+    interval, the list of booked intervals overlapping it, in one pass over both lists.
+    """
+    longest = max((end - start for start, end, _ in booked), default=0)
+    conflicts = []
+    low = 0
+    for start, end in requested:
+        # Anything starting this far back has ended, for this request and all later ones
+        while low < len(booked) and booked[low][0] <= start - longest:
+            low += 1
+        overlapping = []
+        index = low
+        while index < len(booked) and booked[index][0] < end:
+            if booked[index][1] > start:
+                overlapping.append(booked[index])
+            index += 1
+        conflicts.append(overlapping)
+    return conflicts
+
+
+def _subtract(intervals, start, end):
+    remaining = []
+    for open_start, open_end in intervals:
+        if open_end <= start or open_start >= end:
+            remaining.append((open_start, open_end))
+            continue
+        if open_start < start:
+            remaining.append((open_start, start))
+        if open_end > end:
+            remaining.append((end, open_end))
+    return remaining
+
+
+def shift_hours(day, shifts, changes):
+    """Sorted, disjoint (start, end) working hours on day from WeeklyShifts and ShiftChanges.
+
+    Without any weekly shift the artist works the salon's opening hours, a shift of no
+    length only marks an artist without weekly hours. Time off is taken out before
+    extra hours are added, so extra hours win on the same day.
+    """
+    if shifts:
+        intervals = [(datetime.combine(day, shift.start), datetime.combine(day, shift.end)) for shift in shifts
+                     if shift.weekday == day.weekday()
+                     and (shift.valid_from is None or shift.valid_from <= day)
+                     and (shift.valid_until is None or day <= shift.valid_until)]
+    else:
+        intervals = [(datetime.combine(day, OPENING_TIME), datetime.combine(day, CLOSING_TIME))]
+    midnight = datetime.combine(day, time.min)
+    today = [change for change in changes if change.first_date <= day <= change.last_date]
+    for change in today:
+        if change.kind != 'extra':
+            start = midnight if change.start is None else datetime.combine(day, change.start)
+            end = midnight + timedelta(days=1) if change.end is None else datetime.combine(day, change.end)
+            intervals = _subtract(intervals, start, end)
+    for change in today:
+        if change.kind == 'extra':
+            intervals.append((datetime.combine(day, change.start or OPENING_TIME),
+                              datetime.combine(day, change.end or CLOSING_TIME)))
+
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        elif start < end:
+            merged.append((start, end))
+    return tuple(merged)
+
+
+def expand_hours(first_date, last_date, shifts, changes):
+    """{date: shift_hours} for every day between first_date and last_date inclusive."""
+    hours = {}
+    day = first_date
+    while day <= last_date:
+        hours[day] = shift_hours(day, shifts, changes)
+        day += timedelta(days=1)
+    return hours
+
+
+def within_hours(hours, start, end):
+    """Whether [start, end) lies inside one of the (start, end) working hours."""
+    return any(open_start <= start and end <= open_end for open_start, open_end in hours)
+
+
+def closed_intervals(day, hours):
+    """The gaps in the day's working hours between opening and closing time, as BookedIntervals.
+
+    Slot searches treat them like bookings without an appointment_id.
+    """
+    closed = []
+    position = datetime.combine(day, OPENING_TIME)
+    for start, end in hours:
+        if start > position:
+            closed.append(BookedInterval(position, start, None))
+        position = max(position, end)
+    closing = datetime.combine(day, CLOSING_TIME)
+    if position < closing:
+        closed.append(BookedInterval(position, closing, None))
+    return closed
+
+
+def with_closed(busy, day, hours):
+    """busy merged with the closed intervals of the day, still sorted by start."""
+    return sorted(busy + closed_intervals(day, hours), key=lambda interval: interval.start)
+
+
+class ShiftCalendar:
+    """Working hours of the artists, expanded from ShiftTemplates and ShiftExceptions.
+
+    Hours are expanded on first use and cached per artist and week (Monday to
+    Sunday); the shift tables are only read again after invalidate().
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+        # (artist_id, monday) -> {date: hours}
+        self._weeks = {}
+        self._lock = threading.RLock()
+
+    def hours(self, artist_id, first_date, last_date):
+        """{date: ((start, end), ...)} of the artist's working hours, first_date to last_date inclusive."""
+        mondays = []
+        monday = first_date - timedelta(days=first_date.weekday())
+        while monday <= last_date:
+            mondays.append(monday)
+            monday += timedelta(weeks=1)
+        hours = {}
+        with self._lock:
+            missing = [monday for monday in mondays if (artist_id, monday) not in self._weeks]
+            if missing:
+                # One read for all missing weeks, and for the ones cached in between
+                self._load_weeks(artist_id, missing[0], missing[-1])
+            for monday in mondays:
+                hours.update(self._weeks[artist_id, monday])
+        return {day: intervals for day, intervals in hours.items() if first_date <= day <= last_date}
+
+    def _load_weeks(self, artist_id, first_monday, last_monday):
+        last_sunday = last_monday + timedelta(days=6)
+        db = self._session_factory()
+        try:
+            shifts = [WeeklyShift(*row) for row in db.query(
+                ShiftTemplate.weekday, ShiftTemplate.start_time, ShiftTemplate.end_time,
+                ShiftTemplate.valid_from, ShiftTemplate.valid_until
+            ).filter(ShiftTemplate.artist_id == artist_id)]
+            changes = [ShiftChange(*row) for row in db.query(
+                ShiftException.first_date, ShiftException.last_date, ShiftException.start_time,
+                ShiftException.end_time, ShiftException.kind
+            ).filter(
+                or_(ShiftException.artist_id == artist_id, ShiftException.artist_id.is_(None)),
+                ShiftException.last_date >= first_monday,
+                ShiftException.first_date <= last_sunday
+            )]
+        finally:
+            db.close()
+
+        monday = first_monday
+        while monday <= last_monday:
+            self._weeks[artist_id, monday] = expand_hours(monday, monday + timedelta(days=6), shifts, changes)
+            monday += timedelta(weeks=1)
+
+    def is_open(self, artist_id, start, end):
+        """Whether the artist works all of [start, end)."""
+        return within_hours(self.hours(artist_id, start.date(), start.date())[start.date()], start, end)
+
+    def invalidate(self, artist_id=None):
+        """Drop cached weeks so they are expanded again from the database."""
+        with self._lock:
+            if artist_id is None:
+                self._weeks.clear()
+            else:
+                for key in [key for key in self._weeks if key[0] == artist_id]:
+                    del self._weeks[key]
+
+
+class ArtistCalendar:
+    """Booked intervals of one artist, kept sorted by start time."""
+
+    def __init__(self):
+        self._starts = []
+        self._intervals = []
+        # Longest interval seen so far, bounds how far back an overlap can start
+        self._max_length = timedelta(0)
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def add(self, appointment_id, start, end):
+        index = bisect_right(self._starts, start)
+        self._starts.insert(index, start)
+        self._intervals.insert(index, BookedInterval(start, end, appointment_id))
+        self._max_length = max(self._max_length, end - start)
+
+    def remove(self, appointment_id, start):
+        index = bisect_left(self._starts, start)
+        while index < len(self._starts) and self._starts[index] == start:
+            if self._intervals[index].appointment_id == appointment_id:
+                del self._starts[index]
+                del self._intervals[index]
+                return True
+            index += 1
+        return False
+
+    def conflicts(self, start, end):
+        """Return the intervals overlapping [start, end)."""
+        # Anything starting at or before start - max_length has already ended
+        low = bisect_right(self._starts, start - self._max_length)
+        high = bisect_left(self._starts, end)
+        return [interval for interval in self._intervals[low:high] if interval.end > start]
+
+
+def build_calendar(rows):
+    """Build an ArtistCalendar from (appointment_id, start_ts, duration_minutes) rows."""
+    calendar = ArtistCalendar()
+    for appointment_id, start_ts, duration_minutes in rows:
+        start = from_timestamp(start_ts)
+        calendar.add(appointment_id, start, start + timedelta(minutes=duration_minutes))
+    return calendar
+
+
+def calendar_slots(calendar, artist_id, first_date, last_date, length, granularity=SLOT_GRANULARITY,
+                   not_before=None, hours=None, lock=None):
+    """Free slots of one artist's calendar between first_date and last_date inclusive.
+
+    hours maps dates to the artist's working hours, as ShiftCalendar.hours returns
+    them; days without an entry are open from OPENING_TIME to CLOSING_TIME.
+    """
+    slots = []
+    day = first_date
+    while day <= last_date:
+        first_start = datetime.combine(day, OPENING_TIME)
+        day_last_start = latest_start(day, length)
+        if not_before is not None and not_before > first_start:
+            # Round up to the next grid point of the day
+            first_start += -((first_start - not_before) // granularity) * granularity
+        if lock is None:
+            busy = calendar.conflicts(first_start, day_last_start + length)
+        else:
+            with lock:
+                busy = calendar.conflicts(first_start, day_last_start + length)
+        day_hours = hours.get(day) if hours else None
+        if day_hours is not None:
+            busy = with_closed(busy, day, day_hours)
+        for start in free_starts(busy, first_start, day_last_start, length, granularity):
+            slots.append(FreeSlot(artist_id, start, start + length))
+        day += timedelta(days=1)
+    return slots
+
+
+class ScheduleEngine:
+    """Per-artist interval index answering overlap queries in O(log n)."""
+
+    def __init__(self, session_factory=SessionLocal, shifts=None):
+        self._session_factory = session_factory
+        self.shifts = ShiftCalendar(session_factory) if shifts is None else shifts
+        self._calendars = {}
+        # Calendars are shared between the GUI and the DB worker threads
+        self._lock = threading.RLock()
+
+    def calendar(self, artist_id):
+        with self._lock:
+            calendar = self._calendars.get(artist_id)
+            if calendar is None:
+                calendar = self._load_calendar(artist_id)
+                self._calendars[artist_id] = calendar
+            return calendar
+
+    def _load_calendar(self, artist_id):
+        db = self._session_factory()
+        try:
+            # Served by the (artist_id, start_ts) index, rows arrive already sorted
+            rows = db.query(
+                Appointment.appointment_id,
+                Appointment.start_ts,
+                Appointment.duration_minutes
+            ).filter(
+                Appointment.artist_id == artist_id,
+                Appointment.start_ts.isnot(None)
+            ).order_by(Appointment.start_ts).all()
+        finally:
+            db.close()
+
+        return build_calendar(rows)
+
+    def find_conflicts(self, artist_id, start, end=None):
+        """Return the booked intervals of the artist overlapping [start, end)."""
+        if end is None:
+            end = start + APPOINTMENT_BLOCK
+        with self._lock:
+            return self.calendar(artist_id).conflicts(start, end)
+
+    def is_available(self, artist_id, start, end=None):
+        return not self.find_conflicts(artist_id, start, end)
+
+    def find_free_slots(self, artist, service, date_range, granularity=SLOT_GRANULARITY, not_before=None):
+        """Return {artist_id: [FreeSlot, ...]} of open start times within date_range.
+
+        artist is an artist id, a list of ids, or None for every artist working in the
+        service's category. date_range is an inclusive (first_date, last_date) pair.
+        """
+        first_date, last_date = date_range
+        length = appointment_length(service)
+
+        if artist is None:
+            db = self._session_factory()
+            try:
+                artist_ids = [artist_id for artist_id, in db.query(Artist.artist_id).filter(
+                    Artist.specialization == service.category)]
+            finally:
+                db.close()
+        elif isinstance(artist, int):
+            artist_ids = [artist]
+        else:
+            artist_ids = list(artist)
+
+        slots = {}
+        for artist_id in artist_ids:
+            hours = self.shifts.hours(artist_id, first_date, last_date)
+            slots[artist_id] = calendar_slots(self.calendar(artist_id), artist_id, first_date, last_date, length,
+                                              granularity, not_before, hours, self._lock)
+        return slots
+
+    def add_appointment(self, appointment):
+        """Record a committed appointment in an already loaded calendar."""
+        start = datetime.combine(appointment.appointment_date, appointment.appointment_time)
+        end = start + timedelta(minutes=appointment.duration_minutes)
+        self.add_interval(appointment.artist_id, appointment.appointment_id, start, end)
+
+    def add_interval(self, artist_id, appointment_id, start, end):
+        with self._lock:
+            calendar = self._calendars.get(artist_id)
+            if calendar is not None:
+                calendar.add(appointment_id, start, end)
+
+    def remove_appointment(self, appointment):
+        """Forget a deleted appointment."""
+        start = datetime.combine(appointment.appointment_date, appointment.appointment_time)
+        with self._lock:
+            calendar = self._calendars.get(appointment.artist_id)
+            if calendar is not None:
+                calendar.remove(appointment.appointment_id, start)
+
+    def invalidate(self, artist_id=None):
+        """Drop cached calendars so they are reloaded from the database."""
+        with self._lock:
+            if artist_id is None:
+                self._calendars.clear()
+            else:
+                self._calendars.pop(artist_id, None)
+
+
+# Shared engine used by the booking dialog
+schedule = ScheduleEngine()
+shift_listeners.append(schedule.shifts.invalidate)
+
+
+def find_free_slots(artist, service, date_range, granularity=SLOT_GRANULARITY, not_before=None):
+    """Free start times per artist, see ScheduleEngine.find_free_slots."""
+    return schedule.find_free_slots(artist, service, date_range, granularity, not_before)
@@ -0,0 +1,182 @@
+"""In-memory search over the service catalog, for the search box of the booking dialog.
+
+Service names are folded like customer names (casefolded, diacritics stripped) and
+split into words. Every prefix and every trigram of those words points back at
+them, so one lookup ranks the services of all categories:
+'intretinere ped' finds 'Întreținere Pedichiură', and a typo like 'pedichura' still
+finds it through the trigrams it shares. Only the services that changed are
+re-indexed after a catalog change, and no keystroke touches the database.
+"""
+import heapq
+import re
+import threading
+
+from catalog import catalog
+from customer_index import fold
+from database_setup import catalog_listeners
+
+# Results offered per keystroke
+TOP_K = 10
+# How alike (Dice coefficient of their trigrams) a query word and a word of a name have to be
+# for a typo to still match
+MIN_SIMILARITY = 0.6
+# A query word matching a whole word scores more than one matching its start,
+# a trigram match scores its similarity
+WORD_SCORE = 3
+PREFIX_SCORE = 2
+_WORD = re.compile(r'\w+')
+
+
+def words(text):
+    """Folded words of text: 'Epilare cu Ceară Full-Body' -> ['epilare', 'cu', 'ceara', 'full', 'body']."""
+    return _WORD.findall(fold(text))
+
+
+def trigrams(word):
+    """Trigrams of the word padded at both ends, so the start of a word weighs more."""
+    padded = f'  {word} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def _postings(word):
+    """The prefix and trigram keys a word is indexed under."""
+    return [word[:length] for length in range(1, len(word) + 1)], trigrams(word)
+
+
+class ServiceSearch:
+    """Word prefix and trigram postings of the catalog's services, kept in step with it.
+
+    The postings lead from a prefix or trigram to the words of the service names,
+    and each word to the services using it. refresh() re-indexes the services added,
+    renamed or removed since the last catalog change reported through catalog_listeners.
+    """
+
+    def __init__(self, catalog=catalog):
+        self._catalog = catalog
+        self._lock = threading.Lock()
+        # service_id -> (ServiceRecord, its words, sort key)
+        self._services = {}
+        # word -> service_ids, prefix or trigram -> words
+        self._words = {}
+        self._prefixes = {}
+        self._trigrams = {}
+        self._stale = True
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._services)
+
+    def invalidate(self):
+        self._stale = True
+
+    def refresh(self):
+        """Catch up with the catalog after a change; cheap when nothing changed."""
+        if not self._stale:
+            return
+        # Cleared first, so a change reported while syncing is picked up next time
+        self._stale = False
+        self.sync(self._catalog.services())
+
+    def sync(self, services):
+        """Index the given ServiceRecords, touching only the ones that differ; returns how many did."""
+        current = {service.service_id: service for service in services}
+        changed = 0
+        with self._lock:
+            for service_id, (service, _, _) in list(self._services.items()):
+                if current.get(service_id) != service:
+                    self._remove(service_id)
+                    changed += 1
+            for service_id, service in current.items():
+                if service_id not in self._services:
+                    self._add(service)
+                    changed += 1
+            self.loaded = True
+        return changed
+
+    def _add(self, service):
+        service_words = frozenset(words(service.name))
+        # Among equal scores shorter names come first, they match the query more closely
+        self._services[service.service_id] = (service, service_words,
+                                              (len(service_words), fold(service.name), service.service_id))
+        for word in service_words:
+            if word not in self._words:
+                self._words[word] = set()
+                prefixes, grams = _postings(word)
+                for postings, keys in ((self._prefixes, prefixes), (self._trigrams, grams)):
+                    for key in keys:
+                        postings.setdefault(key, set()).add(word)
+            self._words[word].add(service.service_id)
+
+    def _remove(self, service_id):
+        _, service_words, _ = self._services.pop(service_id)
+        for word in service_words:
+            self._words[word].discard(service_id)
+            if self._words[word]:
+                continue
+            # No service uses the word any more
+            del self._words[word]
+            prefixes, grams = _postings(word)
+            for postings, keys in ((self._prefixes, prefixes), (self._trigrams, grams)):
+                for key in keys:
+                    postings[key].discard(word)
+                    if not postings[key]:
+                        del postings[key]
+
+    def _word_scores(self, word):
+        """{indexed word: score} for one query word."""
+        found = {}
+        for indexed in self._prefixes.get(word, ()):
+            found[indexed] = WORD_SCORE if indexed == word else PREFIX_SCORE
+        if len(word) >= 3:
+            grams = trigrams(word)
+            shared = {}
+            for gram in grams:
+                for indexed in self._trigrams.get(gram, ()):
+                    shared[indexed] = shared.get(indexed, 0) + 1
+            for indexed, count in shared.items():
+                # Dice coefficient of the two words' trigrams, a word has len + 1 of them
+                similarity = 2 * count / (len(grams) + len(indexed) + 1)
+                if indexed not in found and similarity >= MIN_SIMILARITY:
+                    found[indexed] = similarity
+        return found
+
+    def search(self, text, limit=TOP_K):
+        """Best matching services of any category, those matching the most query words first."""
+        query = words(text)
+        if not query:
+            return []
+        # service_id -> (query words matched, score)
+        scores = {}
+        with self._lock:
+            for word in query:
+                best = {}
+                for indexed, score in self._word_scores(word).items():
+                    for service_id in self._words[indexed]:
+                        best[service_id] = max(score, best.get(service_id, 0))
+                for service_id, score in best.items():
+                    matched, total = scores.get(service_id, (0, 0))
+                    scores[service_id] = (matched + 1, total + score)
+            def rank(item):
+                service_id, (matched, total) = item
+                return -matched, -total, self._services[service_id][2]
+
+            results = self._distinct(heapq.nsmallest(limit, scores.items(), key=rank), limit)
+            if len(results) < min(limit, len(scores)):
+                # Services entered twice took places, rank them all
+                results = self._distinct(sorted(scores.items(), key=rank), limit)
+            return results
+
+    def _distinct(self, ranked, limit):
+        """The first limit services of ranked, a service entered twice only under its lowest service_id."""
+        results = {}
+        for service_id, _ in ranked:
+            service = self._services[service_id][0]
+            results.setdefault((service.name, service.category), service)
+            if len(results) == limit:
+                break
+        return list(results.values())
+
+
+# Process-wide index over the shared catalog, re-synced after catalog changes
+service_search = ServiceSearch()
+catalog_listeners.append(service_search.invalidate)
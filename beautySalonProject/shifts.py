@@ -0,0 +1,143 @@
+"""Edit and show the artists' working hours: weekly shifts and exceptions to them.
+
+A weekly pattern is a handful of ShiftTemplate rows per artist and time off or extra
+hours one ShiftException row per period, instead of a row per bookable slot. The
+booking code expands them per artist and week through scheduling.ShiftCalendar.
+
+    python shifts.py week 4 mon-fri=09:00-17:00 sat=10:00-14:00 [--from 2025-06-02]
+    python shifts.py week 4 --opening-hours
+    python shifts.py off 2025-12-24 [--until 2025-12-26] [--artist-id 4] [--kind holiday] [--hours 12:00-16:00]
+    python shifts.py extra 2025-12-20 --artist-id 4 [--hours 10:00-14:00]
+    python shifts.py show [--artist-id 4] [--week 2025-06-02]
+"""
+import argparse
+from datetime import date, time, timedelta
+
+from sqlalchemy import delete, insert, or_, update
+
+from catalog import catalog
+from database_setup import SHIFT_EXCEPTION_KINDS, ShiftException, ShiftTemplate, engine, notify_shifts_changed
+from scheduling import schedule
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def parse_hours(text):
+    """'09:00-17:00' -> (time(9), time(17))."""
+    start, _, end = text.partition('-')
+    start, end = time.fromisoformat(start), time.fromisoformat(end)
+    if start >= end:
+        raise ValueError(f"{text} ends before it starts")
+    return start, end
+
+
+def parse_weekly(specs):
+    """['mon-fri=09:00-17:00', 'sat=10:00-14:00'] -> [(weekday, start, end), ...]."""
+    shifts = []
+    for spec in specs:
+        days, _, hours = spec.partition('=')
+        first, _, last = days.lower().partition('-')
+        if first not in WEEKDAYS or last not in WEEKDAYS + ('',):
+            raise ValueError(f"{spec}: days must be like mon or mon-fri")
+        first = WEEKDAYS.index(first)
+        last = WEEKDAYS.index(last) if last else first
+        try:
+            start, end = parse_hours(hours)
+        except ValueError:
+            raise ValueError(f"{spec}: hours must be like 09:00-17:00")
+        shifts.extend((weekday, start, end) for weekday in range(first, last + 1))
+    return shifts
+
+
+def set_weekly_shifts(artist_id, shifts, valid_from=None, bind=None):
+    """Replace the artist's weekly (weekday, start, end) shifts, from valid_from on when given.
+
+    No shifts means no working hours at all, None the salon's opening hours again.
+    """
+    if shifts is None and valid_from is not None:
+        raise ValueError("the opening hours cannot start at a date, only replace every shift")
+    with (bind or engine).begin() as conn:
+        if valid_from is None:
+            conn.execute(delete(ShiftTemplate).where(ShiftTemplate.artist_id == artist_id))
+        else:
+            # Earlier patterns end the day before, later ones are replaced
+            conn.execute(delete(ShiftTemplate).where(ShiftTemplate.artist_id == artist_id,
+                                                     ShiftTemplate.valid_from >= valid_from))
+            conn.execute(update(ShiftTemplate).where(
+                ShiftTemplate.artist_id == artist_id,
+                or_(ShiftTemplate.valid_until.is_(None), ShiftTemplate.valid_until >= valid_from)
+            ).values(valid_until=valid_from - timedelta(days=1)))
+        if shifts is not None:
+            # Without any weekly shift an artist works the opening hours, a shift of no
+            # length keeps them off instead
+            conn.execute(insert(ShiftTemplate), [
+                {'artist_id': artist_id, 'weekday': weekday, 'start_time': start, 'end_time': end,
+                 'valid_from': valid_from} for weekday, start, end in shifts or [(0, time.min, time.min)]])
+    notify_shifts_changed()
+
+
+def add_shift_exception(first_date, last_date, kind, artist_id=None, start=None, end=None, bind=None):
+    """Record time off or, with kind 'extra', extra hours; artist_id None applies to everyone."""
+    if kind not in SHIFT_EXCEPTION_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(SHIFT_EXCEPTION_KINDS)}")
+    with (bind or engine).begin() as conn:
+        conn.execute(insert(ShiftException).values(
+            artist_id=artist_id, first_date=first_date, last_date=last_date, start_time=start, end_time=end,
+            kind=kind))
+    notify_shifts_changed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    week = commands.add_parser('week', help="replace an artist's weekly shifts")
+    week.add_argument('artist_id', type=int)
+    week.add_argument('shifts', nargs='*', help='e.g. mon-fri=09:00-17:00, nothing for no shifts at all')
+    week.add_argument('--from', dest='valid_from', type=date.fromisoformat)
+    week.add_argument('--opening-hours', action='store_true',
+                      help="drop every shift, the artist works the salon's opening hours again")
+    for name, help_text in (('off', 'time off'), ('extra', 'extra working hours')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('first_date', type=date.fromisoformat)
+        command.add_argument('--until', type=date.fromisoformat)
+        command.add_argument('--artist-id', type=int, help='everyone when left out')
+        command.add_argument('--hours', type=parse_hours, help='the whole day when left out')
+        if name == 'off':
+            command.add_argument('--kind', default='holiday',
+                                 choices=[kind for kind in SHIFT_EXCEPTION_KINDS if kind != 'extra'])
+    show = commands.add_parser('show', help='working hours of one week')
+    show.add_argument('--artist-id', type=int)
+    show.add_argument('--week', type=date.fromisoformat, default=date.today())
+    args = parser.parse_args()
+
+    if args.command == 'week':
+        if args.opening_hours and (args.shifts or args.valid_from):
+            parser.error("--opening-hours takes neither shifts nor --from")
+        try:
+            shifts = None if args.opening_hours else parse_weekly(args.shifts)
+        except ValueError as e:
+            parser.error(str(e))
+        set_weekly_shifts(args.artist_id, shifts, args.valid_from)
+    elif args.command in ('off', 'extra'):
+        start, end = args.hours or (None, None)
+        add_shift_exception(args.first_date, args.until or args.first_date,
+                            'extra' if args.command == 'extra' else args.kind, args.artist_id, start, end)
+    else:
+        monday = args.week - timedelta(days=args.week.weekday())
+        if args.artist_id is None:
+            artists = catalog.artists()
+        else:
+            artist = catalog.artist_by_id(args.artist_id)
+            if artist is None:
+                parser.error(f"unknown artist {args.artist_id}")
+            artists = [artist]
+        for artist in artists:
+            print(f"{artist.name} ({artist.specialization}, {artist.artist_id})")
+            hours = schedule.shifts.hours(artist.artist_id, monday, monday + timedelta(days=6))
+            for day, intervals in hours.items():
+                text = ', '.join(f'{start:%H:%M}-{end:%H:%M}' for start, end in intervals) or 'off'
+                print(f"  {day:%a %d.%m}  {text}")
+
+
+if __name__ == '__main__':
+    main()
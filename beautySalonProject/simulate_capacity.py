@@ -0,0 +1,112 @@
+"""Simulate how many bookings a day the salon fits with fixed and with per-service appointment lengths.
+
+Customers ask for one of the 45 populate_db services on a working day, at a preferred
+time, and take the free slot closest to it with any artist of the category, found with
+the same ArtistCalendar and calendar_slots as the booking dialog. The same request
+stream is replayed twice: once with every booking blocking the artist for the old fixed
+119 minutes, once with each service's own duration and buffer.
+
+    python simulate_capacity.py [--days 24] [--requests-per-day 80] [--seed 42]
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+
+from catalog import ServiceRecord
+from database_setup import DEFAULT_ARTISTS, DEFAULT_SERVICES
+from scheduling import (APPOINTMENT_BLOCK, OPENING_TIME, CLOSING_TIME, ArtistCalendar, appointment_length,
+                        calendar_slots)
+from synthetic_data import CATEGORIES, HOUR_DEMAND, WEEKDAY_DEMAND
+
+FIRST_DAY = date(2025, 6, 2)
+
+
+def make_requests(rng, services, days, requests_per_day):
+    """(day, service, preferred start) in arrival order, busier on the days customers prefer."""
+    hours = list(HOUR_DEMAND)
+    hour_weights = [HOUR_DEMAND[hour] for hour in hours]
+    requests = []
+    day = FIRST_DAY
+    working_days = 0
+    while working_days < days:
+        demand = WEEKDAY_DEMAND[day.weekday()]
+        if demand:
+            working_days += 1
+            for _ in range(round(requests_per_day * demand)):
+                preferred = datetime.combine(day, OPENING_TIME).replace(hour=rng.choices(hours, hour_weights)[0],
+                                                                        minute=rng.choice((0, 30)))
+                requests.append((day, rng.choice(services), preferred))
+        day += timedelta(days=1)
+    return requests
+
+
+def simulate(requests, artists, length_of):
+    """Book every request into in-memory calendars, returning counters per category."""
+    calendars = {artist_id: ArtistCalendar() for artist_id, _ in artists}
+    artists_by_category = {}
+    for artist_id, specialization in artists:
+        artists_by_category.setdefault(specialization, []).append(artist_id)
+    totals = {category: {'booked': 0, 'turned_away': 0, 'service_minutes': 0, 'blocked_minutes': 0}
+              for category in CATEGORIES}
+
+    for appointment_id, (day, service, preferred) in enumerate(requests, start=1):
+        length = length_of(service)
+        best = None
+        for artist_id in artists_by_category.get(service.category, ()):
+            for slot in calendar_slots(calendars[artist_id], artist_id, day, day, length):
+                distance = abs(slot.start - preferred)
+                if best is None or distance < best[0]:
+                    best = (distance, slot)
+        counters = totals[service.category]
+        if best is None:
+            counters['turned_away'] += 1
+            continue
+        slot = best[1]
+        calendars[slot.artist_id].add(appointment_id, slot.start, slot.end)
+        counters['booked'] += 1
+        counters['service_minutes'] += service.duration_minutes
+        counters['blocked_minutes'] += length.seconds // 60
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=24, help='working days to simulate')
+    parser.add_argument('--requests-per-day', type=int, default=80, help='requests on the busiest weekday')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    services = [ServiceRecord(service_id, name, category, duration, buffer)
+                for service_id, (name, category, duration, buffer) in enumerate(DEFAULT_SERVICES, start=1)]
+    artists = [(artist_id, specialization) for artist_id, (_, specialization) in enumerate(DEFAULT_ARTISTS, start=1)]
+    requests = make_requests(random.Random(args.seed), services, args.days, args.requests_per_day)
+    modes = {
+        f'fixed {APPOINTMENT_BLOCK.seconds // 60} min': simulate(requests, artists, lambda service: APPOINTMENT_BLOCK),
+        'per service': simulate(requests, artists, appointment_length),
+    }
+
+    # Artist-minutes the salon is open over the whole simulation
+    open_minutes = (datetime.combine(FIRST_DAY, CLOSING_TIME) - datetime.combine(FIRST_DAY, OPENING_TIME)).seconds
+    open_minutes = open_minutes // 60 * args.days * len(artists)
+
+    def total(totals, key):
+        return sum(counters[key] for counters in totals.values())
+
+    print(f'{len(services)} services, {len(artists)} artists, {args.days} working days, {len(requests)} requests')
+    print(f'{"":28}' + ''.join(f'{name:>16}' for name in modes))
+    rows = [
+        ('bookings/day', lambda totals: total(totals, 'booked') / args.days),
+        ('turned away/day', lambda totals: total(totals, 'turned_away') / args.days),
+        ('artist time with clients %', lambda totals: 100 * total(totals, 'service_minutes') / open_minutes),
+        ('artist time blocked %', lambda totals: 100 * total(totals, 'blocked_minutes') / open_minutes),
+    ]
+    for label, value in rows:
+        print(f'{label:28}' + ''.join(f'{value(totals):16.1f}' for totals in modes.values()))
+    print('bookings/day per category')
+    for category in CATEGORIES:
+        print(f'  {category:26}' + ''.join(f'{totals[category]["booked"] / args.days:16.1f}'
+                                           for totals in modes.values()))
+
+
+if __name__ == '__main__':
+    main()
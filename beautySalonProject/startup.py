@@ -0,0 +1,54 @@
+import threading
+import traceback
+
+_ready = threading.Event()
+_error = None
+# Called with the error, or None, once warm_up() has run, see when_ready()
+_callbacks = []
+_lock = threading.Lock()
+
+
+def warm_up():
+    """Import and initialize everything the booking screens need, off the GUI thread."""
+    global _error
+    try:
+        from database_setup import init_db
+        init_db()  # Create missing tables and upgrade older databases in place
+        from catalog import catalog
+        catalog.load()
+        import booking_dialog  # noqa: F401, compiles the dialog module ahead of the first click
+    except Exception as e:
+        traceback.print_exc()
+        _error = e
+    finally:
+        with _lock:
+            _ready.set()
+            callbacks = list(_callbacks)
+            _callbacks.clear()
+        for callback in callbacks:
+            callback(_error)
+
+
+def start_warm_up():
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+
+def when_ready(callback):
+    """Call callback(error) once warm_up() has run, on the thread that ran it; error is None when it worked.
+
+    Runs the callback right away when warm_up() is already done.
+    """
+    with _lock:
+        if not _ready.is_set():
+            _callbacks.append(callback)
+            return
+    callback(_error)
+
+
+def wait_until_ready():
+    """Block until warm_up() has run, starting it here if nobody did yet."""
+    if not _ready.is_set() and not any(thread.name == 'warm-up' for thread in threading.enumerate()):
+        warm_up()
+    _ready.wait()
+    if _error is not None:
+        raise RuntimeError(f"Database initialization failed: {_error}")
@@ -0,0 +1,125 @@
+"""Stress test for booking.book_appointment.
+
+Phase 1 fires thousands of bookings for the same artist and slot from several
+processes at once and asserts that exactly one of them wins. Phase 2 books
+distinct slots to measure throughput. Phase 3 checks that the overlap trigger
+rejects a double booking written with plain SQL, and one made by moving an
+appointment onto a taken slot through the ORM.
+
+    python stress_booking.py [--processes 8] [--attempts 2000]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import date, time as clock, timedelta
+
+from sqlalchemy import insert, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from database_setup import Base, Appointment, Artist, Service, create_salon_engine, migrate_db
+from booking import BookingConflict, book_appointment
+from scheduling import ScheduleEngine
+
+SLOT_DATE = date(2025, 3, 14)
+SLOT_TIME = clock(10, 0)
+
+
+def attempt_bookings(args):
+    url, worker, attempts, same_slot = args
+    engine = create_salon_engine(url, 'shared')
+    session_factory = sessionmaker(bind=engine)
+    schedule = ScheduleEngine(session_factory)
+    won = conflicts = 0
+    for i in range(attempts):
+        if same_slot:
+            day, at = SLOT_DATE, SLOT_TIME
+        else:
+            n = worker * attempts + i
+            day, at = SLOT_DATE + timedelta(days=1 + n // 5), clock(8 + 2 * (n % 5))
+        try:
+            book_appointment(f'Client{worker}', f'07{worker:08d}', 1, 1, day, at,
+                             session_factory=session_factory, schedule=schedule)
+            won += 1
+        except BookingConflict:
+            conflicts += 1
+    engine.dispose()
+    return won, conflicts
+
+
+def run(url, processes, attempts, same_slot):
+    started = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(attempt_bookings, [(url, worker, attempts, same_slot) for worker in range(processes)])
+    elapsed = time.perf_counter() - started
+    won = sum(worker_won for worker_won, _ in results)
+    conflicts = sum(worker_conflicts for _, worker_conflicts in results)
+    return won, conflicts, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--attempts', type=int, default=2000, help='total bookings per phase')
+    args = parser.parse_args()
+    per_process = max(1, args.attempts // args.processes)
+
+    workdir = tempfile.mkdtemp()
+    url = f"sqlite:///{os.path.join(workdir, 'stress.db')}"
+    engine = create_salon_engine(url, 'shared')
+    Base.metadata.create_all(engine)
+    migrate_db(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Service).values(name='Pensat', category='cosmetics'))
+        conn.execute(insert(Artist).values(name='Eva', specialization='cosmetics'))
+
+    try:
+        won, conflicts, elapsed = run(url, args.processes, per_process, same_slot=True)
+        print(f'same slot:      {won} won, {conflicts} rejected, {(won + conflicts) / elapsed:.0f} attempts/s')
+        assert won == 1, f'expected exactly one winner, got {won}'
+
+        won, conflicts, elapsed = run(url, args.processes, per_process, same_slot=False)
+        print(f'distinct slots: {won} booked, {conflicts} rejected, {won / elapsed:.0f} bookings/s')
+        assert conflicts == 0, f'unexpected conflicts: {conflicts}'
+
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    'INSERT INTO "Appointments" (user_id, artist_id, service_id, appointment_date, '
+                    'appointment_time, start_ts, duration_minutes) VALUES (1, 1, 1, :day, :at, :ts, 119)'
+                ), {'day': SLOT_DATE.isoformat(), 'at': '11:00:00.000000',
+                    'ts': int((SLOT_DATE - date(1970, 1, 1)).total_seconds()) + 11 * 3600})
+        except IntegrityError:
+            print('trigger:        raw overlapping insert rejected')
+        else:
+            raise AssertionError('overlap trigger did not fire')
+
+        # Rescheduling changes start_ts in an UPDATE, where the trigger cannot read NEW.end_ts
+        day = SLOT_DATE - timedelta(days=1)
+        session_factory = sessionmaker(bind=engine)
+        with session_factory() as db:
+            db.add_all([Appointment(user_id=1, artist_id=1, service_id=1, appointment_date=day,
+                                    appointment_time=clock(10), duration_minutes=60),
+                        Appointment(user_id=1, artist_id=1, service_id=1, appointment_date=day,
+                                    appointment_time=clock(12), duration_minutes=60)])
+            db.commit()
+            moved = db.query(Appointment).filter_by(appointment_date=day, appointment_time=clock(12)).one()
+            moved.appointment_time = clock(10, 30)
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                print('trigger:        reschedule onto a taken slot rejected')
+            else:
+                raise AssertionError('overlap trigger let a reschedule through')
+    finally:
+        engine.dispose()
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Seeded generator of realistic synthetic salons for benchmarks and load tests.
+
+The same seed and sizes always produce the same database. Artists are spread over
+the nails/hair/cosmetics categories, services start with the populate_db catalog,
+customers come back following a skewed distribution and bookings follow weekday
+and time-of-day demand without ever overlapping for an artist.
+
+    python synthetic_data.py salon.db [--artists 40] [--services 45] [--users 1000000]
+                                      [--appointments 2000000] [--seed 42]
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import insert
+
+from database_setup import (Base, User, Service, Artist, Appointment, DEFAULT_SERVICES, create_salon_engine,
+                            migrate_db, to_timestamp)
+from scheduling import OPENING_TIME, LAST_START_TIME, CLOSING_TIME, SLOT_GRANULARITY
+
+CATEGORIES = ('nails', 'hair', 'cosmetics')
+# Share of the artists working in each category
+CATEGORY_SHARE = {'nails': 0.35, 'hair': 0.45, 'cosmetics': 0.2}
+
+FIRST_NAMES = ['Ana', 'Maria', 'Elena', 'Ioana', 'Andreea', 'Roxana', 'Daria', 'Eva', 'Alexandra', 'Cristina',
+               'Mihaela', 'Gabriela', 'Bianca', 'Alina', 'Diana', 'Raluca', 'Simona', 'Irina', 'Larisa', 'Oana',
+               'Adriana', 'Camelia', 'Denisa', 'Teodora', 'Sorina', 'Andrei', 'Mihai', 'Alexandru', 'Ionuț',
+               'Vlad', 'Bogdan', 'Radu', 'Cosmin', 'Florin', 'Ștefan']
+LAST_NAMES = ['Popescu', 'Ionescu', 'Popa', 'Dumitru', 'Stan', 'Stoica', 'Gheorghe', 'Rusu', 'Munteanu', 'Matei',
+              'Constantin', 'Șerban', 'Moldovan', 'Lungu', 'Marin', 'Tudor', 'Ciobanu', 'Dinu', 'Neagu', 'Voicu']
+# Extra services beyond the populate_db catalog are variants of it
+SERVICE_VARIANTS = ['Express', 'Premium', 'Deluxe', 'Mini', 'Clasic', 'Pentru Mireasă']
+
+# Demand per weekday relative to Saturday; the salon is closed on Sunday
+WEEKDAY_DEMAND = (0.55, 0.6, 0.65, 0.75, 0.9, 1.0, 0.0)
+# Demand per start hour, evenings and late mornings are the busiest
+HOUR_DEMAND = {8: 0.3, 9: 0.6, 10: 1.0, 11: 1.0, 12: 0.7, 13: 0.6, 14: 0.7, 15: 0.8, 16: 1.0, 17: 1.0,
+               18: 0.8, 19: 0.3}
+CHUNK_SIZE = 50000
+
+
+class SalonSpec(NamedTuple):
+    artists: int = 12
+    services: int = 45
+    users: int = 20000
+    appointments: int = 100000
+    seed: int = 42
+    first_day: date = date(2020, 1, 6)
+    # Share of an artist's busiest-day capacity that is booked on average
+    occupancy: float = 0.7
+
+
+def _artists(rng, count):
+    # Every category gets at least one artist, the rest follow CATEGORY_SHARE
+    specializations = list(CATEGORIES[:count]) + rng.choices(
+        CATEGORIES, [CATEGORY_SHARE[category] for category in CATEGORIES], k=max(0, count - len(CATEGORIES)))
+    rows = []
+    used = set()
+    for artist_id, specialization in enumerate(specializations, start=1):
+        name = rng.choice(FIRST_NAMES)
+        # Artists are merged by (name, specialization), keep them distinct
+        while (name, specialization) in used:
+            name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        used.add((name, specialization))
+        rows.append({'artist_id': artist_id, 'name': name, 'specialization': specialization})
+    return rows
+
+
+def _services(count):
+    services = list(DEFAULT_SERVICES)
+    variant = 0
+    while len(services) < count:
+        name, category, duration, buffer = DEFAULT_SERVICES[variant % len(DEFAULT_SERVICES)]
+        suffix = SERVICE_VARIANTS[variant // len(DEFAULT_SERVICES) % len(SERVICE_VARIANTS)]
+        round_number = variant // (len(DEFAULT_SERVICES) * len(SERVICE_VARIANTS))
+        services.append((f'{name} {suffix}' + (f' {round_number + 1}' if round_number else ''), category,
+                         duration, buffer))
+        variant += 1
+    return [{'service_id': service_id, 'name': name, 'category': category, 'duration_minutes': duration,
+             'buffer_minutes': buffer}
+            for service_id, (name, category, duration, buffer) in enumerate(services[:count], start=1)]
+
+
+def _user(rng, user_id):
+    # 7919 is coprime with 10**8, so every user_id gets its own phone number
+    return {'user_id': user_id, 'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'phone_number': f'07{(user_id * 7919 + 1234567) % 10 ** 8:08d}'}
+
+
+def _day_bookings(rng, booked_count, candidates, weights, service_ids, service_weights, lengths, closing):
+    """Pick up to booked_count non-overlapping (start offset, service_id) bookings of one artist-day."""
+    bookings = []
+    free_from = None
+    for start in sorted(set(rng.choices(candidates, weights, k=booked_count * 2))):
+        if free_from is not None and start < free_from:
+            continue
+        service_id = rng.choices(service_ids, service_weights)[0]
+        if start + lengths[service_id] > closing:
+            continue
+        bookings.append((start, service_id))
+        free_from = start + lengths[service_id]
+        if len(bookings) == booked_count:
+            break
+    return bookings
+
+
+def iter_appointments(rng, spec, artists, services):
+    """Yield appointment rows day by day until spec.appointments are generated."""
+    services_by_category = {}
+    for service in services:
+        services_by_category.setdefault(service['category'], []).append(service['service_id'])
+    # Popular services are booked much more often than the rest (Zipf-like)
+    service_weights = {category: [1 / rank for rank in range(1, len(ids) + 1)]
+                       for category, ids in services_by_category.items()}
+    # How long each service blocks the artist, as scheduling.appointment_length counts it
+    lengths = {service['service_id']: timedelta(minutes=service['duration_minutes'] + service['buffer_minutes'])
+               for service in services}
+
+    # Candidate start times as offsets from opening, weighted by the demand of their hour
+    opening = datetime.combine(spec.first_day, OPENING_TIME)
+    closing = datetime.combine(spec.first_day, CLOSING_TIME) - opening
+    grid = []
+    start = opening
+    while start.time() <= LAST_START_TIME:
+        grid.append(start - opening)
+        start += SLOT_GRANULARITY
+    grid_weights = [HOUR_DEMAND[(opening + offset).hour] for offset in grid]
+    # Most bookings of an average length that fit in one artist-day, per category
+    capacity = {}
+    for category, ids in services_by_category.items():
+        average = sum((lengths[service_id] * weight for service_id, weight in zip(ids, service_weights[category])),
+                      timedelta())
+        capacity[category] = max(1, int(closing / (average / sum(service_weights[category]))))
+
+    generated = 0
+    day = spec.first_day
+    while generated < spec.appointments:
+        demand = WEEKDAY_DEMAND[day.weekday()]
+        opening = datetime.combine(day, OPENING_TIME)
+        for artist in artists:
+            if not demand:
+                break
+            category = artist['specialization']
+            booked_count = sum(rng.random() < demand * spec.occupancy for _ in range(capacity[category]))
+            for offset, service_id in _day_bookings(rng, booked_count, grid, grid_weights,
+                                                    services_by_category[category], service_weights[category],
+                                                    lengths, closing):
+                start = opening + offset
+                yield {
+                    'appointment_id': generated + 1,
+                    # Cubing skews the draw towards low ids: regulars book again and again
+                    'user_id': 1 + int(spec.users * rng.random() ** 3),
+                    'artist_id': artist['artist_id'],
+                    'service_id': service_id,
+                    'appointment_date': day,
+                    'appointment_time': start.time(),
+                    'start_ts': to_timestamp(day, start.time()),
+                    'duration_minutes': lengths[service_id].seconds // 60,
+                }
+                generated += 1
+                if generated == spec.appointments:
+                    return
+        day += timedelta(days=1)
+
+
+def generate_salon(bind, spec=SalonSpec(), chunk_size=CHUNK_SIZE):
+    """Fill an empty database with a synthetic salon. Returns a summary dict."""
+    rng = random.Random(spec.seed)
+    artists = _artists(rng, spec.artists)
+    services = _services(spec.services)
+    Base.metadata.create_all(bind)
+    with bind.begin() as conn:
+        conn.execute(insert(Artist), artists)
+        conn.execute(insert(Service), services)
+
+    for first in range(1, spec.users + 1, chunk_size):
+        with bind.begin() as conn:
+            conn.execute(insert(User), [_user(rng, user_id)
+                                        for user_id in range(first, min(first + chunk_size, spec.users + 1))])
+
+    chunk = []
+    last_day = None
+    for row in iter_appointments(rng, spec, artists, services):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            with bind.begin() as conn:
+                conn.execute(insert(Appointment), chunk)
+            last_day = chunk[-1]['appointment_date']
+            chunk = []
+    if chunk:
+        with bind.begin() as conn:
+            conn.execute(insert(Appointment), chunk)
+        last_day = chunk[-1]['appointment_date']
+
+    # Indexes already exist from create_all; this adds the overlap triggers last so
+    # they do not slow down the bulk insert
+    migrate_db(bind)
+    return {
+        'artists': {category: sum(artist['specialization'] == category for artist in artists)
+                    for category in CATEGORIES},
+        'services': len(services),
+        'users': spec.users,
+        'appointments': spec.appointments,
+        'first_day': spec.first_day.isoformat(),
+        'last_day': last_day.isoformat() if last_day else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='SQLite file to create')
+    defaults = SalonSpec()
+    parser.add_argument('--artists', type=int, default=defaults.artists)
+    parser.add_argument('--services', type=int, default=defaults.services)
+    parser.add_argument('--users', type=int, default=defaults.users)
+    parser.add_argument('--appointments', type=int, default=defaults.appointments)
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--first-day', type=date.fromisoformat, default=defaults.first_day)
+    parser.add_argument('--occupancy', type=float, default=defaults.occupancy)
+    args = parser.parse_args()
+
+    spec = SalonSpec(args.artists, args.services, args.users, args.appointments, args.seed, args.first_day,
+                     args.occupancy)
+    if os.path.exists(args.path):
+        raise SystemExit(f'{args.path} already exists')
+    started = time.perf_counter()
+    bind = create_salon_engine(f'sqlite:///{args.path}')
+    summary = generate_salon(bind, spec)
+    bind.dispose()
+    print(f'Generated {summary} in {time.perf_counter() - started:.1f} s')
+
+
+if __name__ == '__main__':
+    main()